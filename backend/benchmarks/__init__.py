@@ -0,0 +1,4 @@
+"""Microbenchmarks for pipeline hot paths.
+
+Run from the backend directory, e.g. ``python -m benchmarks.bench_scorer``.
+"""
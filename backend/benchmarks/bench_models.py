@@ -0,0 +1,92 @@
+"""NewsItem: the original dataclass vs. the slotted class, per-item memory and id cost.
+
+The slotted items are built the way the fetchers build them, with the
+canonical URL passed in. The time it takes to canonicalize those URLs is
+reported on its own ("canon s") because the legacy dataclass never
+canonicalized.
+
+Usage: python -m benchmarks.bench_models [--sizes 100000] [--id-reads 4]
+"""
+from __future__ import annotations
+
+import argparse
+import hashlib
+import tracemalloc
+from dataclasses import dataclass, field
+from datetime import datetime
+
+from benchmarks.common import make_items, timed
+from models import NewsItem, SourceType
+from urlcanon import canonicalize
+
+
+@dataclass
+class LegacyNewsItem:
+    """The original dataclass, kept as the reference."""
+    title: str
+    url: str
+    source_name: str
+    source_type: SourceType
+    published: datetime | None = None
+    content_snippet: str = ""
+    score: float = 0.0
+    matched_topics: list[str] = field(default_factory=list)
+    summary: str = ""
+    extra: dict = field(default_factory=dict)
+
+    @property
+    def id(self) -> str:
+        return hashlib.sha256(self.url.encode()).hexdigest()[:16]
+
+
+def _build(cls: type, rows: list[tuple], canonical: list[str] | None = None) -> list:
+    # Fresh source_name strings per item, as feed parsing produces them
+    if canonical is None:
+        return [cls(title, url, "".join(source), st, content_snippet=snippet)
+                for title, url, source, st, snippet in rows]
+    return [cls(title, url, "".join(source), st, content_snippet=snippet, canonical_url=canon)
+            for (title, url, source, st, snippet), canon in zip(rows, canonical)]
+
+
+def _bytes_per_item(cls: type, rows: list[tuple], canonical: list[str] | None) -> float:
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    items = _build(cls, rows, canonical)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    del items
+    return (after - before) / len(rows)
+
+
+def _read_ids(items: list, reads: int) -> None:
+    for _ in range(reads):
+        for item in items:
+            item.id
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[100_000])
+    parser.add_argument("--id-reads", type=int, default=4,
+                        help="id reads per item (filter_new, save_seen and both exporters)")
+    args = parser.parse_args()
+
+    print(f"{'items':>8} {'class':>8} {'B/item':>8} {'canon s':>8} {'build s':>8} {'id reads s':>11}")
+    for n in args.sizes:
+        # Titles and snippets are shared by both classes; measure only the item overhead
+        rows = [(i.title, i.url, list(i.source_name), i.source_type, i.content_snippet)
+                for i in make_items(n)]
+        canonicalize.cache_clear()
+        canon_s = timed(lambda: [canonicalize(row[1]) for row in rows], repeat=1)
+        canonical = [canonicalize(row[1]) for row in rows]
+        for name, cls, canon in (("legacy", LegacyNewsItem, None), ("slotted", NewsItem, canonical)):
+            per_item = _bytes_per_item(cls, rows, canon)
+            build_s = timed(lambda: _build(cls, rows, canon), repeat=1)
+            items = _build(cls, rows, canon)
+            ids_s = timed(lambda: _read_ids(items, args.id_reads), repeat=1)
+            canon_col = f"{canon_s:>8.3f}" if canon is not None else f"{'-':>8}"
+            print(f"{n:>8} {name:>8} {per_item:>8.0f} {canon_col} {build_s:>8.3f} {ids_s:>11.3f}")
+
+
+if __name__ == "__main__":
+    main()
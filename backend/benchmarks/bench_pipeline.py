@@ -0,0 +1,193 @@
+"""End-to-end pipeline run against local mock services, from 10 to 1,000 feeds.
+
+Every external service is replaced by benchmarks.mock_services: feeds and
+articles, GitHub, Gemini, OpenAI, Firecrawl and an SMTP sink. Each run
+happens in a scratch copy of backend/ with empty state, so it measures a
+cold daily run, and reports wall time, throughput and peak memory for
+each stage.
+
+The config's API quotas are lifted by default so the numbers reflect the
+pipeline rather than the rate limiters; pass --real-limits to keep them.
+With --output the results are saved as JSON, and --baseline compares a run
+against a saved one and exits non-zero on regressions.
+
+Usage: python -m benchmarks.bench_pipeline [--feeds 10 100 1000] [--output runs.json]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+import yaml
+
+from benchmarks.common import BASE_DIR, sample_texts
+from benchmarks.mock_services import FEED_KINDS, MockConfig, MockServices, ServiceProfile
+
+MOCK_HOST = "127.0.0.1"
+# Credentials and endpoints that must never leak into a benchmark run
+_SCRUBBED_ENV = (
+    "SUPABASE_URL", "SUPABASE_SERVICE_ROLE_KEY", "GMAIL_ADDRESS", "GMAIL_APP_PASSWORD",
+    "GOOGLE_API_KEY", "GITHUB_TOKEN",
+)
+_LIFTED_LIMITS = {"requests_per_minute": 1_000_000, "tokens_per_minute": 1_000_000_000}
+
+
+def _scratch_tree(root: Path) -> Path:
+    """Copy backend/ without its state, secrets or bytecode."""
+    tree = root / "backend"
+    shutil.copytree(BASE_DIR, tree, ignore=shutil.ignore_patterns("state", ".env", "__pycache__"))
+    return tree
+
+
+def _bench_config(mock: MockServices, n_feeds: int, args: argparse.Namespace) -> dict:
+    with open(BASE_DIR / "config.yaml") as f:
+        config = yaml.safe_load(f)
+
+    feeds: dict[str, list[dict]] = {kind: [] for kind in FEED_KINDS}
+    for n in range(n_feeds):
+        kind = FEED_KINDS[n % len(FEED_KINDS)]
+        feeds[kind].append({"name": f"{kind} feed {n}", "url": mock.feed_url(kind, n)})
+    for kind, entries in feeds.items():
+        config["sources"][kind] = {"type": "rss", "feeds": entries}
+
+    # One mock host stands in for hundreds of real ones, so give it the
+    # whole in-flight budget rather than a single host's share
+    fetch_cfg = config.setdefault("fetch", {})
+    fetch_cfg["per_host"] = {MOCK_HOST: fetch_cfg.get("max_in_flight", 16)}
+    fetch_cfg["host_budget_seconds"] = 0
+
+    config["email"].update({
+        "smtp_server": MOCK_HOST,
+        "smtp_port": mock.smtp_port,
+        "use_ssl": False,
+        "sender_email": "digest@bench.invalid",
+        "sender_password": "",
+        "recipients": [f"reader{i}@bench.invalid" for i in range(args.recipients)],
+    })
+    if not args.real_limits:
+        for limits in config.get("rate_limits", {}).values():
+            limits.update({k: v for k, v in _LIFTED_LIMITS.items() if k in limits})
+    return config
+
+
+def run_once(mock: MockServices, n_feeds: int, args: argparse.Namespace) -> dict:
+    """One cold pipeline run over ``n_feeds`` feeds; returns the child's report."""
+    mock.reset_counts()
+    with tempfile.TemporaryDirectory(prefix="bench-pipeline-") as tmp:
+        tree = _scratch_tree(Path(tmp))
+        (tree / "config.yaml").write_text(yaml.safe_dump(_bench_config(mock, n_feeds, args), sort_keys=False))
+        env = {k: v for k, v in os.environ.items() if k not in _SCRUBBED_ENV}
+        env.update(mock.env())
+        report_path = Path(tmp) / "report.json"
+        log_path = Path(tmp) / "run.log"
+        cmd = [sys.executable, "-m", "benchmarks.pipeline_run", "--report", str(report_path)]
+        if not args.no_tracemalloc:
+            cmd.append("--tracemalloc")
+        with open(log_path, "w") as log:
+            proc = subprocess.run(cmd, cwd=tree, env=env, stdout=log, stderr=subprocess.STDOUT, timeout=args.timeout)
+        if proc.returncode != 0 or not report_path.exists():
+            tail = log_path.read_text(errors="replace").splitlines()[-20:]
+            raise SystemExit(f"pipeline run with {n_feeds} feeds failed:\n" + "\n".join(tail))
+        report = json.loads(report_path.read_text())
+        run_report = tree / "state" / "run_report.json"
+        if run_report.exists():  # the pipeline's own telemetry: API calls, cache hit rates, spans
+            report["telemetry"] = json.loads(run_report.read_text())
+    report.update({
+        "feeds": n_feeds,
+        "requests": dict(mock.counts),
+        "rate_limited": dict(mock.limited),
+        "emails": mock.smtp_messages,
+        "email_bytes": mock.smtp_bytes,
+    })
+    return report
+
+
+def _print_report(report: dict) -> None:
+    print(f"\n== {report['feeds']} feeds: {report['fetched']} items fetched, "
+          f"{report['seconds']:.2f} s total, max RSS {report['max_rss_bytes'] / 2**20:.0f} MiB "
+          f"(largest child process {report['children_max_rss_bytes'] / 2**20:.0f} MiB)")
+    print(f"{'stage':>10} {'result':>8} {'seconds':>9} {'items in':>9} {'items out':>10} {'items/s':>9} {'peak MiB':>9}")
+    for stage in report["stages"]:
+        # Streaming mode fetches inside the score stage, so count what it read
+        items = max(stage["items_in"], stage["items_out"])
+        if stage["stage"] == "score" and stage["items_in"] == 0:
+            items = report["fetched"]
+        rate = items / stage["seconds"] if stage["seconds"] > 0 else 0.0
+        peak = f"{stage['peak_bytes'] / 2**20:.1f}" if stage["peak_bytes"] is not None else "-"
+        print(f"{stage['stage']:>10} {stage['result']:>8} {stage['seconds']:>9.3f} {stage['items_in']:>9} "
+              f"{stage['items_out']:>10} {rate:>9.0f} {peak:>9}")
+    calls = ", ".join(
+        f"{name} {count}" + (f" ({report['rate_limited'][name]} x 429)" if report["rate_limited"].get(name) else "")
+        for name, count in sorted(report["requests"].items())
+    )
+    print(f"requests: {calls}; emails: {report['emails']} ({report['email_bytes'] // 1024} KiB)")
+
+
+def _regressions(reports: list[dict], baseline: list[dict], tolerance: float, min_seconds: float) -> list[str]:
+    """Stages that got slower than the baseline by more than the tolerance."""
+    previous = {(r["feeds"], s["stage"]): s["seconds"] for r in baseline for s in r["stages"]}
+    found = []
+    for report in reports:
+        for stage in report["stages"]:
+            before = previous.get((report["feeds"], stage["stage"]))
+            after = stage["seconds"]
+            if before is not None and after - before > min_seconds and after > before * (1 + tolerance):
+                found.append(f"{report['feeds']} feeds / {stage['stage']}: {before:.3f} s -> {after:.3f} s")
+    return found
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--feeds", type=int, nargs="+", default=[10, 100, 1000], help="feed counts to run")
+    parser.add_argument("--recipients", type=int, default=20, help="digest recipients (SMTP sink)")
+    parser.add_argument("--feed-latency", type=float, default=30, help="feed and article latency, ms")
+    parser.add_argument("--api-latency", type=float, nargs=3, default=[150, 400, 800],
+                        metavar=("GEMINI", "OPENAI", "FIRECRAWL"), help="API latencies, ms")
+    parser.add_argument("--rate-limited", type=float, default=0.02, help="share of API calls answered 429")
+    parser.add_argument("--thin-articles", type=float, default=0.1,
+                        help="share of articles too short to extract locally (Firecrawl fallback)")
+    parser.add_argument("--real-limits", action="store_true", help="keep the config's API quotas")
+    parser.add_argument("--no-tracemalloc", action="store_true",
+                        help="skip per-stage heap peaks (tracemalloc slows Python-heavy stages)")
+    parser.add_argument("--timeout", type=float, default=1800, help="per-run timeout, seconds")
+    parser.add_argument("--output", type=Path, help="save the reports as JSON")
+    parser.add_argument("--baseline", type=Path, help="compare against reports saved with --output")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown per stage vs. baseline")
+    args = parser.parse_args()
+
+    gemini_ms, openai_ms, firecrawl_ms = args.api_latency
+    mock_config = MockConfig(
+        feeds=ServiceProfile(latency_ms=args.feed_latency, jitter_ms=args.feed_latency / 2),
+        articles=ServiceProfile(latency_ms=args.feed_latency, jitter_ms=args.feed_latency / 2),
+        github=ServiceProfile(latency_ms=args.feed_latency * 2, rate_limited=args.rate_limited),
+        gemini=ServiceProfile(latency_ms=gemini_ms, rate_limited=args.rate_limited),
+        openai=ServiceProfile(latency_ms=openai_ms, jitter_ms=openai_ms / 2, rate_limited=args.rate_limited),
+        firecrawl=ServiceProfile(latency_ms=firecrawl_ms, rate_limited=args.rate_limited),
+        thin_article_rate=args.thin_articles,
+    )
+
+    reports = []
+    with MockServices(sample_texts(), mock_config) as mock:
+        for n_feeds in args.feeds:
+            report = run_once(mock, n_feeds, args)
+            _print_report(report)
+            reports.append(report)
+
+    if args.output:
+        args.output.write_text(json.dumps(reports, indent=2))
+        print(f"\nwrote {args.output}")
+    if args.baseline:
+        found = _regressions(reports, json.loads(args.baseline.read_text()), args.tolerance, 0.05)
+        if found:
+            raise SystemExit("Regressions against baseline:\n  " + "\n  ".join(found))
+        print(f"\nNo stage slower than the baseline by more than {args.tolerance:.0%}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Keyword scoring: per-keyword re.findall loop vs. the precompiled KeywordIndex.
+
+Usage: python -m benchmarks.bench_scorer [--sizes 10000 100000]
+"""
+from __future__ import annotations
+
+import argparse
+import re
+
+from benchmarks.common import load_topics, make_items, timed
+from models import NewsItem
+from scorer import KeywordIndex, score_items
+
+
+def legacy_score_items(items: list[NewsItem], topics: dict) -> list[tuple[float, list[str]]]:
+    """The original item x topic x keyword loop, kept as the reference."""
+    results = []
+    for item in items:
+        total_score = 0.0
+        matched: list[str] = []
+        title_lower = item.title.lower()
+        snippet_lower = item.content_snippet.lower()
+        for topic_key, topic_cfg in topics.items():
+            weight = topic_cfg.get("weight", 1)
+            topic_score = 0.0
+            for kw in topic_cfg.get("keywords", []):
+                pattern = re.escape(kw.lower())
+                title_hits = len(re.findall(pattern, title_lower))
+                snippet_hits = len(re.findall(pattern, snippet_lower))
+                topic_score += (title_hits * 3 + snippet_hits) * weight
+            if topic_score > 0:
+                total_score += topic_score
+                matched.append(topic_key)
+        results.append((total_score, matched))
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    args = parser.parse_args()
+
+    topics = load_topics()
+    print(f"{'items':>8} {'legacy s':>10} {'index s':>10} {'speedup':>8}")
+    for n in args.sizes:
+        items = make_items(n)
+        expected = legacy_score_items(items, topics)
+        score_items(items, topics)
+        actual = [(item.score, item.matched_topics) for item in items]
+        if actual != expected:
+            raise SystemExit(f"Score mismatch at n={n}")
+
+        legacy_s = timed(lambda: legacy_score_items(items, topics), repeat=1)
+        index_s = timed(lambda: score_items(items, topics))
+        build_s = timed(lambda: KeywordIndex(topics))
+        print(f"{n:>8} {legacy_s:>10.3f} {index_s:>10.3f} {legacy_s / index_s:>7.1f}x"
+              f"  (index build {build_s * 1000:.2f} ms)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Snippet stripping: BeautifulSoup get_text vs. the streaming htmltext engine.
+
+Runs over the sample feeds in benchmarks/fixtures/ (regenerate them with
+``python -m benchmarks.make_feed_fixtures``), checks both produce identical
+snippets, and times stripping alone and the whole _parse_entries call.
+
+Usage: python -m benchmarks.bench_strip_html [--repeat 20]
+"""
+from __future__ import annotations
+
+import argparse
+from pathlib import Path
+
+import feedparser
+from bs4 import BeautifulSoup
+
+from benchmarks.common import timed
+from fetchers import _parse_entries
+from htmltext import strip_html
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+
+
+def legacy_strip_html(html: str, max_chars: int = 500) -> str:
+    """The original implementation, kept as the reference."""
+    text = BeautifulSoup(html, "html.parser").get_text(separator=" ", strip=True)
+    return text[:max_chars]
+
+
+def _entry_htmls(text: str) -> list[str]:
+    htmls = []
+    for entry in feedparser.parse(text).entries:
+        if entry.get("content"):
+            htmls.append(entry.content[0].get("value", ""))
+        else:
+            htmls.append(entry.get("summary") or entry.get("media_description", ""))
+    return htmls
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=20, help="passes over each feed per timing")
+    args = parser.parse_args()
+
+    print(f"{'feed':>8} {'entries':>8} {'legacy ms':>10} {'engine ms':>10} {'speedup':>8} {'parse_entries ms':>17}")
+    for path in sorted(FIXTURES_DIR.glob("*.xml")):
+        text = path.read_text(encoding="utf-8")
+        htmls = _entry_htmls(text)
+        mismatches = sum(legacy_strip_html(h) != strip_html(h) for h in htmls)
+        if mismatches:
+            raise SystemExit(f"{path.name}: {mismatches} snippets differ from BeautifulSoup")
+
+        legacy_s = timed(lambda: [legacy_strip_html(h) for _ in range(args.repeat) for h in htmls])
+        engine_s = timed(lambda: [strip_html(h) for _ in range(args.repeat) for h in htmls])
+        parse_s = timed(lambda: _parse_entries(text, len(htmls)))
+        print(f"{path.stem:>8} {len(htmls):>8} {legacy_s / args.repeat * 1000:>10.2f} "
+              f"{engine_s / args.repeat * 1000:>10.2f} {legacy_s / engine_s:>7.1f}x {parse_s * 1000:>17.2f}")
+
+
+if __name__ == "__main__":
+    main()
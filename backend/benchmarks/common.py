@@ -0,0 +1,59 @@
+"""Shared helpers for the benchmark scripts."""
+from __future__ import annotations
+
+import json
+import random
+import time
+from pathlib import Path
+from typing import Callable
+
+import yaml
+
+from models import NewsItem, SourceType
+
+BASE_DIR = Path(__file__).parent.parent
+DIGESTS_DIR = BASE_DIR.parent / "data" / "digests"
+
+
+def load_topics() -> dict:
+    with open(BASE_DIR / "config.yaml") as f:
+        return yaml.safe_load(f).get("topics", {})
+
+
+def sample_texts() -> list[tuple[str, str]]:
+    """(title, snippet) pairs from the exported digest snapshots."""
+    pairs: list[tuple[str, str]] = []
+    for path in sorted(DIGESTS_DIR.glob("*.json")):
+        data = json.loads(path.read_text(encoding="utf-8"))
+        for section in data.get("sections", []):
+            for item in section.get("items", []):
+                pairs.append((item.get("title", ""), item.get("summary", "")))
+    return pairs or [("Sample title", "Sample snippet")]
+
+
+def make_items(n: int, seed: int = 0) -> list[NewsItem]:
+    """Build n synthetic NewsItems by sampling real titles and snippets."""
+    rng = random.Random(seed)
+    pairs = sample_texts()
+    types = list(SourceType)
+    items: list[NewsItem] = []
+    for i in range(n):
+        title, snippet = rng.choice(pairs)
+        items.append(NewsItem(
+            title=title,
+            url=f"https://example.com/{i}",
+            source_name=f"Source {i % 50}",
+            source_type=types[i % len(types)],
+            content_snippet=snippet,
+        ))
+    return items
+
+
+def timed(fn: Callable[[], object], repeat: int = 3) -> float:
+    """Best wall time of ``repeat`` calls, in seconds."""
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
@@ -0,0 +1,108 @@
+"""Write the sample feeds under benchmarks/fixtures/ from the exported digests.
+
+Each feed reuses real titles, URLs and summaries from data/digests wrapped in
+the markup its source actually sends: Reddit's Atom content blocks, news RSS
+descriptions with CDATA and inline images, and YouTube's plain-text media
+descriptions.
+
+Usage: python -m benchmarks.make_feed_fixtures
+"""
+from __future__ import annotations
+
+import html
+import json
+from datetime import datetime, timezone
+from pathlib import Path
+
+from benchmarks.common import DIGESTS_DIR
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+ENTRIES_PER_FEED = 100
+
+
+def _digest_items() -> list[dict]:
+    items: list[dict] = []
+    for path in sorted(DIGESTS_DIR.glob("*.json")):
+        data = json.loads(path.read_text(encoding="utf-8"))
+        for section in data.get("sections", []):
+            items.extend(section.get("items", []))
+    return items
+
+
+def _body(item: dict) -> str:
+    return item.get("summary") or item.get("title", "")
+
+
+def _reddit(items: list[dict]) -> str:
+    entries = []
+    for i, item in enumerate(items):
+        paragraphs = "".join(f"<p>{html.escape(p)}</p>" for p in _body(item).split(". ") if p)
+        content = (
+            f'<!-- SC_OFF --><div class="md">{paragraphs}</div><!-- SC_ON --> &#32; submitted by &#32; '
+            f'<a href="https://www.reddit.com/user/user{i}"> /u/user{i} </a> <br/> '
+            f'<span><a href="{item["url"]}">[link]</a></span> &#32; '
+            f'<span><a href="{item["url"]}">[comments]</a></span>'
+        )
+        entries.append(
+            f"<entry><title>{html.escape(item['title'])}</title>"
+            f'<link href="{html.escape(item["url"])}"/>'
+            f"<updated>{item.get('published') or datetime.now(timezone.utc).isoformat()}</updated>"
+            f'<content type="html">{html.escape(content)}</content></entry>'
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<feed xmlns="http://www.w3.org/2005/Atom"><title>r/sample</title>'
+        + "".join(entries) + "</feed>"
+    )
+
+
+def _news(items: list[dict]) -> str:
+    entries = []
+    for i, item in enumerate(items):
+        description = (
+            f'<p><img src="https://example.com/img/{i}.jpg" alt="" width="600" /></p>'
+            f"<p>{html.escape(_body(item))}</p>"
+            f'<p>The post <a href="{item["url"]}">{html.escape(item["title"])}</a> '
+            f"appeared first on <em>Sample News</em> &amp; friends.</p>"
+        )
+        entries.append(
+            f"<item><title>{html.escape(item['title'])}</title><link>{html.escape(item['url'])}</link>"
+            f"<pubDate>Tue, 17 Feb 2026 10:{i % 60:02d}:00 +0000</pubDate>"
+            f"<description><![CDATA[{description}]]></description></item>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel><title>Sample News</title>'
+        + "".join(entries) + "</channel></rss>"
+    )
+
+
+def _youtube(items: list[dict]) -> str:
+    entries = []
+    for i, item in enumerate(items):
+        entries.append(
+            f"<entry><title>{html.escape(item['title'])}</title>"
+            f'<link rel="alternate" href="https://www.youtube.com/watch?v=vid{i:08d}"/>'
+            f"<published>2026-02-17T10:00:00+00:00</published>"
+            f"<media:group><media:title>{html.escape(item['title'])}</media:title>"
+            f"<media:description>{html.escape(_body(item))}\n\nChapters:\n0:00 Intro\n"
+            f"Links: https://example.com/{i}</media:description></media:group></entry>"
+        )
+    return (
+        '<?xml version="1.0" encoding="UTF-8"?>'
+        '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:media="http://search.yahoo.com/mrss/">'
+        "<title>Sample Channel</title>" + "".join(entries) + "</feed>"
+    )
+
+
+def main() -> None:
+    items = _digest_items()
+    sample = [items[i % len(items)] for i in range(ENTRIES_PER_FEED)]
+    FIXTURES_DIR.mkdir(exist_ok=True)
+    for name, build in (("reddit", _reddit), ("news", _news), ("youtube", _youtube)):
+        path = FIXTURES_DIR / f"{name}.xml"
+        path.write_text(build(sample), encoding="utf-8")
+        print(f"wrote {path} ({path.stat().st_size // 1024} KiB)")
+
+
+if __name__ == "__main__":
+    main()
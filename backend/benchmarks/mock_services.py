@@ -0,0 +1,422 @@
+"""Local stand-ins for every service the pipeline talks to.
+
+One threaded HTTP server answers for all of them, routed by path:
+
+- ``/feeds/<kind>/<n>.xml``: generated Reddit/YouTube Atom and news RSS feeds
+  (ETag and If-None-Match supported, as real feed hosts do)
+- ``/articles/...`` and ``/github/<owner>/<repo>``: article pages for enrichment
+- ``/github/trending`` and ``/github-api/search/repositories``: GitHub
+- ``/v1beta/models/<model>:batchEmbedContents``: Gemini embeddings
+- ``/v1/chat/completions`` and ``/v1/images/generations``: OpenAI
+- ``/v1/scrape``: Firecrawl
+
+A second server is an SMTP sink that accepts and counts every message. Each
+API has its own latency and share of requests answered with 429, so retry
+and backoff paths are exercised too. Content is derived from the request
+(feed number, text hash), so repeated runs see the same data.
+"""
+from __future__ import annotations
+
+import hashlib
+import html
+import json
+import random
+import re
+import socketserver
+import threading
+import time
+from dataclasses import dataclass, field
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import numpy as np
+
+EMBED_DIMS = 3072
+ENTRIES_PER_FEED = 20
+FEED_KINDS = ("reddit", "youtube", "news")
+_WORD_RE = re.compile(r"[A-Za-z][A-Za-z0-9.+-]*")
+
+
+@dataclass
+class ServiceProfile:
+    """How one mocked API behaves: response latency and share of 429 answers."""
+    latency_ms: float = 0.0
+    jitter_ms: float = 0.0
+    rate_limited: float = 0.0  # fraction of requests answered with 429
+    retry_after: float = 0.2   # seconds, sent in the Retry-After header
+
+
+@dataclass
+class MockConfig:
+    feeds: ServiceProfile = field(default_factory=lambda: ServiceProfile(latency_ms=30, jitter_ms=20))
+    articles: ServiceProfile = field(default_factory=lambda: ServiceProfile(latency_ms=40, jitter_ms=30))
+    github: ServiceProfile = field(default_factory=lambda: ServiceProfile(latency_ms=60, jitter_ms=20))
+    gemini: ServiceProfile = field(default_factory=lambda: ServiceProfile(latency_ms=150, rate_limited=0.02))
+    openai: ServiceProfile = field(default_factory=lambda: ServiceProfile(latency_ms=400, jitter_ms=200, rate_limited=0.02))
+    firecrawl: ServiceProfile = field(default_factory=lambda: ServiceProfile(latency_ms=800, rate_limited=0.02))
+    thin_article_rate: float = 0.1  # article pages too short for local extraction
+    entries_per_feed: int = ENTRIES_PER_FEED
+
+
+class _Vocabulary:
+    """Title and body text built from words of real digest items."""
+
+    def __init__(self, texts: list[tuple[str, str]]):
+        self.titles = [t for t, _ in texts if t] or ["AI agents launch new open source model"]
+        words = [w for t, s in texts for w in _WORD_RE.findall(f"{t} {s}")]
+        self.words = words or self.titles[0].split()
+
+    def title(self, rng: random.Random) -> str:
+        # Half reuse a real title's opening, so keyword matches and
+        # near-duplicates across feeds occur at a realistic rate
+        if rng.random() < 0.5:
+            head = rng.choice(self.titles).split()[:5]
+        else:
+            head = []
+        return " ".join(head + rng.sample(self.words, min(len(self.words), 8 - len(head) // 2)))
+
+    def sentence(self, rng: random.Random, n: int = 14) -> str:
+        return " ".join(rng.choices(self.words, k=n)).capitalize() + "."
+
+    def paragraph(self, rng: random.Random, sentences: int = 5) -> str:
+        return " ".join(self.sentence(rng) for _ in range(sentences))
+
+
+def _rng(*key: object) -> random.Random:
+    return random.Random(hashlib.blake2b(repr(key).encode(), digest_size=8).digest())
+
+
+class MockServices:
+    """Start with ``start()``; endpoints are then available under ``base_url``."""
+
+    def __init__(self, texts: list[tuple[str, str]], config: MockConfig | None = None):
+        self.config = config or MockConfig()
+        self.vocab = _Vocabulary(texts)
+        self.counts: dict[str, int] = {}
+        self.limited: dict[str, int] = {}
+        self.smtp_messages = 0
+        self.smtp_bytes = 0
+        self._lock = threading.Lock()
+        self._http: ThreadingHTTPServer | None = None
+        self._smtp: socketserver.ThreadingTCPServer | None = None
+        self._threads: list[threading.Thread] = []
+
+    @property
+    def base_url(self) -> str:
+        return f"http://127.0.0.1:{self._http.server_address[1]}"
+
+    @property
+    def smtp_port(self) -> int:
+        return self._smtp.server_address[1]
+
+    def env(self) -> dict[str, str]:
+        """Environment variables pointing the pipeline at these services."""
+        return {
+            "OPENAI_API_KEY": "mock",
+            "OPENAI_BASE_URL": f"{self.base_url}/v1",
+            "GEMINI_API_KEY": "mock",
+            "GOOGLE_GEMINI_BASE_URL": self.base_url,
+            "FIRECRAWL_API_KEY": "mock",
+            "FIRECRAWL_API_URL": self.base_url,
+            "GITHUB_URL": f"{self.base_url}/github",
+            "GITHUB_API_URL": f"{self.base_url}/github-api",
+        }
+
+    def feed_url(self, kind: str, n: int) -> str:
+        return f"{self.base_url}/feeds/{kind}/{n}.xml"
+
+    def reset_counts(self) -> None:
+        with self._lock:
+            self.counts.clear()
+            self.limited.clear()
+            self.smtp_messages = self.smtp_bytes = 0
+
+    def start(self) -> MockServices:
+        services = self
+
+        class HTTPHandler(_HTTPHandler):
+            mock = services
+
+        class SMTPHandler(_SMTPHandler):
+            mock = services
+
+        self._http = ThreadingHTTPServer(("127.0.0.1", 0), HTTPHandler)
+        self._http.daemon_threads = True
+        self._smtp = socketserver.ThreadingTCPServer(("127.0.0.1", 0), SMTPHandler)
+        self._smtp.daemon_threads = True
+        for server in (self._http, self._smtp):
+            thread = threading.Thread(target=server.serve_forever, daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        return self
+
+    def stop(self) -> None:
+        for server in (self._http, self._smtp):
+            if server is not None:
+                server.shutdown()
+                server.server_close()
+
+    def __enter__(self) -> MockServices:
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def _admit(self, service: str, profile: ServiceProfile) -> bool:
+        """Count the request, sleep for its latency; False if it should get a 429."""
+        with self._lock:
+            self.counts[service] = self.counts.get(service, 0) + 1
+            limited = random.random() < profile.rate_limited
+            if limited:
+                self.limited[service] = self.limited.get(service, 0) + 1
+        delay = profile.latency_ms + random.uniform(-profile.jitter_ms, profile.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        return not limited
+
+    def _add_mail(self, size: int) -> None:
+        with self._lock:
+            self.smtp_messages += 1
+            self.smtp_bytes += size
+
+    # -- content ---------------------------------------------------------------
+
+    def feed(self, kind: str, n: int) -> str:
+        rng = _rng("feed", kind, n)
+        now = datetime.now(timezone.utc).replace(minute=0, second=0, microsecond=0)
+        entries = []
+        for i in range(self.config.entries_per_feed):
+            title = html.escape(self.vocab.title(rng))
+            link = html.escape(f"{self.base_url}/articles/{kind}-{n}/{i}.html")
+            published = now - timedelta(minutes=rng.randrange(20 * 60))
+            body = html.escape(self.vocab.paragraph(rng, 3))
+            if kind == "news":
+                description = f"<p><img src=\"{link}.jpg\" alt=\"\"/></p><p>{body}</p>"
+                entries.append(
+                    f"<item><title>{title}</title><link>{link}</link>"
+                    f"<pubDate>{format_datetime(published)}</pubDate>"
+                    f"<description><![CDATA[{description}]]></description></item>"
+                )
+            elif kind == "youtube":
+                entries.append(
+                    f"<entry><title>{title}</title><link rel=\"alternate\" href=\"{link}\"/>"
+                    f"<published>{published.isoformat()}</published>"
+                    f"<media:group><media:description>{body}</media:description></media:group></entry>"
+                )
+            else:
+                content = html.escape(f"<div class=\"md\"><p>{body}</p></div> submitted by /u/user{i}")
+                entries.append(
+                    f"<entry><title>{title}</title><link href=\"{link}\"/>"
+                    f"<updated>{published.isoformat()}</updated>"
+                    f"<content type=\"html\">{content}</content></entry>"
+                )
+        if kind == "news":
+            return (
+                '<?xml version="1.0" encoding="UTF-8"?><rss version="2.0"><channel>'
+                f"<title>Feed {n}</title>{''.join(entries)}</channel></rss>"
+            )
+        return (
+            '<?xml version="1.0" encoding="UTF-8"?>'
+            '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:media="http://search.yahoo.com/mrss/">'
+            f"<title>Feed {n}</title>{''.join(entries)}</feed>"
+        )
+
+    def article(self, path: str) -> str:
+        rng = _rng("article", path)
+        paragraphs = 1 if rng.random() < self.config.thin_article_rate else rng.randint(4, 9)
+        body = "".join(f"<p>{html.escape(self.vocab.paragraph(rng))}</p>" for _ in range(paragraphs))
+        if paragraphs == 1:
+            body = f"<p>{html.escape(self.vocab.sentence(rng, 8))}</p>"
+        return (
+            "<!DOCTYPE html><html><head><title>Article</title>"
+            "<script>window.analytics = {};</script></head><body>"
+            "<header><nav><a href=\"/\">Home</a> <a href=\"/about\">About</a></nav></header>"
+            f"<article><h1>{html.escape(self.vocab.title(rng))}</h1>{body}</article>"
+            "<aside><p>Related stories</p></aside><footer><p>Copyright</p></footer></body></html>"
+        )
+
+    def trending(self) -> str:
+        rng = _rng("trending", datetime.now(timezone.utc).date())
+        rows = []
+        for i in range(25):
+            repo = f"owner{i}/repo-{rng.randrange(10**6)}"
+            rows.append(
+                f"<article class=\"Box-row\"><h2><a href=\"/{repo}\">{repo}</a></h2>"
+                f"<p>{html.escape(self.vocab.sentence(rng))}</p>"
+                f"<a href=\"/{repo}/stargazers\">{rng.randrange(100, 50000):,}</a>"
+                f"<span itemprop=\"programmingLanguage\">Python</span></article>"
+            )
+        return f"<html><body>{''.join(rows)}</body></html>"
+
+    def search(self, query: str) -> dict:
+        rng = _rng("search", query)
+        items = []
+        for _ in range(10):
+            name = f"org{rng.randrange(100)}/project-{rng.randrange(10**6)}"
+            items.append({
+                "full_name": name,
+                "html_url": f"{self.base_url}/github/{name}",
+                "description": self.vocab.sentence(rng),
+                "stargazers_count": rng.randrange(50, 5000),
+                "language": "Python",
+                "topics": ["llm", "machine-learning"],
+            })
+        return {"total_count": len(items), "items": items}
+
+    @staticmethod
+    def embedding(text: str) -> list[float]:
+        seed = int.from_bytes(hashlib.blake2b(text.encode(), digest_size=8).digest(), "little")
+        vector = np.random.default_rng(seed).standard_normal(EMBED_DIMS, dtype=np.float32)
+        return np.round(vector / np.linalg.norm(vector), 5).tolist()
+
+    def completion(self, prompt: str) -> str:
+        rng = _rng("completion", prompt)
+        if "JSON array" in prompt:
+            category = re.search(r'Category MUST be exactly "([^"]+)"', prompt)
+            return json.dumps([{
+                "name": f"Project {rng.randrange(10**6)}",
+                "description": self.vocab.sentence(rng),
+                "why": self.vocab.sentence(rng),
+                "url": "",
+                "category": category.group(1) if category else "tool",
+            }])
+        return self.vocab.paragraph(rng, 3)
+
+
+class _HTTPHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive, as the real hosts allow
+    mock: MockServices
+
+    def log_message(self, format: str, *args) -> None:
+        pass
+
+    def _send(self, status: int, body: str | bytes, content_type: str, headers: dict | None = None) -> None:
+        data = body.encode() if isinstance(body, str) else body
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _json(self, payload: dict, status: int = 200, headers: dict | None = None) -> None:
+        self._send(status, json.dumps(payload), "application/json", headers)
+
+    def _rate_limited(self, profile: ServiceProfile, payload: dict) -> None:
+        self._json(payload, 429, {"Retry-After": f"{profile.retry_after:g}"})
+
+    def _body(self) -> dict:
+        length = int(self.headers.get("Content-Length") or 0)
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self) -> None:
+        mock, cfg = self.mock, self.mock.config
+        parts = urlsplit(self.path)
+        path = parts.path
+        if path.startswith("/feeds/"):
+            match = re.fullmatch(r"/feeds/(\w+)/(\d+)\.xml", path)
+            if not match or not mock._admit("feeds", cfg.feeds):
+                self._send(404 if not match else 429, "", "text/plain")
+                return
+            body = mock.feed(match.group(1), int(match.group(2)))
+            etag = '"' + hashlib.blake2b(body.encode(), digest_size=8).hexdigest() + '"'
+            if self.headers.get("If-None-Match") == etag:
+                self._send(304, b"", "application/xml", {"ETag": etag})
+            else:
+                self._send(200, body, "application/xml", {"ETag": etag})
+        elif path == "/github/trending":
+            if mock._admit("github", cfg.github):
+                self._send(200, mock.trending(), "text/html; charset=utf-8")
+            else:
+                self._send(429, "", "text/plain", {"Retry-After": f"{cfg.github.retry_after:g}"})
+        elif path == "/github-api/search/repositories":
+            if mock._admit("github", cfg.github):
+                self._json(mock.search(parse_qs(parts.query).get("q", [""])[0]))
+            else:
+                self._rate_limited(cfg.github, {"message": "API rate limit exceeded"})
+        elif path.startswith(("/articles/", "/github/")):
+            mock._admit("articles", cfg.articles)
+            self._send(200, mock.article(path), "text/html; charset=utf-8")
+        elif path.startswith("/images/"):
+            self._send(200, b"\x89PNG\r\n\x1a\n", "image/png")
+        else:
+            self._send(404, "", "text/plain")
+
+    def do_POST(self) -> None:
+        mock, cfg = self.mock, self.mock.config
+        path = urlsplit(self.path).path
+        body = self._body()
+        if path.endswith(":batchEmbedContents"):
+            if not mock._admit("gemini", cfg.gemini):
+                self._rate_limited(cfg.gemini, {"error": {
+                    "code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED",
+                }})
+                return
+            texts = [
+                " ".join(part.get("text", "") for part in request.get("content", {}).get("parts", []))
+                for request in body.get("requests", [])
+            ]
+            self._json({"embeddings": [{"values": mock.embedding(t)} for t in texts]})
+        elif path.endswith("/chat/completions"):
+            if not mock._admit("openai", cfg.openai):
+                self._rate_limited(cfg.openai, {"error": {
+                    "message": "Rate limit reached", "type": "requests", "code": "rate_limit_exceeded",
+                }})
+                return
+            prompt = body.get("messages", [{}])[-1].get("content", "")
+            self._json({
+                "id": "chatcmpl-mock",
+                "object": "chat.completion",
+                "created": int(time.time()),
+                "model": body.get("model", "mock"),
+                "choices": [{
+                    "index": 0,
+                    "message": {"role": "assistant", "content": mock.completion(prompt)},
+                    "finish_reason": "stop",
+                }],
+                "usage": {"prompt_tokens": len(prompt) // 4, "completion_tokens": 60, "total_tokens": len(prompt) // 4 + 60},
+            })
+        elif path.endswith("/images/generations"):
+            if not mock._admit("openai", cfg.openai):
+                self._rate_limited(cfg.openai, {"error": {"message": "Rate limit reached", "code": "rate_limit_exceeded"}})
+                return
+            self._json({"created": int(time.time()), "data": [{"url": f"{mock.base_url}/images/hero.png"}]})
+        elif path == "/v1/scrape":
+            if not mock._admit("firecrawl", cfg.firecrawl):
+                self._rate_limited(cfg.firecrawl, {"success": False, "error": "Rate limit exceeded"})
+                return
+            rng = _rng("scrape", body.get("url", ""))
+            markdown = "\n\n".join(mock.vocab.paragraph(rng) for _ in range(5))
+            self._json({"success": True, "data": {"markdown": markdown, "metadata": {"statusCode": 200}}})
+        else:
+            self._send(404, "", "text/plain")
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    """Just enough ESMTP to accept messages: no auth, no STARTTLS."""
+    mock: MockServices
+
+    def _reply(self, line: str) -> None:
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self) -> None:
+        self._reply("220 sink ESMTP ready")
+        while line := self.rfile.readline():
+            verb = line[:4].upper()
+            if verb in (b"EHLO", b"HELO"):
+                self._reply("250-sink\r\n250-8BITMIME\r\n250 SIZE 52428800" if verb == b"EHLO" else "250 sink")
+            elif verb == b"DATA":
+                self._reply("354 End data with <CR><LF>.<CR><LF>")
+                size = 0
+                while (data := self.rfile.readline()) not in (b".\r\n", b".\n", b""):
+                    size += len(data)
+                self.mock._add_mail(size)
+                self._reply("250 OK queued")
+            elif verb == b"QUIT":
+                self._reply("221 Bye")
+                return
+            else:  # MAIL, RCPT, RSET, NOOP
+                self._reply("250 OK")
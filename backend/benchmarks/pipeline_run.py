@@ -0,0 +1,76 @@
+"""Run main.main() once and write per-stage timings and memory to a JSON report.
+
+Started by bench_pipeline inside a scratch copy of backend/, with the
+environment pointing every service at the local mocks; not meant to be run
+against the real state directory.
+
+Usage: python -m benchmarks.pipeline_run --report out.json [--tracemalloc]
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import resource
+import sys
+import time
+import tracemalloc
+
+import main
+import pipeline
+
+
+def _instrument(report: dict, trace: bool) -> None:
+    """Wrap each stage runner and the fetch iterator to record what they do."""
+    for name, runner in list(main.STAGE_RUNNERS.items()):
+        def timed_runner(ctx, state, _runner=runner, _name=name):
+            items_in = len(state.items)
+            if trace:
+                tracemalloc.reset_peak()
+            start = time.perf_counter()
+            result = _runner(ctx, state)
+            report["stages"].append({
+                "stage": _name,
+                "result": result,
+                "seconds": time.perf_counter() - start,
+                "items_in": items_in,
+                "items_out": len(state.items),
+                "peak_bytes": tracemalloc.get_traced_memory()[1] if trace else None,
+            })
+            return result
+        main.STAGE_RUNNERS[name] = timed_runner
+
+    iter_fetch = pipeline.iter_fetch
+
+    def counted_iter_fetch(config):
+        for items in iter_fetch(config):
+            report["fetched"] += len(items)
+            yield items
+
+    pipeline.iter_fetch = counted_iter_fetch
+    main.fetch_all = lambda config: [item for items in counted_iter_fetch(config) for item in items]
+
+
+def run() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--report", required=True, help="where to write the JSON report")
+    parser.add_argument("--tracemalloc", action="store_true", help="record per-stage Python heap peaks")
+    args = parser.parse_args()
+
+    report: dict = {"stages": [], "fetched": 0}
+    _instrument(report, args.tracemalloc)
+    if args.tracemalloc:
+        tracemalloc.start()
+
+    sys.argv = ["main.py", "--force"]
+    start = time.perf_counter()
+    main.main()
+    report["seconds"] = time.perf_counter() - start
+    # ru_maxrss is in KiB on Linux; for children it is the largest pool worker
+    report["max_rss_bytes"] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+    report["children_max_rss_bytes"] = resource.getrusage(resource.RUSAGE_CHILDREN).ru_maxrss * 1024
+    with open(args.report, "w") as f:
+        json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    run()
@@ -0,0 +1,107 @@
+"""Memory-mapped Bloom filter over 64-bit item ids.
+
+NewsItem ids are already SHA-256 prefixes, so the k probe positions come
+straight from the id by double hashing (low and high 32-bit halves) with no
+further hashing. The file holds a small header and the bit array; it is
+mapped read/write, so lookups never load more than the pages they touch.
+"""
+from __future__ import annotations
+
+import math
+import mmap
+import struct
+from pathlib import Path
+
+import numpy as np
+
+_MAGIC = b"BLM1"
+_HEADER = struct.Struct("<4sQIQQ")  # magic, m_bits, k, generation, count
+_HEADER_SIZE = 64
+
+
+def optimal_params(capacity: int, error_rate: float) -> tuple[int, int]:
+    """Bit count (rounded up to whole 8-byte words) and hash count for a target error rate."""
+    capacity = max(capacity, 1)
+    m_bits = math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2))
+    m_bits = (m_bits + 63) // 64 * 64
+    k = max(1, round(m_bits / capacity * math.log(2)))
+    return m_bits, k
+
+
+def _ids_to_uint64(item_ids: list[str]) -> np.ndarray:
+    return np.array([int(i, 16) for i in item_ids], dtype=np.uint64)
+
+
+class BloomFilter:
+    def __init__(self, path: Path, mm: mmap.mmap, m_bits: int, k: int, generation: int, count: int):
+        self.path = path
+        self._mm = mm
+        self.m_bits = m_bits
+        self.k = k
+        self.generation = generation
+        self.count = count
+        self._bits = np.frombuffer(mm, dtype=np.uint8, offset=_HEADER_SIZE, count=m_bits // 8)
+
+    @classmethod
+    def create(cls, path: Path, capacity: int, error_rate: float, generation: int = 0) -> BloomFilter:
+        m_bits, k = optimal_params(capacity, error_rate)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            f.write(_HEADER.pack(_MAGIC, m_bits, k, generation, 0).ljust(_HEADER_SIZE, b"\0"))
+            f.truncate(_HEADER_SIZE + m_bits // 8)
+        tmp.replace(path)
+        return cls.open(path)
+
+    @classmethod
+    def open(cls, path: Path) -> BloomFilter:
+        """Map an existing filter file; raises ValueError if it is not one."""
+        with open(path, "r+b") as f:
+            mm = mmap.mmap(f.fileno(), 0)
+        if len(mm) < _HEADER_SIZE:
+            mm.close()
+            raise ValueError(f"{path} is not a valid Bloom filter file")
+        magic, m_bits, k, generation, count = _HEADER.unpack_from(mm, 0)
+        if magic != _MAGIC or len(mm) != _HEADER_SIZE + m_bits // 8:
+            mm.close()
+            raise ValueError(f"{path} is not a valid Bloom filter file")
+        return cls(path, mm, m_bits, k, generation, count)
+
+    def capacity(self, error_rate: float) -> int:
+        """How many ids this filter holds at ``error_rate`` (the inverse of optimal_params)."""
+        return int(self.m_bits * math.log(2) ** 2 / -math.log(error_rate))
+
+    def _positions(self, item_ids: list[str]) -> np.ndarray:
+        """(n, k) bit positions for each id."""
+        ids = _ids_to_uint64(item_ids)
+        h1 = ids & np.uint64(0xFFFFFFFF)
+        h2 = (ids >> np.uint64(32)) | np.uint64(1)
+        steps = np.arange(self.k, dtype=np.uint64)
+        return (h1[:, None] + steps[None, :] * h2[:, None]) % np.uint64(self.m_bits)
+
+    def add(self, item_ids: list[str]) -> None:
+        if not item_ids:
+            return
+        pos = self._positions(item_ids).ravel()
+        masks = (np.uint8(1) << (pos & np.uint64(7)).astype(np.uint8)).astype(np.uint8)
+        np.bitwise_or.at(self._bits, (pos >> np.uint64(3)).astype(np.intp), masks)
+        self.count += len(item_ids)
+
+    def might_contain(self, item_ids: list[str]) -> np.ndarray:
+        """Boolean mask: False means the id is definitely not in the set."""
+        if not item_ids:
+            return np.zeros(0, dtype=bool)
+        pos = self._positions(item_ids)
+        bytes_ = self._bits[(pos >> np.uint64(3)).astype(np.intp)]
+        bits = (bytes_ >> (pos & np.uint64(7)).astype(np.uint8)) & np.uint8(1)
+        return bits.all(axis=1)
+
+    def flush(self, generation: int) -> None:
+        """Record the store generation this filter now reflects and sync to disk."""
+        self.generation = generation
+        _HEADER.pack_into(self._mm, 0, _MAGIC, self.m_bits, self.k, generation, self.count)
+        self._mm.flush()
+
+    def close(self) -> None:
+        del self._bits
+        self._mm.close()
@@ -0,0 +1,193 @@
+"""On-disk checkpoints of each pipeline stage's output.
+
+Every completed stage writes its NewsItem list (and, from summarization on,
+the Digest) as gzip-compressed compact JSON under ``state/checkpoints/``, and
+records itself in a small manifest. A later ``--resume`` / ``--from-stage``
+run reloads the preceding stage's checkpoint instead of repeating the
+network and LLM calls that produced it.
+"""
+from __future__ import annotations
+
+import gzip
+import json
+import logging
+import shutil
+from datetime import datetime, timezone
+from pathlib import Path
+
+from models import Digest, DigestSection, NewsItem, SourceType
+
+logger = logging.getLogger(__name__)
+
+CHECKPOINT_DIR = Path(__file__).parent / "state" / "checkpoints"
+MANIFEST_FILE = CHECKPOINT_DIR / "manifest.json"
+
+STAGES = ("fetch", "dedup", "cluster", "score", "rerank", "enrich", "summarize", "email", "export")
+
+
+# ---------------------------------------------------------------------------
+# Serialization
+# ---------------------------------------------------------------------------
+
+def item_to_dict(item: NewsItem) -> dict:
+    return {
+        "title": item.title,
+        "url": item.url,
+        "canonical_url": item.canonical_url,
+        "source_name": item.source_name,
+        "source_type": item.source_type.value,
+        "published": item.published.isoformat() if item.published else None,
+        "content_snippet": item.content_snippet,
+        "score": item.score,
+        "matched_topics": item.matched_topics,
+        "summary": item.summary,
+        "extra": item.extra,
+    }
+
+
+def item_from_dict(data: dict) -> NewsItem:
+    return NewsItem(
+        title=data["title"],
+        url=data["url"],
+        source_name=data["source_name"],
+        source_type=SourceType(data["source_type"]),
+        published=datetime.fromisoformat(data["published"]) if data.get("published") else None,
+        content_snippet=data.get("content_snippet", ""),
+        score=data.get("score", 0.0),
+        matched_topics=list(data.get("matched_topics", [])),
+        summary=data.get("summary", ""),
+        extra=dict(data.get("extra", {})),
+        canonical_url=data.get("canonical_url"),
+    )
+
+
+def _digest_to_dict(digest: Digest, index: dict[int, int]) -> dict:
+    """Serialize a digest, referring to its items by position in the item list."""
+    return {
+        "generated_at": digest.generated_at.isoformat(),
+        "intro_summary": digest.intro_summary,
+        "sections": [
+            {"title": s.title, "items": [index[id(item)] for item in s.items]}
+            for s in digest.sections
+        ],
+        "total_items": digest.total_items,
+        "sources_checked": digest.sources_checked,
+        "project_recommendations": digest.project_recommendations,
+    }
+
+
+def _digest_from_dict(data: dict, items: list[NewsItem]) -> Digest:
+    return Digest(
+        generated_at=datetime.fromisoformat(data["generated_at"]),
+        intro_summary=data["intro_summary"],
+        sections=[
+            DigestSection(title=s["title"], items=[items[i] for i in s["items"]])
+            for s in data["sections"]
+        ],
+        total_items=data["total_items"],
+        sources_checked=data["sources_checked"],
+        project_recommendations=data.get("project_recommendations", "[]"),
+    )
+
+
+# ---------------------------------------------------------------------------
+# Store
+# ---------------------------------------------------------------------------
+
+def _stage_file(stage: str) -> Path:
+    return CHECKPOINT_DIR / f"{stage}.json.gz"
+
+
+def _read_manifest() -> dict:
+    if not MANIFEST_FILE.exists():
+        return {"completed": []}
+    try:
+        return json.loads(MANIFEST_FILE.read_text())
+    except Exception as e:
+        logger.warning("Failed to read checkpoint manifest: %s", e)
+        return {"completed": []}
+
+
+def start_run() -> None:
+    """Discard the previous run's checkpoints."""
+    if CHECKPOINT_DIR.exists():
+        shutil.rmtree(CHECKPOINT_DIR)
+    CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+    MANIFEST_FILE.write_text(json.dumps({
+        "run_started": datetime.now(timezone.utc).isoformat(),
+        "completed": [],
+    }))
+
+
+def save(
+    stage: str,
+    items: list[NewsItem],
+    digest: Digest | None = None,
+    meta: dict | None = None,
+) -> None:
+    """Checkpoint a completed stage's output."""
+    index = {id(item): i for i, item in enumerate(items)}
+    if digest is not None:
+        # Digest items normally come from ``items``; keep any that do not
+        for section in digest.sections:
+            for item in section.items:
+                if id(item) not in index:
+                    index[id(item)] = len(items)
+                    items = items + [item]
+    payload = {
+        "stage": stage,
+        "items": [item_to_dict(item) for item in items],
+        "digest": _digest_to_dict(digest, index) if digest is not None else None,
+        "meta": meta or {},
+    }
+    CHECKPOINT_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = _stage_file(stage).with_suffix(".tmp")
+    with gzip.open(tmp, "wt", encoding="utf-8") as f:
+        json.dump(payload, f, separators=(",", ":"), ensure_ascii=False)
+    tmp.replace(_stage_file(stage))
+
+    manifest = _read_manifest()
+    completed = [s for s in manifest.get("completed", []) if s != stage]
+    completed.append(stage)
+    manifest["completed"] = completed
+    MANIFEST_FILE.write_text(json.dumps(manifest))
+    logger.info("Checkpointed stage '%s' (%d items)", stage, len(items))
+
+
+def load(stage: str) -> tuple[list[NewsItem], Digest | None, dict]:
+    """Reload a stage's checkpoint as (items, digest, meta)."""
+    with gzip.open(_stage_file(stage), "rt", encoding="utf-8") as f:
+        payload = json.load(f)
+    items = [item_from_dict(d) for d in payload["items"]]
+    digest = _digest_from_dict(payload["digest"], items) if payload.get("digest") else None
+    return items, digest, payload.get("meta", {})
+
+
+def resume_stage(from_stage: str | None = None) -> tuple[str | None, str | None]:
+    """Work out where a resumed run starts.
+
+    Returns (stage to start at, checkpoint stage to load). With ``from_stage``
+    the checkpoint is the stage right before it, which must have completed;
+    otherwise it is the latest completed stage overall. The start stage is
+    None when every stage already completed.
+    """
+    completed = set(_read_manifest().get("completed", []))
+    completed = {s for s in completed if _stage_file(s).exists()}
+
+    if from_stage is not None:
+        if from_stage not in STAGES:
+            raise ValueError(f"Unknown stage '{from_stage}' (expected one of {', '.join(STAGES)})")
+        idx = STAGES.index(from_stage)
+        if idx == 0:
+            return from_stage, None
+        previous = STAGES[idx - 1]
+        if previous not in completed:
+            raise ValueError(f"No '{previous}' checkpoint to resume stage '{from_stage}' from")
+        return from_stage, previous
+
+    done = [s for s in STAGES if s in completed]
+    if not done:
+        return STAGES[0], None
+    last = done[-1]
+    following = STAGES[STAGES.index(last) + 1 :]
+    return (following[0] if following else None), last
@@ -0,0 +1,143 @@
+"""Near-duplicate story clustering across sources.
+
+The same announcement often arrives from Reddit, a news feed and YouTube
+under different URLs, so exact-URL dedup keeps all three. Each item gets a
+64-bit SimHash of its normalized title and snippet; items within a small
+Hamming distance are merged into the first one seen. Signatures of items
+sent are persisted in the seen store, so repeats from earlier days are
+dropped too.
+
+The clustering state (each representative's signature, computed from the
+fetched snippet before enrichment replaces it, and the ids folded into it)
+is kept in the index, not on the items, so none of it reaches the exports.
+``cluster_state`` hands it to the run's checkpointed metadata for save_seen.
+"""
+from __future__ import annotations
+
+import hashlib
+import logging
+import re
+from typing import Iterable
+
+import numpy as np
+
+from models import NewsItem
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_DISTANCE = 3
+SNIPPET_TOKENS = 40
+TITLE_WEIGHT = 3
+_BANDS = 4  # 64 bits in 4 bands of 16: any pair within 3 bits shares a band
+_BAND_BITS = 64 // _BANDS
+
+_URL_RE = re.compile(r"https?://\S+")
+_NON_WORD_RE = re.compile(r"[^a-z0-9]+")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was "
+    "were will with you your new how why what".split()
+)
+
+
+def _tokens(text: str) -> list[str]:
+    text = _URL_RE.sub(" ", text.lower())
+    return [t for t in _NON_WORD_RE.sub(" ", text).split() if t not in _STOPWORDS]
+
+
+def _features(item: NewsItem) -> list[tuple[str, int]]:
+    """Weighted features: title unigrams and bigrams, then leading snippet words."""
+    title = _tokens(item.title)
+    features = [(t, TITLE_WEIGHT) for t in title]
+    features += [(f"{a} {b}", TITLE_WEIGHT) for a, b in zip(title, title[1:])]
+    features += [(t, 1) for t in _tokens(item.content_snippet)[:SNIPPET_TOKENS]]
+    return features
+
+
+def simhash(item: NewsItem) -> int:
+    """64-bit SimHash of an item's normalized title and snippet."""
+    features = _features(item)
+    if not features:
+        return 0
+    digests = b"".join(hashlib.blake2b(f.encode(), digest_size=8).digest() for f, _ in features)
+    bits = np.unpackbits(np.frombuffer(digests, dtype=np.uint8)).reshape(len(features), 64)
+    weights = np.array([w for _, w in features], dtype=np.int64)
+    totals = ((bits.astype(np.int64) * 2 - 1) * weights[:, None]).sum(axis=0)
+    return int("".join("1" if t > 0 else "0" for t in totals), 2)
+
+
+def _bands(sig: int) -> list[int]:
+    mask = (1 << _BAND_BITS) - 1
+    return [(sig >> (i * _BAND_BITS)) & mask for i in range(_BANDS)]
+
+
+class NearDupIndex:
+    """Incremental LSH index over SimHash signatures.
+
+    ``add`` either registers an item as a new cluster representative or folds
+    it into an existing one. Historical signatures (items sent in earlier
+    digests) only act as a blocklist.
+    """
+
+    def __init__(self, max_distance: int = DEFAULT_MAX_DISTANCE, history: Iterable[int] = ()):
+        if max_distance >= _BANDS:
+            raise ValueError(f"max_distance must be below {_BANDS} for banded lookup")
+        self.max_distance = max_distance
+        self._buckets: list[dict[int, list[int]]] = [{} for _ in range(_BANDS)]
+        self._sigs: list[int] = []
+        self._reps: list[NewsItem | None] = []  # None marks a historical signature
+        self.merged = 0
+        self.dropped_history = 0
+        self._rep_sigs: dict[str, int] = {}  # representative id -> signature
+        self._merged_ids: dict[str, list[str]] = {}  # representative id -> ids folded into it
+        for sig in history:
+            self._insert(sig, None)
+
+    def _insert(self, sig: int, item: NewsItem | None) -> None:
+        idx = len(self._sigs)
+        self._sigs.append(sig)
+        self._reps.append(item)
+        for band, value in enumerate(_bands(sig)):
+            self._buckets[band].setdefault(value, []).append(idx)
+
+    def _match(self, sig: int) -> int | None:
+        for band, value in enumerate(_bands(sig)):
+            for idx in self._buckets[band].get(value, ()):
+                if (self._sigs[idx] ^ sig).bit_count() <= self.max_distance:
+                    return idx
+        return None
+
+    def add(self, item: NewsItem) -> bool:
+        """Index an item; returns True if it is a new representative to keep."""
+        sig = simhash(item)
+        if sig == 0:
+            return True  # nothing to compare on
+        idx = self._match(sig)
+        if idx is None:
+            self._insert(sig, item)
+            self._rep_sigs[item.id] = sig
+            return True
+
+        rep = self._reps[idx]
+        if rep is None:
+            self.dropped_history += 1
+            logger.debug("Near-duplicate of an earlier digest item: %s", item.title[:60])
+            return False
+
+        self._merged_ids.setdefault(rep.id, []).append(item.id)
+        self.merged += 1
+        logger.debug("Merged '%s' into '%s'", item.title[:60], rep.title[:60])
+        return False
+
+    def cluster_state(self, items: list[NewsItem]) -> dict[str, dict]:
+        """JSON-ready state of the given representatives: {id: {"simhash", "merged"}}."""
+        state = {}
+        for item in items:
+            sig = self._rep_sigs.get(item.id)
+            if sig is not None:
+                state[item.id] = {"simhash": f"{sig:016x}", "merged": self._merged_ids.get(item.id, [])}
+        return state
+
+
+def cluster_near_duplicates(items: list[NewsItem], index: NearDupIndex) -> list[NewsItem]:
+    """Return one representative per near-duplicate cluster, in input order."""
+    return [item for item in items if index.add(item)]
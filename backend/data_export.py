@@ -5,6 +5,7 @@ import json
 import logging
 from pathlib import Path
 
+import telemetry
 from models import Digest
 
 logger = logging.getLogger(__name__)
@@ -85,6 +86,11 @@ def _update_index(digest: Digest) -> None:
 
 def save_digest_json(digest: Digest) -> None:
     """Write digest data as JSON files for the web dashboard."""
+    with telemetry.span("export.json"):
+        _save_digest_json(digest)
+
+
+def _save_digest_json(digest: Digest) -> None:
     DATA_DIR.mkdir(parents=True, exist_ok=True)
     DIGESTS_DIR.mkdir(parents=True, exist_ok=True)
 
@@ -2,47 +2,336 @@ from __future__ import annotations
 
 import json
 import logging
+import secrets
+import sqlite3
+import time
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
+from typing import Iterable
 
-from models import NewsItem
+from bloom import BloomFilter
+from data_export import DIGESTS_DIR
+from feed_cache import FEED_CACHE_FILE
+from models import NewsItem, canonical_id, item_id
+from urlcanon import CANON_VERSION
 
 logger = logging.getLogger(__name__)
 
-STATE_FILE = Path(__file__).parent / "state" / "seen_items.json"
+STATE_DIR = Path(__file__).parent / "state"
+STORE_FILE = STATE_DIR / "seen_items.sqlite3"
+LEGACY_STATE_FILE = STATE_DIR / "seen_items.json"
+BLOOM_FILE = STATE_DIR / "cache" / "seen_items.bloom"
+RETENTION_DAYS = 30
+BLOOM_CAPACITY = 1_000_000
+BLOOM_ERROR_RATE = 0.01
+_QUERY_CHUNK = 500  # stay well under SQLite's bound-parameter limit
 
 
-def load_seen() -> dict[str, str]:
-    """Load seen item IDs with their timestamps. Returns {id: iso_timestamp}."""
-    if not STATE_FILE.exists():
-        return {}
+def _id_bytes(item_id: str) -> bytes:
+    """16-hex NewsItem.id -> 8 raw bytes."""
+    return bytes.fromhex(item_id)
+
+
+def _to_int64(sig: int) -> int:
+    """Unsigned 64-bit signature -> SQLite's signed INTEGER range."""
+    return sig - (1 << 64) if sig >= 1 << 63 else sig
+
+
+def _from_int64(value: int) -> int:
+    return value + (1 << 64) if value < 0 else value
+
+
+class SeenStore:
+    """Seen item IDs in SQLite: 8-byte id -> integer unix timestamp.
+
+    Lookups and inserts touch only the rows involved, and pruning is a range
+    delete on the seen_at index, so neither grows with the size of history.
+
+    A memory-mapped Bloom filter sits in front of the lookups: ids it rules
+    out are new without touching the database, and only probable hits are
+    checked exactly. Each commit stamps the store with a random generation;
+    the filter records the generation it reflects and is rebuilt from the
+    store whenever they differ. New ids are added to the filter as they are
+    stored. Pruned ids keep their bits, so ``count`` covers every id added
+    since the last rebuild. The filter is only rebuilt once that count passes
+    the capacity it was sized for, which is when the false-positive rate
+    would rise above ``bloom_error_rate``.
+
+    The same database keeps the SimHash signatures of sent items, with the
+    same retention, so near-duplicates are caught across days as well.
+    """
+
+    def __init__(
+        self,
+        path: Path = STORE_FILE,
+        bloom_path: Path | None = BLOOM_FILE,
+        bloom_capacity: int = BLOOM_CAPACITY,
+        bloom_error_rate: float = BLOOM_ERROR_RATE,
+    ):
+        self.path = path
+        self.bloom_path = bloom_path
+        self.bloom_capacity = bloom_capacity
+        self.bloom_error_rate = bloom_error_rate
+        self._bloom: BloomFilter | None = None
+        self.bloom_rejects = 0
+        self.exact_lookups = 0
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path))
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            " id BLOB PRIMARY KEY,"
+            " seen_at INTEGER NOT NULL"
+            ") WITHOUT ROWID"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_seen_at ON seen(seen_at)")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS signatures ("
+            " sig INTEGER NOT NULL,"
+            " seen_at INTEGER NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_signatures_seen_at ON signatures(seen_at)")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+        self._conn.commit()
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def __contains__(self, item_id: str) -> bool:
+        return bool(self.contains_many([item_id]))
+
+    def get_meta(self, key: str) -> str | None:
+        row = self._conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+        return row[0] if row else None
+
+    def set_meta(self, key: str, value: str) -> None:
+        self._conn.execute("INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)", (key, value))
+
+    @property
+    def generation(self) -> int:
+        return int(self.get_meta("generation") or 0)
+
+    def _bloom_filter(self) -> BloomFilter | None:
+        """Open the Bloom filter, rebuilding it if it is missing or stale."""
+        if self._bloom is not None or self.bloom_path is None:
+            return self._bloom
+        try:
+            bloom = BloomFilter.open(self.bloom_path)
+            # A rebuild may have sized the file above the configured capacity
+            self.bloom_capacity = max(self.bloom_capacity, bloom.capacity(self.bloom_error_rate))
+            if bloom.generation == self.generation and bloom.count <= self.bloom_capacity:
+                self._bloom = bloom
+                return bloom
+            bloom.close()
+        except (OSError, ValueError):
+            pass
+        return self._rebuild_bloom()
+
+    def _rebuild_bloom(self) -> BloomFilter | None:
+        if self._bloom is not None:
+            self._bloom.close()
+            self._bloom = None
+        try:
+            size = len(self)
+            self.bloom_capacity = max(self.bloom_capacity, 2 * size)
+            bloom = BloomFilter.create(self.bloom_path, self.bloom_capacity, self.bloom_error_rate)
+            cursor = self._conn.execute("SELECT id FROM seen")
+            while rows := cursor.fetchmany(50_000):
+                bloom.add([row[0].hex() for row in rows])
+            bloom.flush(self.generation)
+        except OSError as e:
+            logger.warning("Bloom filter unavailable, using exact lookups only: %s", e)
+            self.bloom_path = None
+            return None
+        logger.info("Rebuilt seen-item Bloom filter (%d ids, %d KiB)", size, bloom.m_bits // 8 // 1024)
+        self._bloom = bloom
+        return bloom
+
+    def contains_many(self, item_ids: Iterable[str]) -> set[str]:
+        """Return the subset of item_ids already in the store."""
+        ids = list(dict.fromkeys(item_ids))
+        bloom = self._bloom_filter()
+        if bloom is not None and ids:
+            maybe = bloom.might_contain(ids)
+            self.bloom_rejects += int(len(ids) - maybe.sum())
+            ids = [i for i, hit in zip(ids, maybe) if hit]
+        self.exact_lookups += len(ids)
+
+        found: set[str] = set()
+        for start in range(0, len(ids), _QUERY_CHUNK):
+            chunk = [_id_bytes(i) for i in ids[start : start + _QUERY_CHUNK]]
+            placeholders = ",".join("?" * len(chunk))
+            rows = self._conn.execute(f"SELECT id FROM seen WHERE id IN ({placeholders})", chunk)
+            found.update(row[0].hex() for row in rows)
+        return found
+
+    def add(self, item_ids: Iterable[str], seen_at: int) -> None:
+        self.add_rows((i, seen_at) for i in item_ids)
+
+    def add_rows(self, rows: Iterable[tuple[str, int]]) -> None:
+        """Insert (item_id, seen_at) pairs."""
+        rows = list(rows)
+        # Open (or rebuild) the filter first, so a rebuild does not count these ids twice
+        bloom = self._bloom_filter()
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO seen (id, seen_at) VALUES (?, ?)",
+            ((_id_bytes(i), ts) for i, ts in rows),
+        )
+        # Set bits before the store commits, so the filter is never missing an id
+        if bloom is not None:
+            bloom.add([i for i, _ in rows])
+
+    def signatures(self) -> list[int]:
+        """SimHash signatures of items sent in earlier digests (see cluster.py)."""
+        return [_from_int64(row[0]) for row in self._conn.execute("SELECT sig FROM signatures")]
+
+    def add_signatures(self, sigs: Iterable[int], seen_at: int) -> None:
+        self._conn.executemany(
+            "INSERT INTO signatures (sig, seen_at) VALUES (?, ?)",
+            ((_to_int64(sig), seen_at) for sig in sigs),
+        )
+
+    def rekey(self, pairs: Iterable[tuple[str, str]]) -> int:
+        """Copy each old id's entry to its new id; returns how many were added."""
+        bloom = self._bloom_filter()
+        added: list[str] = []
+        for old, new in pairs:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO seen (id, seen_at) SELECT ?, seen_at FROM seen WHERE id = ?",
+                (_id_bytes(new), _id_bytes(old)),
+            )
+            if cursor.rowcount > 0:
+                added.append(new)
+        if bloom is not None:
+            bloom.add(added)
+        return len(added)
+
+    def prune(self, before: int) -> int:
+        """Delete entries seen before the given unix timestamp."""
+        self._conn.execute("DELETE FROM signatures WHERE seen_at < ?", (before,))
+        return self._conn.execute("DELETE FROM seen WHERE seen_at < ?", (before,)).rowcount
+
+    def commit(self) -> None:
+        generation = secrets.randbits(63)
+        self.set_meta("generation", str(generation))
+        self._conn.commit()
+        if self._bloom is not None and self._bloom.count > self.bloom_capacity:
+            # Live and pruned ids together have filled the filter; drop the pruned ones' bits
+            self._rebuild_bloom()
+        elif self._bloom is not None:
+            self._bloom.flush(generation)
+
+    def close(self) -> None:
+        if self._bloom is not None:
+            self._bloom.close()
+            self._bloom = None
+        self._conn.close()
+
+
+def _migrate_legacy(store: SeenStore) -> None:
+    """One-time import of the old seen_items.json into the store.
+
+    Without it, a new (empty) store is seeded from the exported digests, so
+    losing the cached store does not resend what earlier digests carried.
+    """
+    if not LEGACY_STATE_FILE.exists():
+        if not len(store):
+            _seed_from_digests(store)
+        return
     try:
-        return json.loads(STATE_FILE.read_text())
+        legacy = json.loads(LEGACY_STATE_FILE.read_text())
+        rows = [(k, int(datetime.fromisoformat(v).timestamp())) for k, v in legacy.items()]
+        store.add_rows(rows)
+        store.commit()
+        LEGACY_STATE_FILE.unlink()
+        logger.info("Migrated %d seen items from %s", len(rows), LEGACY_STATE_FILE.name)
     except Exception as e:
-        logger.warning("Failed to load seen items: %s", e)
-        return {}
+        logger.warning("Failed to migrate legacy seen items: %s", e)
 
 
-def filter_new(items: list[NewsItem], seen: dict[str, str]) -> list[NewsItem]:
-    """Return only items not previously seen."""
-    return [item for item in items if item.id not in seen]
+def _seed_from_digests(store: SeenStore) -> None:
+    now = int(time.time())
+    ids = set()
+    for path in DIGESTS_DIR.glob("*.json"):
+        try:
+            digest = json.loads(path.read_text(encoding="utf-8"))
+            ids.update(canonical_id(i["url"]) for s in digest.get("sections", []) for i in s.get("items", []))
+        except Exception as e:
+            logger.warning("Skipping %s while seeding seen items: %s", path.name, e)
+    if ids:
+        store.add(ids, now)
+        store.commit()
+        logger.info("Seeded seen items with %d ids from past digests", len(ids))
+
+
+def _known_urls() -> set[str]:
+    """Raw URLs we may have stored ids for: past digests and cached feed entries."""
+    urls: set[str] = set()
+    for path in DIGESTS_DIR.glob("*.json"):
+        try:
+            digest = json.loads(path.read_text(encoding="utf-8"))
+            urls.update(i["url"] for s in digest.get("sections", []) for i in s.get("items", []))
+        except Exception as e:
+            logger.warning("Skipping %s while rekeying seen items: %s", path.name, e)
+    if FEED_CACHE_FILE.exists():
+        try:
+            feeds = json.loads(FEED_CACHE_FILE.read_text(encoding="utf-8"))
+            urls.update(e["link"] for f in feeds.values() for e in f.get("entries") or [])
+        except Exception as e:
+            logger.warning("Skipping feed cache while rekeying seen items: %s", e)
+    return urls
+
+
+def _rekey_canonical(store: SeenStore) -> None:
+    """One-time pass that adds canonical-URL ids for entries stored under raw URLs.
 
+    The store only holds hashes, so the raw URLs come from past digests and
+    the feed cache. Old ids are left to age out with the retention window.
+    """
+    if store.get_meta("canon_version") == str(CANON_VERSION):
+        return
+    pairs = [(item_id(url), canonical_id(url)) for url in _known_urls()]
+    rekeyed = store.rekey((old, new) for old, new in pairs if old != new)
+    store.set_meta("canon_version", str(CANON_VERSION))
+    store.commit()
+    logger.info("Rekeyed %d seen items to canonical URLs (%d URLs checked)", rekeyed, len(pairs))
+
+
+def load_seen(path: Path = STORE_FILE, bloom_capacity: int = BLOOM_CAPACITY) -> SeenStore:
+    """Open the seen-item store, importing legacy state and rekeying on first use."""
+    store = SeenStore(path, bloom_capacity=bloom_capacity)
+    _migrate_legacy(store)
+    _rekey_canonical(store)
+    return store
+
+
+def filter_new(items: list[NewsItem], seen: SeenStore) -> list[NewsItem]:
+    """Return only items not previously seen."""
+    found = seen.contains_many(item.id for item in items)
+    return [item for item in items if item.id not in found]
 
-def save_seen(seen: dict[str, str], new_items: list[NewsItem]) -> None:
-    """Add new items to seen state, prune entries older than 30 days, and save."""
-    now = datetime.now(timezone.utc)
-    cutoff = now - timedelta(days=30)
 
-    # Add new items
-    for item in new_items:
-        seen[item.id] = now.isoformat()
+def save_seen(
+    seen: SeenStore,
+    new_items: list[NewsItem],
+    retention_days: int = RETENTION_DAYS,
+    clusters: dict[str, dict] | None = None,
+) -> None:
+    """Add new items to seen state, prune entries past the retention window, and save.
 
-    # Prune old entries
-    pruned = {
-        k: v for k, v in seen.items()
-        if datetime.fromisoformat(v) > cutoff
-    }
+    ``clusters`` is ``NearDupIndex.cluster_state`` for the items: the ids
+    merged into each count as seen too, and its signatures are stored.
+    """
+    now = int(time.time())
+    cutoff = int((datetime.now(timezone.utc) - timedelta(days=retention_days)).timestamp())
 
-    STATE_FILE.parent.mkdir(parents=True, exist_ok=True)
-    STATE_FILE.write_text(json.dumps(pruned, indent=2))
-    logger.info("Saved %d seen items (%d pruned)", len(pruned), len(seen) - len(pruned))
+    seen.add((item.id for item in new_items), now)
+    entries = [clusters[item.id] for item in new_items if clusters and item.id in clusters]
+    seen.add((merged_id for entry in entries for merged_id in entry["merged"]), now)
+    # Signatures come from clustering: the snippets have been replaced by article text since
+    seen.add_signatures((int(entry["simhash"], 16) for entry in entries), now)
+    pruned = seen.prune(cutoff)
+    seen.commit()
+    logger.info(
+        "Saved %d seen items (%d pruned); Bloom filter skipped %d of %d lookups",
+        len(seen), pruned, seen.bloom_rejects, seen.bloom_rejects + seen.exact_lookups,
+    )
@@ -2,20 +2,50 @@ from __future__ import annotations
 
 import json
 import logging
-import os
+import queue
 import smtplib
-from email.mime.multipart import MIMEMultipart
-from email.mime.text import MIMEText
+import threading
+import uuid
+from dataclasses import dataclass, field
+from email import quoprimime
+from email.message import EmailMessage
+from email.policy import SMTP
+from email.utils import formatdate, make_msgid
+from functools import lru_cache
 from pathlib import Path
+from typing import Callable
+from urllib.parse import quote
 
-from jinja2 import Environment, FileSystemLoader
-from supabase import create_client
+from jinja2 import Environment, FileSystemBytecodeCache, FileSystemLoader
+from markupsafe import Markup
 
+import telemetry
 from models import Digest
+from supabase_client import get_client
 
 logger = logging.getLogger(__name__)
 
 TEMPLATE_DIR = Path(__file__).parent / "templates"
+BYTECODE_CACHE_DIR = Path(__file__).parent / "state" / "cache" / "jinja"
+# Stands in for the per-recipient footer when the shared body is rendered
+_FOOTER_MARKER = "<!--recipient-footer-->"
+
+
+@lru_cache(maxsize=None)
+def template_env(bytecode_cache: bool = True) -> Environment:
+    """The process-wide Jinja environment; templates compile once and stay cached.
+
+    With ``bytecode_cache`` the compiled templates are also kept on disk under
+    state/cache/jinja, so later runs skip compilation too.
+    """
+    cache = None
+    if bytecode_cache:
+        try:
+            BYTECODE_CACHE_DIR.mkdir(parents=True, exist_ok=True)
+            cache = FileSystemBytecodeCache(str(BYTECODE_CACHE_DIR))
+        except OSError as e:
+            logger.warning("Template bytecode cache unavailable: %s", e)
+    return Environment(loader=FileSystemLoader(str(TEMPLATE_DIR)), bytecode_cache=cache, auto_reload=False)
 
 
 def _parse_picks(digest: Digest) -> list[dict]:
@@ -29,11 +59,33 @@ def _parse_picks(digest: Digest) -> list[dict]:
     return []
 
 
-def render_html(digest: Digest) -> str:
+def render_html(digest: Digest, recipient_footer: str = "", env: Environment | None = None) -> str:
     """Render the digest as HTML using the Jinja2 template."""
-    env = Environment(loader=FileSystemLoader(str(TEMPLATE_DIR)))
-    template = env.get_template("digest.html")
-    return template.render(digest=digest, project_picks=_parse_picks(digest))
+    template = (env or template_env()).get_template("digest.html")
+    return template.render(
+        digest=digest,
+        project_picks=_parse_picks(digest),
+        recipient_footer=Markup(recipient_footer),
+    )
+
+
+def render_html_split(digest: Digest, env: Environment | None = None) -> tuple[str, str]:
+    """Render the shared HTML once, as the parts before and after the recipient footer.
+
+    Both parts end at a line break, so each can be transfer-encoded on its own.
+    """
+    html = render_html(digest, _FOOTER_MARKER, env)
+    marker = html.index(_FOOTER_MARKER)
+    line_start = html.rfind("\n", 0, marker) + 1
+    line_end = html.index("\n", marker) + 1
+    return html[:line_start], html[line_end:]
+
+
+def render_recipient_footer(unsubscribe_url: str, env: Environment | None = None) -> tuple[str, str]:
+    """(plain, html) footer lines for one recipient."""
+    template = (env or template_env()).get_template("recipient_footer.html")
+    html = template.render(unsubscribe_url=unsubscribe_url)
+    return f"Unsubscribe: {unsubscribe_url}\n", html.rstrip("\n") + "\n"
 
 
 def render_plaintext(digest: Digest) -> str:
@@ -67,54 +119,285 @@ def render_plaintext(digest: Digest) -> str:
     return "\n".join(lines)
 
 
-def _get_subscriber_emails() -> list[str]:
-    """Fetch confirmed subscriber emails from Supabase."""
-    url = os.getenv("SUPABASE_URL", "")
-    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
-    if not url or not key:
-        return []
+def _get_subscribers() -> dict[str, dict]:
+    """Fetch confirmed subscribers from Supabase as {email: {"id", "unsub_token"}}."""
+    client = get_client()
+    if client is None:
+        return {}
     try:
-        client = create_client(url, key)
-        result = client.table("subscribers").select("email").eq("confirmed", True).execute()
-        return [row["email"] for row in (result.data or [])]
+        result = (
+            client.table("subscribers").select("id, email, unsub_token").eq("confirmed", True).execute()
+        )
+        return {row["email"]: row for row in (result.data or [])}
     except Exception as e:
         logger.warning("Failed to fetch subscribers: %s", e)
-        return []
+        return {}
+
+
+# ---------------------------------------------------------------------------
+# Delivery
+# ---------------------------------------------------------------------------
+
+DEFAULT_CONNECTIONS = 2
+DEFAULT_MESSAGES_PER_CONNECTION = 100
+DEFAULT_MAX_ATTEMPTS = 3
+
+
+@dataclass
+class DeliveryReport:
+    delivered: list[str] = field(default_factory=list)
+    failed: dict[str, str] = field(default_factory=dict)  # email -> last error
+    subscriber_ids: list[str] = field(default_factory=list)  # delivered subscribers
+
+
+class _PreparedMessage:
+    """A multipart message whose shared parts are encoded once.
+
+    Each body is kept as quoted-printable segments around the recipient
+    footer. Quoted-printable works line by line and every segment ends at a
+    line break, so per recipient only the footer and a few headers are
+    encoded and the rest is reused byte for byte.
+    """
+
+    def __init__(
+        self,
+        sender: str,
+        subject: str,
+        plain: tuple[str, str],
+        html: tuple[str, str],
+        footer_for: Callable[[str], tuple[str, str]] | None = None,
+    ):
+        self.boundary = "=_digest_" + uuid.uuid4().hex
+        envelope = EmailMessage(policy=SMTP)
+        envelope["Subject"] = subject
+        envelope["From"] = sender
+        envelope["MIME-Version"] = "1.0"
+        envelope["Content-Type"] = f'multipart/alternative; boundary="{self.boundary}"'
+        self.headers = envelope.as_bytes().split(b"\r\n\r\n", 1)[0]
+        self.plain = tuple(self._encode(part) for part in plain)
+        self.html = tuple(self._encode(part) for part in html)
+        self.footer_for = footer_for
+
+    @staticmethod
+    def _encode(text: str) -> bytes:
+        # body_encode works on code points 0-255, so hand it the UTF-8 bytes
+        return quoprimime.body_encode(text.encode("utf-8").decode("latin-1"), eol="\r\n").encode("ascii")
+
+    def _part(self, subtype: str, body: tuple[bytes, bytes], footer: bytes) -> bytes:
+        return b"".join((
+            f"--{self.boundary}\r\n"
+            f"Content-Type: text/{subtype}; charset=\"utf-8\"\r\n"
+            "Content-Transfer-Encoding: quoted-printable\r\n\r\n".encode(),
+            body[0], footer, body[1], b"\r\n",
+        ))
+
+    def for_recipient(self, recipient: str) -> bytes:
+        plain_footer, html_footer = self.footer_for(recipient) if self.footer_for else ("", "")
+        return b"".join((
+            f"To: {recipient}\r\nMessage-ID: {make_msgid()}\r\nDate: {formatdate()}\r\n".encode(),
+            self.headers,
+            b"\r\n\r\n",
+            self._part("plain", self.plain, self._encode(plain_footer)),
+            self._part("html", self.html, self._encode(html_footer)),
+            f"--{self.boundary}--\r\n".encode(),
+        ))
+
 
+class _DeliveryPool:
+    """Sends one prepared message to many recipients over a few SMTP connections.
 
-def send_digest(digest: Digest, config: dict) -> None:
-    """Send the digest email via Gmail SMTP to config recipients + subscribers."""
+    Each worker thread owns one connection and reconnects after
+    ``messages_per_connection`` sends or any error. A recipient that fails
+    is requeued on its own, up to ``max_attempts`` times; refused addresses
+    and other permanent (5xx) errors are not retried. A rejected login, or
+    ``max_attempts`` connection failures in a row, stops the whole pool and
+    fails the remaining recipients, rather than logging in once per recipient.
+    """
+
+    def __init__(self, email_cfg: dict, message: _PreparedMessage):
+        self.cfg = email_cfg
+        self.message = message
+        self.sender = email_cfg["sender_email"]
+        self.connections = max(1, email_cfg.get("smtp_connections", DEFAULT_CONNECTIONS))
+        self.per_connection = max(1, email_cfg.get("max_messages_per_connection", DEFAULT_MESSAGES_PER_CONNECTION))
+        self.max_attempts = max(1, email_cfg.get("max_attempts", DEFAULT_MAX_ATTEMPTS))
+        self.report = DeliveryReport()
+        self._queue: queue.Queue[tuple[str, int]] = queue.Queue()
+        self._lock = threading.Lock()
+        self._connect_failures = 0  # consecutive, across workers
+        self._aborted: str | None = None
+
+    def _connect(self) -> smtplib.SMTP:
+        host, port = self.cfg["smtp_server"], self.cfg["smtp_port"]
+        if self.cfg.get("use_ssl", True):
+            server = smtplib.SMTP_SSL(host, port, timeout=30)
+        else:
+            server = smtplib.SMTP(host, port, timeout=30)
+            server.ehlo()
+            if server.has_extn("starttls"):
+                server.starttls()
+        if self.cfg.get("sender_password"):
+            server.login(self.sender, self.cfg["sender_password"])
+        return server
+
+    @staticmethod
+    def _close(server: smtplib.SMTP | None) -> None:
+        if server is None:
+            return
+        try:
+            server.quit()
+        except Exception:
+            server.close()
+
+    def _fail(self, recipient: str, error: str) -> None:
+        telemetry.incr("email.failed")
+        with self._lock:
+            self.report.failed[recipient] = error
+
+    def _abort(self, error: str) -> None:
+        with self._lock:
+            if self._aborted is None:
+                self._aborted = error
+                logger.error("Stopping delivery: %s", error)
+
+    def _connect_or_abort(self) -> smtplib.SMTP | None:
+        """Open a connection; on failure returns None, aborting the pool if it is hopeless."""
+        telemetry.incr("email.connections")
+        try:
+            server = self._connect()
+        except smtplib.SMTPAuthenticationError as e:
+            self._abort(f"SMTP login rejected: {e}")
+            return None
+        except Exception as e:
+            with self._lock:
+                self._connect_failures += 1
+                failures = self._connect_failures
+            logger.warning("SMTP connection failed (%d in a row): %s", failures, e)
+            if failures >= self.max_attempts:
+                self._abort(f"SMTP connection failed {failures} times in a row: {e}")
+            return None
+        with self._lock:
+            self._connect_failures = 0
+        return server
+
+    def _worker(self) -> None:
+        server: smtplib.SMTP | None = None
+        sent_on_connection = 0
+        while True:
+            try:
+                recipient, attempt = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if self._aborted:
+                self._fail(recipient, self._aborted)
+                continue
+            if server is None or sent_on_connection >= self.per_connection:
+                self._close(server)
+                sent_on_connection = 0
+                server = self._connect_or_abort()
+                if server is None:
+                    # Not the recipient's fault: requeue without using up an attempt
+                    self._queue.put((recipient, attempt))
+                    continue
+            try:
+                raw = self.message.for_recipient(recipient)
+                with telemetry.span("email.send"):
+                    server.sendmail(self.sender, [recipient], raw)
+                sent_on_connection += 1
+                telemetry.incr("email.sent")
+                telemetry.incr("email.bytes", len(raw))
+                with self._lock:
+                    self.report.delivered.append(recipient)
+                logger.debug("Sent to %s", recipient)
+            except smtplib.SMTPRecipientsRefused as e:
+                self._fail(recipient, str(e))
+            except (smtplib.SMTPDataError, smtplib.SMTPSenderRefused) as e:
+                if e.smtp_code >= 500:
+                    self._fail(recipient, str(e))  # permanent; smtplib has reset the session
+                else:
+                    self._close(server)
+                    server = None
+                    self._retry(recipient, attempt, e)
+            except Exception as e:
+                self._close(server)
+                server = None
+                self._retry(recipient, attempt, e)
+        self._close(server)
+
+    def _retry(self, recipient: str, attempt: int, error: Exception) -> None:
+        if attempt + 1 < self.max_attempts:
+            telemetry.incr("email.retries")
+            logger.warning("Send to %s failed (attempt %d), retrying: %s", recipient, attempt + 1, error)
+            self._queue.put((recipient, attempt + 1))
+        else:
+            self._fail(recipient, str(error))
+
+    def send(self, recipients: list[str]) -> DeliveryReport:
+        for recipient in recipients:
+            self._queue.put((recipient, 0))
+        workers = [
+            threading.Thread(target=self._worker, name=f"smtp-{i}", daemon=True)
+            for i in range(min(self.connections, len(recipients)))
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+        return self.report
+
+
+def send_digest(digest: Digest, config: dict) -> DeliveryReport:
+    """Send the digest email via SMTP to config recipients + subscribers.
+
+    Failed recipients are collected in the returned report rather than
+    aborting the rest; the call only raises if nobody could be reached.
+    """
     email_cfg = config["email"]
     sender = email_cfg["sender_email"]
-    password = email_cfg["sender_password"]
 
     # Merge config recipients with database subscribers, deduplicate
     config_recipients = email_cfg.get("recipients", [])
-    subscriber_emails = _get_subscriber_emails()
-    all_recipients = list(dict.fromkeys(config_recipients + subscriber_emails))
+    subscribers = _get_subscribers()
+    all_recipients = list(dict.fromkeys(config_recipients + list(subscribers)))
 
     if not all_recipients:
         logger.warning("No recipients to send to")
-        return
+        return DeliveryReport()
 
-    logger.info("Sending digest to %d recipients (%d subscribers)", len(all_recipients), len(subscriber_emails))
+    logger.info("Sending digest to %d recipients (%d subscribers)", len(all_recipients), len(subscribers))
 
-    html = render_html(digest)
-    plain = render_plaintext(digest)
+    # The digest body is rendered once; only the unsubscribe footer is per recipient
+    env = template_env(email_cfg.get("template_bytecode_cache", True))
+    with telemetry.span("email.render"):
+        html = render_html_split(digest, env)
+        plain = (render_plaintext(digest) + "\n", "")
     subject = f"AI News Digest - {digest.generated_at.strftime('%b %d, %Y')}"
 
-    try:
-        with smtplib.SMTP_SSL(email_cfg["smtp_server"], email_cfg["smtp_port"]) as server:
-            server.login(sender, password)
-            for recipient in all_recipients:
-                msg = MIMEMultipart("alternative")
-                msg["Subject"] = subject
-                msg["From"] = sender
-                msg["To"] = recipient
-                msg.attach(MIMEText(plain, "plain"))
-                msg.attach(MIMEText(html, "html"))
-                server.send_message(msg)
-                logger.info("Sent to %s", recipient)
-    except Exception as e:
-        logger.error("Failed to send email: %s", e)
-        raise
+    unsubscribe_url = email_cfg.get("unsubscribe_url") or ""
+
+    def footer_for(recipient: str) -> tuple[str, str]:
+        token = subscribers.get(recipient, {}).get("unsub_token")
+        if not unsubscribe_url or not token:
+            return "", ""
+        return render_recipient_footer(unsubscribe_url.format(token=quote(token, safe="")), env)
+
+    message = _PreparedMessage(sender, subject, plain, html, footer_for)
+    report = _DeliveryPool(email_cfg, message).send(all_recipients)
+    report.subscriber_ids = [subscribers[e]["id"] for e in report.delivered if e in subscribers]
+
+    logger.info("Delivered to %d/%d recipients", len(report.delivered), len(all_recipients))
+    for recipient, error in report.failed.items():
+        logger.error("Failed to send to %s: %s", recipient, error)
+    if report.failed and not report.delivered:
+        raise RuntimeError(f"Failed to send email to all {len(report.failed)} recipients")
+    return report
+
+
+def record_sends(digest_id: str, subscriber_ids: list[str]) -> None:
+    """Log deliveries to subscribers in newsletter_sends (needs the exported digest row)."""
+    client = get_client()
+    if client is None or not subscriber_ids:
+        return
+    rows = [{"digest_id": digest_id, "subscriber_id": sid} for sid in subscriber_ids]
+    client.table("newsletter_sends").insert(rows).execute()
+    logger.info("Recorded %d newsletter sends for digest %s", len(rows), digest_id)
@@ -0,0 +1,140 @@
+"""Disk-backed embedding store for semantic rerank.
+
+Vectors live in a memory-mapped float32 matrix (``embeddings.f32``) with a
+JSON index mapping sha256(model, text) to a row and its last-use time. Entries
+older than ``max_age_days`` are dropped on save, then the least recently used
+ones beyond ``max_entries``.
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(__file__).parent / "state" / "cache"
+MATRIX_FILE = CACHE_DIR / "embeddings.f32"
+INDEX_FILE = CACHE_DIR / "embeddings_index.json"
+
+
+def _key(model: str, text: str) -> str:
+    return hashlib.sha256(f"{model}\0{text}".encode()).hexdigest()[:32]
+
+
+class EmbeddingCache:
+    def __init__(
+        self,
+        max_entries: int = 5000,
+        max_age_days: float = 30,
+        matrix_file: Path = MATRIX_FILE,
+        index_file: Path = INDEX_FILE,
+    ):
+        self.max_entries = max_entries
+        self.max_age_days = max_age_days
+        self.matrix_file = matrix_file
+        self.index_file = index_file
+        self.dim = 0
+        self._lock = threading.Lock()
+        self._rows: dict[str, list] = {}       # key -> [row, last_used]
+        self._matrix: np.ndarray | None = None  # read-only memmap of saved rows
+        self._pending: dict[str, np.ndarray] = {}
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, **kwargs) -> EmbeddingCache:
+        cache = cls(**kwargs)
+        if not cache.index_file.exists() or not cache.matrix_file.exists():
+            return cache
+        try:
+            index = json.loads(cache.index_file.read_text())
+            dim = int(index["dim"])
+            rows = index["rows"]
+            if rows:
+                matrix = np.memmap(cache.matrix_file, dtype=np.float32, mode="r")
+                cache._matrix = matrix.reshape(-1, dim)
+                if len(cache._matrix) < len(rows):
+                    raise ValueError("matrix shorter than index")
+            cache.dim = dim
+            cache._rows = rows
+        except Exception as e:
+            logger.warning("Failed to load embedding cache, starting empty: %s", e)
+            cache._rows, cache._matrix, cache.dim = {}, None, 0
+        return cache
+
+    def __len__(self) -> int:
+        return len(self._rows) + len(self._pending)
+
+    def contains(self, model: str, text: str) -> bool:
+        key = _key(model, text)
+        with self._lock:
+            return key in self._pending or key in self._rows
+
+    def get(self, model: str, text: str) -> np.ndarray | None:
+        key = _key(model, text)
+        with self._lock:
+            vec = self._pending.get(key)
+            if vec is None and key in self._rows:
+                entry = self._rows[key]
+                entry[1] = time.time()
+                vec = np.array(self._matrix[entry[0]])
+            if vec is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return vec
+
+    def put(self, model: str, text: str, vector: np.ndarray) -> None:
+        vector = np.asarray(vector, dtype=np.float32)
+        with self._lock:
+            if not self.dim:
+                self.dim = len(vector)
+            if len(vector) != self.dim:
+                logger.warning("Embedding dim %d does not match cache dim %d; not cached", len(vector), self.dim)
+                return
+            self._pending[_key(model, text)] = vector
+
+    def save(self) -> None:
+        """Evict stale entries and rewrite the matrix compactly."""
+        with self._lock:
+            if not self._pending and not self._rows:
+                return
+            now = time.time()
+            cutoff = now - self.max_age_days * 86400
+            entries: list[tuple[float, str]] = [
+                (last_used, key) for key, (_, last_used) in self._rows.items()
+                if last_used >= cutoff and key not in self._pending
+            ]
+            entries.extend((now, key) for key in self._pending)
+            entries.sort(reverse=True)
+            keep = entries[: self.max_entries]
+
+            matrix = np.empty((len(keep), self.dim), dtype=np.float32)
+            rows: dict[str, list] = {}
+            for row, (last_used, key) in enumerate(keep):
+                pending = self._pending.get(key)
+                matrix[row] = pending if pending is not None else self._matrix[self._rows[key][0]]
+                rows[key] = [row, last_used]
+
+            # Release the old mapping before replacing the file (required on Windows)
+            self._matrix = None
+            self.matrix_file.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.matrix_file.with_suffix(".tmp")
+            matrix.tofile(tmp)
+            tmp.replace(self.matrix_file)
+            self.index_file.write_text(json.dumps({"dim": self.dim, "rows": rows}, separators=(",", ":")))
+
+            evicted = len(self._rows) + len(self._pending) - len(rows)
+            self._rows = rows
+            self._pending = {}
+            self._matrix = np.memmap(self.matrix_file, dtype=np.float32, mode="r").reshape(-1, self.dim) if rows else None
+        logger.info(
+            "Saved embedding cache (%d vectors, %d evicted, %d hits, %d misses)",
+            len(rows), evicted, self.hits, self.misses,
+        )
@@ -1,65 +1,315 @@
-"""Enrich news items with full article content via Firecrawl."""
+"""Enrich news items with full article content.
+
+Articles are fetched through the shared fetch session and their main content
+is extracted locally with readability-style heuristics; Firecrawl is only
+used, when a key is configured, for pages local extraction cannot handle.
+Parsing runs in a process pool so it does not hold the GIL. Extracted
+markdown is cached by canonical URL, so an article that scores on several
+runs is only fetched once per cache TTL.
+"""
 from __future__ import annotations
 
 import logging
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import os
+import re
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from pathlib import Path
 
 import requests
+from bs4 import BeautifulSoup, Tag
+from requests.adapters import HTTPAdapter
 
+import telemetry
+from fetchers import SESSION as FETCH_SESSION
+from kvcache import SqliteCache
 from models import NewsItem, SourceType
+from ratelimit import get_limiter, parse_retry_after
+from urlcanon import canonicalize
+
+try:
+    import lxml  # noqa: F401
+
+    _HTML_PARSER = "lxml"
+except ImportError:
+    _HTML_PARSER = "html.parser"
 
 logger = logging.getLogger(__name__)
 
-FIRECRAWL_URL = "https://api.firecrawl.dev/v1/scrape"
+FIRECRAWL_URL = os.getenv("FIRECRAWL_API_URL", "https://api.firecrawl.dev").rstrip("/") + "/v1/scrape"
 MAX_CONTENT_CHARS = 3000
+MIN_CONTENT_CHARS = 300  # Less than this and local extraction counts as failed
+MAX_HTML_BYTES = 2_000_000  # Download cap per article page
+READ_CHUNK_BYTES = 64 * 1024
+DEFAULT_MAX_CONCURRENCY = 4
+DEFAULT_PARSE_WORKERS = 2
+ENRICH_CACHE_FILE = Path(__file__).parent / "state" / "cache" / "enrich.sqlite3"
+
+SESSION = requests.Session()
+
+
+def _configure_pool(max_concurrency: int) -> None:
+    """Size the keep-alive pool to the worker count."""
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=max_concurrency)
+    SESSION.mount("https://", adapter)
+
+
+# ---------------------------------------------------------------------------
+# Local extraction
+# ---------------------------------------------------------------------------
+
+_DROP_TAGS = (
+    "script", "style", "noscript", "iframe", "svg", "form", "button",
+    "nav", "header", "footer", "aside", "figure",
+)
+_BOILERPLATE_RE = re.compile(
+    r"comment|share|social|related|promo|advert|sponsor|newsletter|subscribe|sidebar|footer|"
+    r"cookie|banner|popup|modal|breadcrumb|menu",
+    re.IGNORECASE,
+)
+_BLOCK_TAGS = ("h1", "h2", "h3", "h4", "h5", "h6", "p", "li", "pre", "blockquote")
+_WS_RE = re.compile(r"\s+")
+_CHARSET_RE = re.compile(r"charset=[\"']?([\w.:-]+)", re.IGNORECASE)
+
+
+def _text(el: Tag) -> str:
+    return _WS_RE.sub(" ", el.get_text(" ", strip=True))
+
+
+def _is_boilerplate(el: Tag) -> bool:
+    attrs = " ".join(el.get("class") or []) + " " + (el.get("id") or "")
+    return bool(_BOILERPLATE_RE.search(attrs))
+
+
+def _link_density(el: Tag) -> float:
+    text_len = len(_text(el)) or 1
+    return sum(len(_text(a)) for a in el.find_all("a")) / text_len
+
+
+def _best_container(soup: BeautifulSoup) -> Tag | None:
+    """Pick the element holding the article body.
+
+    Prefers a single <article> / <main> / role=main element; otherwise each
+    substantial paragraph credits its parent fully and its grandparent by
+    half, scaled down by link density, and the highest scorer wins.
+    """
+    for selector in ("article", "main", "[role=main]"):
+        found = soup.select(selector)
+        if len(found) == 1 and len(_text(found[0])) >= MIN_CONTENT_CHARS:
+            return found[0]
+
+    scores: dict[int, float] = {}
+    elements: dict[int, Tag] = {}
+    for p in soup.find_all("p"):
+        text = _text(p)
+        if len(text) < 25:
+            continue
+        points = 1 + text.count(",") + min(len(text) // 100, 3)
+        for parent, share in ((p.parent, 1.0), (p.parent.parent if p.parent else None, 0.5)):
+            if parent is None or parent.name in ("html", "[document]"):
+                continue
+            key = id(parent)
+            elements[key] = parent
+            scores[key] = scores.get(key, 0.0) + points * share
+
+    if not scores:
+        return None
+    best = max(scores, key=lambda key: scores[key] * (1 - _link_density(elements[key])))
+    return elements[best]
 
 
+def _nested_block(el: Tag, container: Tag) -> bool:
+    for parent in el.parents:
+        if parent is container:
+            return False
+        if parent.name in _BLOCK_TAGS:
+            return True
+    return False
+
+
+def _to_markdown(container: Tag) -> str:
+    blocks: list[str] = []
+    for el in container.find_all(_BLOCK_TAGS):
+        # Nested blocks (a <p> inside an <li>) are emitted by the outer one
+        if _nested_block(el, container):
+            continue
+        text = _text(el)
+        if not text:
+            continue
+        if el.name[0] == "h" and el.name[1:].isdigit():
+            blocks.append(f"{'#' * int(el.name[1])} {text}")
+        elif el.name == "li":
+            blocks.append(f"- {text}")
+        elif el.name == "blockquote":
+            blocks.append(f"> {text}")
+        elif el.name == "pre":
+            blocks.append(f"```\n{el.get_text()}\n```")
+        else:
+            blocks.append(text)
+    return "\n\n".join(blocks)
+
+
+def extract_main_content(html: bytes, encoding: str | None = None) -> str | None:
+    """Main article text of a page as markdown, or None if none was found.
+
+    ``html`` is the raw page, decoded here with the HTTP charset when there
+    is one, else from the BOM or meta tag. Runs in a worker process, so it
+    only takes and returns plain values.
+    """
+    soup = BeautifulSoup(html, _HTML_PARSER, from_encoding=encoding)
+    for el in soup.find_all(_DROP_TAGS):
+        el.decompose()
+    for el in soup.find_all(["div", "section", "ul"]):
+        if not el.decomposed and _is_boilerplate(el) and _link_density(el) > 0.3:
+            el.decompose()
+
+    container = _best_container(soup)
+    if container is None:
+        return None
+    markdown = _to_markdown(container)
+    if len(markdown) < MIN_CONTENT_CHARS:
+        return None
+    return markdown[:MAX_CONTENT_CHARS]
+
+
+def _fetch_html(url: str) -> tuple[bytes, str | None] | None:
+    """(raw page, charset from the Content-Type header), read up to MAX_HTML_BYTES."""
+    try:
+        with telemetry.span("enrich.fetch"), FETCH_SESSION.get(url, timeout=15, stream=True) as resp:
+            resp.raise_for_status()
+            content_type = resp.headers.get("Content-Type", "")
+            if "html" not in content_type:
+                return None
+            # Not resp.text: without a header charset requests assumes ISO-8859-1
+            charset = _CHARSET_RE.search(content_type)
+            chunks: list[bytes] = []
+            size = 0
+            for chunk in resp.iter_content(READ_CHUNK_BYTES):
+                chunks.append(chunk)
+                size += len(chunk)
+                if size >= MAX_HTML_BYTES:
+                    break
+    except Exception as e:
+        telemetry.incr("enrich.fetch_errors")
+        logger.debug("Article fetch failed for %s: %s", url, e)
+        return None
+    telemetry.incr("enrich.bytes", size)
+    return b"".join(chunks)[:MAX_HTML_BYTES], charset.group(1) if charset else None
+
+
+# ---------------------------------------------------------------------------
+# Firecrawl fallback
+# ---------------------------------------------------------------------------
+
 def _scrape_url(url: str, api_key: str) -> str | None:
     """Scrape a single URL via Firecrawl, return markdown text or None."""
+    limiter = get_limiter("firecrawl")
     try:
-        resp = requests.post(
-            FIRECRAWL_URL,
-            headers={"Authorization": f"Bearer {api_key}"},
-            json={"url": url, "formats": ["markdown"]},
-            timeout=15,
-        )
+        telemetry.incr("firecrawl.calls")
+        with limiter.limit(), telemetry.span("firecrawl.scrape"):
+            resp = SESSION.post(
+                FIRECRAWL_URL,
+                headers={"Authorization": f"Bearer {api_key}"},
+                json={"url": url, "formats": ["markdown"]},
+                timeout=15,
+            )
+        if resp.status_code == 429:
+            telemetry.incr("firecrawl.rate_limited")
+            limiter.backoff(parse_retry_after(resp.headers.get("Retry-After")) or 10)
         if resp.status_code == 200:
             data = resp.json()
             markdown = data.get("data", {}).get("markdown", "")
             return markdown[:MAX_CONTENT_CHARS] if markdown else None
         logger.warning("Firecrawl returned %d for %s", resp.status_code, url)
     except Exception as e:
+        telemetry.incr("firecrawl.errors")
         logger.warning("Firecrawl failed for %s: %s", url, e)
     return None
 
 
-def enrich_items(items: list[NewsItem], api_key: str) -> None:
-    """Enrich items with full article text from Firecrawl. Modifies items in place."""
+def _enrich_url(
+    url: str,
+    api_key: str | None,
+    cache: SqliteCache | None,
+    parse_pool: Executor,
+) -> tuple[str | None, str]:
+    """Return (markdown, where it came from) for one URL."""
+    key = canonicalize(url)
+    if cache is not None:
+        cached = cache.get(key)
+        telemetry.incr("enrich.cache_hit" if cached is not None else "enrich.cache_miss")
+        if cached is not None:
+            return cached, "cache"
+
+    text, origin = None, "local"
+    page = _fetch_html(url)
+    if page and page[0]:
+        try:
+            with telemetry.span("enrich.parse"):
+                text = parse_pool.submit(extract_main_content, *page).result()
+        except Exception as e:
+            logger.debug("Local extraction failed for %s: %s", url, e)
+    if not text and api_key:
+        text, origin = _scrape_url(url, api_key), "firecrawl"
+
+    if text and cache is not None:
+        cache.put(key, text)
+    return text, origin
+
+
+def enrich_items(
+    items: list[NewsItem],
+    api_key: str | None = None,
+    max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+    cache: SqliteCache | None = None,
+    parse_workers: int = DEFAULT_PARSE_WORKERS,
+) -> None:
+    """Enrich items with full article text. Modifies items in place.
+
+    Without ``api_key`` only local extraction is used.
+    """
     enrichable = [
         item for item in items
         if item.source_type in (SourceType.NEWS, SourceType.REDDIT)
         and len(item.content_snippet) < 500
     ]
     if not enrichable:
-        logger.info("No items need Firecrawl enrichment")
+        logger.info("No items need content enrichment")
         return
 
-    logger.info("Enriching %d items with Firecrawl...", len(enrichable))
-
-    with ThreadPoolExecutor(max_workers=4) as pool:
-        future_to_item = {
-            pool.submit(_scrape_url, item.url, api_key): item
-            for item in enrichable
-        }
-        enriched = 0
-        for future in as_completed(future_to_item):
-            item = future_to_item[future]
-            try:
-                text = future.result()
-                if text and len(text) > len(item.content_snippet):
-                    item.content_snippet = text
-                    enriched += 1
-            except Exception as e:
-                logger.warning("Enrichment failed for %s: %s", item.title[:50], e)
-
-    logger.info("Enriched %d/%d items with full content", enriched, len(enrichable))
+    logger.info(
+        "Enriching %d items (local extraction%s)...",
+        len(enrichable),
+        ", Firecrawl fallback" if api_key else "",
+    )
+    _configure_pool(max_concurrency)
+
+    origins: dict[str, int] = {}
+    with ProcessPoolExecutor(max_workers=parse_workers) as parse_pool:
+        # With fork, the first submit starts every worker; do it here, before the
+        # fetch threads exist, so no worker is forked while a request holds a lock
+        parse_pool.submit(int).result()
+        with ThreadPoolExecutor(max_workers=max_concurrency) as pool:
+            future_to_item = {
+                pool.submit(_enrich_url, item.url, api_key, cache, parse_pool): item
+                for item in enrichable
+            }
+            enriched = 0
+            for future in as_completed(future_to_item):
+                item = future_to_item[future]
+                try:
+                    text, origin = future.result()
+                    if text and len(text) > len(item.content_snippet):
+                        item.content_snippet = text
+                        enriched += 1
+                        origins[origin] = origins.get(origin, 0) + 1
+                except Exception as e:
+                    logger.warning("Enrichment failed for %s: %s", item.title[:50], e)
+
+    for origin, n in origins.items():
+        telemetry.incr(f"enrich.from_{origin}", n)
+    logger.info(
+        "Enriched %d/%d items with full content (%s)",
+        enriched,
+        len(enrichable),
+        ", ".join(f"{n} {origin}" for origin, n in sorted(origins.items())) or "none",
+    )
@@ -0,0 +1,105 @@
+"""Conditional-GET cache for RSS/Atom feeds.
+
+Stores the ETag / Last-Modified validators and the already-parsed entries for
+each feed URL, so an unchanged feed costs one 304 round trip and no parsing.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from datetime import datetime, timezone
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+CACHE_DIR = Path(__file__).parent / "state" / "cache"
+FEED_CACHE_FILE = CACHE_DIR / "feeds.json"
+
+
+class FeedCache:
+    """Thread-safe, JSON-backed store of feed validators and parsed entries.
+
+    Layout: {url: {"etag", "last_modified", "fetched_at", "entries": [...]}}
+    where each entry is {"title", "link", "published", "snippet"} with
+    ``published`` as an ISO timestamp or None.
+    """
+
+    def __init__(self, path: Path = FEED_CACHE_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._feeds: dict[str, dict] = {}
+        self._dirty = False
+        self.hits = 0
+        self.misses = 0
+
+    @classmethod
+    def load(cls, path: Path = FEED_CACHE_FILE) -> FeedCache:
+        cache = cls(path)
+        if path.exists():
+            try:
+                cache._feeds = json.loads(path.read_text(encoding="utf-8"))
+            except Exception as e:
+                logger.warning("Failed to load feed cache: %s", e)
+        return cache
+
+    def conditional_headers(self, url: str) -> dict[str, str]:
+        """Return If-None-Match / If-Modified-Since headers for a cached feed."""
+        with self._lock:
+            cached = self._feeds.get(url)
+        if not cached or cached.get("entries") is None:
+            return {}
+        headers: dict[str, str] = {}
+        if cached.get("etag"):
+            headers["If-None-Match"] = cached["etag"]
+        if cached.get("last_modified"):
+            headers["If-Modified-Since"] = cached["last_modified"]
+        return headers
+
+    def entries(self, url: str) -> list[dict] | None:
+        """Return cached parsed entries for a feed (on a 304), or None."""
+        with self._lock:
+            cached = self._feeds.get(url)
+            if cached is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            cached["fetched_at"] = datetime.now(timezone.utc).isoformat()
+            self._dirty = True
+            return cached.get("entries")
+
+    def store(self, url: str, etag: str | None, last_modified: str | None, entries: list[dict]) -> None:
+        """Record fresh validators and parsed entries for a feed."""
+        with self._lock:
+            self.misses += 1
+            if not etag and not last_modified:
+                # Nothing to revalidate with next time
+                self._dirty = self._feeds.pop(url, None) is not None or self._dirty
+                return
+            self._feeds[url] = {
+                "etag": etag,
+                "last_modified": last_modified,
+                "fetched_at": datetime.now(timezone.utc).isoformat(),
+                "entries": entries,
+            }
+            self._dirty = True
+
+    def prune(self, keep_urls: set[str]) -> None:
+        """Drop feeds no longer present in the config."""
+        with self._lock:
+            stale = [url for url in self._feeds if url not in keep_urls]
+            for url in stale:
+                del self._feeds[url]
+            if stale:
+                self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._feeds, separators=(",", ":")), encoding="utf-8")
+            tmp.replace(self.path)
+            self._dirty = False
+        logger.info("Saved feed cache (%d feeds, %d hits, %d misses)", len(self._feeds), self.hits, self.misses)
@@ -1,13 +1,28 @@
 from __future__ import annotations
 
+import asyncio
 import logging
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
 from datetime import datetime, timezone, timedelta
+from typing import AsyncIterator, Callable, Iterator
+from urllib.parse import urlsplit
 
 import feedparser
 import requests
 from bs4 import BeautifulSoup
+from requests.adapters import HTTPAdapter
 
+import telemetry
+from feed_cache import FeedCache
+from htmltext import strip_many
 from models import NewsItem, SourceType
+from source_health import SchedulePolicy, SourceHealth
+from urlcanon import canonicalize
 
 logger = logging.getLogger(__name__)
 
@@ -16,6 +31,20 @@ SESSION.headers.update({
     "User-Agent": "AI-News-Digest/1.0 (personal project; Python/requests)"
 })
 SESSION.timeout = 15
+FETCH_TIMEOUT = 15
+
+# Overridable so the pipeline can run against local stand-ins (see benchmarks/)
+GITHUB_URL = os.getenv("GITHUB_URL", "https://github.com").rstrip("/")
+GITHUB_API_URL = os.getenv("GITHUB_API_URL", "https://api.github.com").rstrip("/")
+
+
+class SourceFetchError(Exception):
+    """A source could not be fetched; already logged, recorded in the source's health."""
+
+
+def _count_response(resp: requests.Response) -> None:
+    telemetry.incr("fetch.requests")
+    telemetry.incr("fetch.bytes", len(resp.content))
 
 
 def _parse_date(entry: dict) -> datetime | None:
@@ -30,39 +59,18 @@ def _parse_date(entry: dict) -> datetime | None:
     return None
 
 
-def _strip_html(html: str, max_chars: int = 500) -> str:
-    """Strip HTML tags and return plain text truncated to max_chars."""
-    text = BeautifulSoup(html, "html.parser").get_text(separator=" ", strip=True)
-    return text[:max_chars]
-
-
 # ---------------------------------------------------------------------------
 # RSS fetcher (Reddit, YouTube, News)
 # ---------------------------------------------------------------------------
 
-def fetch_rss(
-    url: str,
-    source_name: str,
-    source_type: SourceType,
-    lookback_hours: int,
-    max_items: int = 20,
-) -> list[NewsItem]:
-    """Fetch and parse an RSS/Atom feed, returning NewsItems within the lookback window."""
-    try:
-        resp = SESSION.get(url, timeout=15)
-        resp.raise_for_status()
-    except Exception as e:
-        logger.warning("Failed to fetch %s (%s): %s", source_name, url, e)
-        return []
-
-    feed = feedparser.parse(resp.text)
-    cutoff = datetime.now(timezone.utc) - timedelta(hours=lookback_hours)
-    items: list[NewsItem] = []
+def _parse_entries(text: str, max_items: int) -> list[dict]:
+    """Parse feed text into plain entry dicts (cacheable, lookback not applied)."""
+    feed = feedparser.parse(text)
+    entries: list[dict] = []
+    htmls: list[str] = []
 
     for entry in feed.entries[:max_items]:
         published = _parse_date(entry)
-        if published and published < cutoff:
-            continue
 
         # Build content snippet from available fields
         content_html = ""
@@ -75,18 +83,90 @@ def fetch_rss(
             desc = entry.get("media_description", "")
             content_html = desc
 
-        snippet = _strip_html(content_html)
+        entries.append({
+            "title": entry.get("title", "No title"),
+            "link": entry.get("link", ""),
+            "published": published.isoformat() if published else None,
+        })
+        htmls.append(content_html)
+
+    # Snippets are stripped after the loop, in one pass over the collected HTML
+    for entry, snippet in zip(entries, strip_many(htmls)):
+        entry["snippet"] = snippet
+    return entries
 
-        link = entry.get("link", "")
-        title = entry.get("title", "No title")
+
+def _get_feed(url: str, source_name: str, timeout: float, headers: dict[str, str]) -> requests.Response:
+    try:
+        resp = SESSION.get(url, timeout=timeout, headers=headers)
+        resp.raise_for_status()
+    except Exception as e:
+        telemetry.incr("fetch.errors")
+        logger.warning("Failed to fetch %s (%s): %s", source_name, url, e)
+        raise SourceFetchError(str(e)) from e
+    _count_response(resp)
+    return resp
+
+
+def fetch_rss(
+    url: str,
+    source_name: str,
+    source_type: SourceType,
+    lookback_hours: int,
+    max_items: int = 20,
+    cache: FeedCache | None = None,
+    timeout: float = FETCH_TIMEOUT,
+) -> list[NewsItem]:
+    """Fetch and parse an RSS/Atom feed, returning NewsItems within the lookback window.
+
+    With a FeedCache, the request is conditional and a 304 reuses the cached
+    entries without re-parsing the feed.
+    """
+    headers = cache.conditional_headers(url) if cache else {}
+    resp = _get_feed(url, source_name, timeout, headers)
+
+    entries: list[dict] | None = None
+    if resp.status_code == 304:
+        entries = cache.entries(url) if cache else None
+        if entries is not None:
+            entries = entries[:max_items]
+            logger.debug("Feed not modified: %s", source_name)
+        else:
+            # Validators without entries to reuse: a 304 body is empty, so ask for the full feed
+            logger.debug("Feed not modified but nothing cached, refetching: %s", source_name)
+            resp = _get_feed(url, source_name, timeout, {})
+            if resp.status_code == 304:
+                telemetry.incr("fetch.errors")
+                logger.warning("Failed to fetch %s (%s): 304 to an unconditional request", source_name, url)
+                raise SourceFetchError("304 Not Modified to an unconditional request")
+    if cache:
+        telemetry.incr("fetch.cache_hit" if entries is not None else "fetch.cache_miss")
+    if entries is None:
+        entries = _parse_entries(resp.text, max_items)
+        if cache:
+            cache.store(
+                url,
+                resp.headers.get("ETag"),
+                resp.headers.get("Last-Modified"),
+                entries,
+            )
+
+    cutoff = datetime.now(timezone.utc) - timedelta(hours=lookback_hours)
+    items: list[NewsItem] = []
+
+    for entry in entries:
+        published = datetime.fromisoformat(entry["published"]) if entry["published"] else None
+        if published and published < cutoff:
+            continue
 
         items.append(NewsItem(
-            title=title,
-            url=link,
+            title=entry["title"],
+            url=entry["link"],
+            canonical_url=canonicalize(entry["link"]),
             source_name=source_name,
             source_type=source_type,
             published=published,
-            content_snippet=snippet,
+            content_snippet=entry["snippet"],
         ))
 
     logger.info("Fetched %d items from %s", len(items), source_name)
@@ -97,15 +177,17 @@ def fetch_rss(
 # GitHub trending page scraper
 # ---------------------------------------------------------------------------
 
-def fetch_github_trending() -> list[NewsItem]:
+def fetch_github_trending(timeout: float = FETCH_TIMEOUT) -> list[NewsItem]:
     """Scrape github.com/trending for weekly trending repos."""
-    url = "https://github.com/trending?since=weekly&spoken_language_code=en"
+    url = f"{GITHUB_URL}/trending?since=weekly&spoken_language_code=en"
     try:
-        resp = SESSION.get(url, timeout=15)
+        resp = SESSION.get(url, timeout=timeout)
         resp.raise_for_status()
     except Exception as e:
+        telemetry.incr("fetch.errors")
         logger.warning("Failed to fetch GitHub trending: %s", e)
-        return []
+        raise SourceFetchError(str(e)) from e
+    _count_response(resp)
 
     soup = BeautifulSoup(resp.text, "html.parser")
     items: list[NewsItem] = []
@@ -116,7 +198,7 @@ def fetch_github_trending() -> list[NewsItem]:
         if not h2:
             continue
         repo_path = h2.get("href", "").strip("/")
-        repo_url = f"https://github.com/{repo_path}"
+        repo_url = f"{GITHUB_URL}/{repo_path}"
         repo_name = repo_path.replace("/", " / ")
 
         # Description
@@ -134,6 +216,7 @@ def fetch_github_trending() -> list[NewsItem]:
         items.append(NewsItem(
             title=repo_name,
             url=repo_url,
+            canonical_url=canonicalize(repo_url),
             source_name="GitHub Trending",
             source_type=SourceType.GITHUB,
             content_snippet=desc,
@@ -148,98 +231,297 @@ def fetch_github_trending() -> list[NewsItem]:
 # GitHub API search
 # ---------------------------------------------------------------------------
 
+def _github_search_query(q: dict, timeout: float = FETCH_TIMEOUT) -> list[NewsItem]:
+    """Run a single GitHub repository search query."""
+    topic = q["topic"]
+    min_stars = q.get("min_stars", 50)
+    days = q.get("created_within_days", 7)
+    since = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
+
+    api_url = (
+        f"{GITHUB_API_URL}/search/repositories"
+        f"?q=topic:{topic}+created:>{since}+stars:>={min_stars}"
+        f"&sort=stars&order=desc&per_page=10"
+    )
+    try:
+        resp = SESSION.get(api_url, timeout=timeout)
+        resp.raise_for_status()
+        _count_response(resp)
+        data = resp.json()
+    except Exception as e:
+        telemetry.incr("fetch.errors")
+        logger.warning("GitHub API search failed for topic '%s': %s", topic, e)
+        raise SourceFetchError(str(e)) from e
+
+    items: list[NewsItem] = []
+    for repo in data.get("items", []):
+        items.append(NewsItem(
+            title=repo["full_name"],
+            url=repo["html_url"],
+            canonical_url=canonicalize(repo["html_url"]),
+            source_name=f"GitHub Search ({topic})",
+            source_type=SourceType.GITHUB,
+            content_snippet=repo.get("description", "") or "",
+            extra={
+                "stars": str(repo.get("stargazers_count", 0)),
+                "language": repo.get("language", ""),
+                "topics": repo.get("topics", []),
+            },
+        ))
+    return items
+
+
+def _dedupe_urls(items: list[NewsItem], seen_ids: set[str]) -> list[NewsItem]:
+    """Drop items whose canonical URL id is already in seen_ids (updating it in place)."""
+    unique: list[NewsItem] = []
+    for item in items:
+        if item.id not in seen_ids:
+            seen_ids.add(item.id)
+            unique.append(item)
+    return unique
+
+
 def fetch_github_search(queries: list[dict]) -> list[NewsItem]:
     """Search GitHub API for recently created repos matching topic queries."""
     items: list[NewsItem] = []
-
     for q in queries:
-        topic = q["topic"]
-        min_stars = q.get("min_stars", 50)
-        days = q.get("created_within_days", 7)
-        since = (datetime.now(timezone.utc) - timedelta(days=days)).strftime("%Y-%m-%d")
-
-        api_url = (
-            f"https://api.github.com/search/repositories"
-            f"?q=topic:{topic}+created:>{since}+stars:>={min_stars}"
-            f"&sort=stars&order=desc&per_page=10"
-        )
         try:
-            resp = SESSION.get(api_url, timeout=15)
-            resp.raise_for_status()
-            data = resp.json()
-        except Exception as e:
-            logger.warning("GitHub API search failed for topic '%s': %s", topic, e)
+            items.extend(_github_search_query(q))
+        except SourceFetchError:
             continue
 
-        for repo in data.get("items", []):
-            items.append(NewsItem(
-                title=repo["full_name"],
-                url=repo["html_url"],
-                source_name=f"GitHub Search ({topic})",
-                source_type=SourceType.GITHUB,
-                content_snippet=repo.get("description", "") or "",
-                extra={
-                    "stars": str(repo.get("stargazers_count", 0)),
-                    "language": repo.get("language", ""),
-                    "topics": repo.get("topics", []),
-                },
-            ))
-
     # Deduplicate by URL (same repo may match multiple topic queries)
-    seen_urls: set[str] = set()
-    unique: list[NewsItem] = []
-    for item in items:
-        if item.url not in seen_urls:
-            seen_urls.add(item.url)
-            unique.append(item)
-
+    unique = _dedupe_urls(items, set())
     logger.info("Fetched %d repos from GitHub API search", len(unique))
     return unique
 
 
+# ---------------------------------------------------------------------------
+# Async fetch engine
+# ---------------------------------------------------------------------------
+
+DEFAULT_MAX_IN_FLIGHT = 16
+DEFAULT_PER_HOST = 4
+DEFAULT_HOST_BUDGET = 60.0
+
+
+@dataclass
+class FetchJob:
+    """One unit of fetch work: a blocking fetcher call bound to a host."""
+    host: str
+    fn: Callable[..., list[NewsItem]]
+    args: tuple = ()
+    dedupe_group: str | None = None  # jobs sharing a group are URL-deduped together
+    name: str = ""  # source name, for logs and per-source timings
+    key: str = ""  # source health key
+    timeout: float = FETCH_TIMEOUT
+    health: SourceHealth | None = None
+
+    def __call__(self, budget: float | None = None) -> list[NewsItem]:
+        """Run the fetcher; ``budget`` is what is left of the host's time budget."""
+        timeout = self.timeout if budget is None else min(self.timeout, budget)
+        start = time.perf_counter()
+        try:
+            with telemetry.span("fetch.source", key=self.name or self.host):
+                items = self.fn(*self.args, timeout=timeout)
+        except Exception as e:
+            error = str(e)
+            if not isinstance(e, SourceFetchError):  # fetch errors are logged where they happen
+                error = f"{type(e).__name__}: {e}"
+                telemetry.incr("fetch.errors")
+                logger.warning("Fetching %s failed: %s", self.name or self.host, error)
+            if timeout < self.timeout and isinstance(e.__cause__ or e, requests.Timeout):
+                # Cut short by the host budget, not the source's own fault
+                telemetry.incr("fetch.budget_timeouts")
+            elif self.health is not None:
+                self.health.record_failure(self.key, self.name, error)
+            return []
+        if self.health is not None:
+            self.health.record_success(self.key, self.name, time.perf_counter() - start, items)
+        telemetry.incr("fetch.items", len(items))
+        return items
+
+
+def _host_limit(host: str, fetch_cfg: dict) -> int:
+    """Concurrency cap for a host; the longest matching per_host suffix wins."""
+    best_len = -1
+    limit = fetch_cfg.get("default_per_host", DEFAULT_PER_HOST)
+    for suffix, cap in (fetch_cfg.get("per_host") or {}).items():
+        if (host == suffix or host.endswith("." + suffix)) and len(suffix) > best_len:
+            best_len = len(suffix)
+            limit = cap
+    return max(1, int(limit))
+
+
+def _configure_pool(max_in_flight: int) -> None:
+    """Size the shared session's connection pool to the in-flight limit."""
+    adapter = HTTPAdapter(pool_connections=max(10, max_in_flight), pool_maxsize=max_in_flight)
+    SESSION.mount("https://", adapter)
+    SESSION.mount("http://", adapter)
+
+
+async def _run_jobs(jobs: list[FetchJob], fetch_cfg: dict) -> AsyncIterator[list[NewsItem]]:
+    """Run fetch jobs under per-host and global caps, yielding results as they complete.
+
+    Blocking fetchers run on a worker pool sized to the global in-flight limit,
+    so the thread count stays fixed no matter how many sources are configured.
+    """
+    max_in_flight = max(1, int(fetch_cfg.get("max_in_flight", DEFAULT_MAX_IN_FLIGHT)))
+    _configure_pool(max_in_flight)
+
+    loop = asyncio.get_running_loop()
+    global_sem = asyncio.Semaphore(max_in_flight)
+    host_sems: dict[str, asyncio.Semaphore] = {}
+    group_ids: dict[str, set[str]] = {}
+    # Wall time each host may take per run, counted from its first request, so
+    # one slow host cannot stretch the whole phase
+    host_budget = float(fetch_cfg.get("host_budget_seconds", DEFAULT_HOST_BUDGET) or 0)
+    host_deadlines: dict[str, float] = {}
+
+    async def run(job: FetchJob) -> tuple[FetchJob, list[NewsItem]]:
+        host_sem = host_sems.get(job.host)
+        if host_sem is None:
+            host_sem = host_sems[job.host] = asyncio.Semaphore(_host_limit(job.host, fetch_cfg))
+        # Take the host slot first so waiting on a busy host never pins a global slot
+        async with host_sem, global_sem:
+            remaining = None
+            if host_budget:
+                deadline = host_deadlines.setdefault(job.host, loop.time() + host_budget)
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    telemetry.incr("fetch.skipped_budget")
+                    logger.warning("Skipping %s: %s used up its %gs fetch budget", job.name, job.host, host_budget)
+                    return job, []
+            future = loop.run_in_executor(executor, job, remaining)
+            if remaining is None:
+                return job, await future
+            # The request timeout only bounds each socket operation, so also
+            # stop waiting at the deadline; an overrunning thread finishes on
+            # its own and its items are dropped
+            try:
+                return job, await asyncio.wait_for(future, remaining)
+            except asyncio.TimeoutError:
+                telemetry.incr("fetch.budget_abandoned")
+                logger.warning("Gave up on %s: %s ran past its %gs fetch budget", job.name, job.host, host_budget)
+                return job, []
+
+    executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="fetch")
+    try:
+        for next_done in asyncio.as_completed([run(job) for job in jobs]):
+            try:
+                job, items = await next_done
+            except Exception as e:
+                logger.error("Fetcher raised an exception: %s", e)
+                continue
+            if job.dedupe_group:
+                items = _dedupe_urls(items, group_ids.setdefault(job.dedupe_group, set()))
+            yield items
+    finally:
+        # Don't wait for abandoned fetches; their request timeouts end them
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
 # ---------------------------------------------------------------------------
 # Fetch all sources from config
 # ---------------------------------------------------------------------------
 
-def fetch_all(config: dict) -> list[NewsItem]:
-    """Fetch items from all configured sources."""
-    from concurrent.futures import ThreadPoolExecutor, as_completed
+def _build_jobs(config: dict, feed_cache: FeedCache, health: SourceHealth) -> tuple[list[FetchJob], set[str]]:
+    """Turn the sources config into fetch jobs for the sources due this run.
 
+    Also returns the health keys of every configured source, due or not.
+    """
     lookback = config["schedule"]["lookback_hours"]
     max_per = config["schedule"]["max_items_per_source"]
     sources = config["sources"]
-    all_items: list[NewsItem] = []
-    futures = []
-
-    with ThreadPoolExecutor(max_workers=8) as pool:
-        # RSS-based sources
-        source_type_map = {
-            "reddit": SourceType.REDDIT,
-            "youtube": SourceType.YOUTUBE,
-            "news": SourceType.NEWS,
-        }
-        for source_key, st in source_type_map.items():
-            if source_key not in sources:
-                continue
-            for feed in sources[source_key].get("feeds", []):
-                futures.append(pool.submit(
-                    fetch_rss, feed["url"], feed["name"], st, lookback, max_per
-                ))
+    policy = SchedulePolicy.from_config(config)
+    now = datetime.now(timezone.utc)
+    jobs: list[FetchJob] = []
+    keys: set[str] = set()
+
+    def add(key: str, name: str, host: str, fn: Callable[..., list[NewsItem]], args: tuple = (), **kwargs) -> None:
+        keys.add(key)
+        reason = health.skip_reason(key, policy, now)
+        if reason:
+            telemetry.incr("fetch.skipped_backoff" if reason.startswith("backing off") else "fetch.skipped_quiet")
+            logger.info("Skipping %s: %s", name, reason)
+            return
+        jobs.append(FetchJob(
+            host=host, fn=fn, args=args, name=name, key=key,
+            timeout=health.timeout(key, policy), health=health, **kwargs,
+        ))
 
-        # GitHub trending
-        if sources.get("github", {}).get("scrape_trending"):
-            futures.append(pool.submit(fetch_github_trending))
+    # RSS-based sources
+    source_type_map = {
+        "reddit": SourceType.REDDIT,
+        "youtube": SourceType.YOUTUBE,
+        "news": SourceType.NEWS,
+    }
+    for source_key, st in source_type_map.items():
+        if source_key not in sources:
+            continue
+        for feed in sources[source_key].get("feeds", []):
+            url = feed["url"]
+            # Widen the window for a source that missed runs, so its items are not lost
+            hours = health.lookback_hours(url, lookback, policy, now) if policy.adaptive else lookback
+            add(url, feed["name"], urlsplit(url).hostname or "", fetch_rss,
+                (url, feed["name"], st, hours, max_per, feed_cache))
+
+    # GitHub trending
+    if sources.get("github", {}).get("scrape_trending"):
+        add("github:trending", "GitHub Trending", urlsplit(GITHUB_URL).hostname or "", fetch_github_trending)
+
+    # GitHub API search, one job per query so they run concurrently
+    for q in sources.get("github", {}).get("search_queries", []):
+        add(f"github:search:{q['topic']}", f"GitHub Search ({q['topic']})", urlsplit(GITHUB_API_URL).hostname or "",
+            _github_search_query, (q,), dedupe_group="github_search")
+
+    return jobs, keys
+
+
+def iter_fetch(config: dict) -> Iterator[list[NewsItem]]:
+    """Yield each source's items as soon as that source finishes fetching.
+
+    The fetch engine runs on a background event loop, so callers can process
+    early results while slower sources are still downloading.
+    """
+    fetch_cfg = config.get("fetch") or {}
+    feed_cache = FeedCache.load()
+    health = SourceHealth.load()
+    jobs, keys = _build_jobs(config, feed_cache, health)
+    results: queue.Queue = queue.Queue()
+    done = object()
+
+    def produce() -> None:
+        async def pump() -> None:
+            async for items in _run_jobs(jobs, fetch_cfg):
+                results.put(items)
 
-        # GitHub API search
-        gh_queries = sources.get("github", {}).get("search_queries", [])
-        if gh_queries:
-            futures.append(pool.submit(fetch_github_search, gh_queries))
+        try:
+            asyncio.run(pump())
+        except Exception as e:
+            logger.error("Fetch engine failed: %s", e)
+        finally:
+            results.put(done)
+
+    engine = threading.Thread(target=produce, name="fetch-engine", daemon=True)
+    engine.start()
+    total = 0
+    while (items := results.get()) is not done:
+        total += len(items)
+        yield items
+    engine.join()
+
+    # Keys of RSS sources are their feed URLs; sources skipped this run keep their cache entries
+    feed_cache.prune(keys)
+    feed_cache.save()
+    health.prune(keys)
+    health.save()
+    logger.info("Total fetched: %d items from %d sources (%d skipped)", total, len(jobs), len(keys) - len(jobs))
 
-        for future in as_completed(futures):
-            try:
-                all_items.extend(future.result())
-            except Exception as e:
-                logger.error("Fetcher raised an exception: %s", e)
 
-    logger.info("Total fetched: %d items from all sources", len(all_items))
+def fetch_all(config: dict) -> list[NewsItem]:
+    """Fetch items from all configured sources."""
+    all_items: list[NewsItem] = []
+    for items in iter_fetch(config):
+        all_items.extend(items)
     return all_items
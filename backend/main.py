@@ -5,6 +5,12 @@ Usage:
     python main.py                 # Full run (fetch, score, summarize, email)
     python main.py --dry-run       # Fetch + score only, print results
     python main.py --force         # Ignore last_run timestamp
+    python main.py --resume        # Continue after the last checkpointed stage
+    python main.py --from-stage email  # Re-run from a stage using checkpoints
+
+With pipeline.streaming on, fetch, dedup and cluster run inside the score
+stage and write no checkpoints of their own, so --from-stage accepts only
+fetch (a fresh run) or rerank and later.
 """
 from __future__ import annotations
 
@@ -14,19 +20,32 @@ import logging
 import os
 import re
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timezone, timedelta
 from pathlib import Path
 
+import numpy as np
 import yaml
 from dotenv import load_dotenv
 
-from models import Digest
+import ratelimit
+import checkpoint
+import telemetry
+from models import Digest, NewsBatch, NewsItem
 from fetchers import fetch_all
 from google import genai
-from scorer import score_items, sort_and_limit, group_into_sections, semantic_rerank
-from dedup import load_seen, filter_new, save_seen
-from summarizer import Summarizer
-from emailer import send_digest
+from scorer import (
+    score_items, sort_and_limit_batch, group_into_sections, semantic_rerank_batch, max_embed_items, DEFAULT_MAX_EMBED,
+)
+from embedding_cache import EmbeddingCache
+from dedup import BLOOM_CAPACITY, RETENTION_DAYS, SeenStore, load_seen, filter_new, save_seen
+from cluster import DEFAULT_MAX_DISTANCE, NearDupIndex, cluster_near_duplicates
+from pipeline import stream_candidates
+from kvcache import SqliteCache
+from summarizer import Summarizer, DEFAULT_MAX_CONCURRENCY, LLM_CACHE_FILE
+from emailer import record_sends, send_digest
+from supabase_client import get_client
 
 BASE_DIR = Path(__file__).parent
 STATE_DIR = BASE_DIR / "state"
@@ -114,15 +133,11 @@ def _daily_project_category(dt: datetime) -> str:
 
 def _get_recent_project_ideas(limit: int = 21) -> list[dict]:
     """Load recent ideas from Supabase for anti-duplication context."""
-    url = os.getenv("SUPABASE_URL", "")
-    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
-    if not url or not key:
+    client = get_client()
+    if client is None:
         return []
 
     try:
-        from supabase import create_client
-
-        client = create_client(url, key)
         result = (
             client.table("digests")
             .select("generated_at, project_recommendations")
@@ -145,9 +160,8 @@ def _get_recent_project_ideas(limit: int = 21) -> list[dict]:
 
 def _get_existing_project_for_date(dt: datetime) -> str | None:
     """Reuse existing same-day project recommendation to keep one project per day."""
-    url = os.getenv("SUPABASE_URL", "")
-    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
-    if not url or not key:
+    client = get_client()
+    if client is None:
         return None
 
     day = dt.strftime("%Y-%m-%d")
@@ -155,9 +169,6 @@ def _get_existing_project_for_date(dt: datetime) -> str | None:
     day_end = f"{day}T23:59:59Z"
 
     try:
-        from supabase import create_client
-
-        client = create_client(url, key)
         result = (
             client.table("digests")
             .select("project_recommendations, generated_at")
@@ -179,64 +190,145 @@ def _get_existing_project_for_date(dt: datetime) -> str | None:
     return None
 
 
-def main() -> None:
-    parser = argparse.ArgumentParser(description="AI News Digest")
-    parser.add_argument("--dry-run", action="store_true", help="Fetch and score only, no AI or email")
-    parser.add_argument("--force", action="store_true", help="Run even if last run was recent")
-    args = parser.parse_args()
-
-    setup_logging()
+def _project_recommendations(summarizer: Summarizer, sections: list, run_date: datetime) -> str:
+    """Reuse today's project idea if one exists, otherwise generate a new one."""
     logger = logging.getLogger("main")
+    existing_project_recs = _get_existing_project_for_date(run_date)
+    if existing_project_recs:
+        logger.info("Reusing existing project recommendation for %s", run_date.strftime("%Y-%m-%d"))
+        return existing_project_recs
+
+    target_category = _daily_project_category(run_date)
+    recent_projects = _get_recent_project_ideas(limit=21)
+    logger.info(
+        "Generating project recommendation (target category: %s, recent ideas: %d)...",
+        target_category,
+        len(recent_projects),
+    )
+    return summarizer.recommend_projects(
+        sections,
+        recent_projects=recent_projects,
+        target_category=target_category,
+    )
 
-    load_dotenv(BASE_DIR / ".env")
-    config = load_config()
 
-    # Check timing
-    if not should_run(config, args.force):
-        logger.info("Too soon since last run. Use --force to override.")
-        return
+@dataclass
+class RunContext:
+    """Run-wide inputs shared by the pipeline stages."""
+    config: dict
+    args: argparse.Namespace
+    logger: logging.Logger
+    topics: dict
+    seen: SeenStore
+    gemini_client: genai.Client | None = None
+    embed_cache: EmbeddingCache | None = None
+    max_embed: int = DEFAULT_MAX_EMBED
+    near_dups: NearDupIndex | None = None
 
-    # Fetch
-    logger.info("Fetching from all sources...")
-    all_items = fetch_all(config)
-    logger.info("Fetched %d total items", len(all_items))
 
-    # Dedup
-    seen = load_seen()
-    new_items = filter_new(all_items, seen)
-    logger.info("After dedup: %d new items (filtered %d seen)", len(new_items), len(all_items) - len(new_items))
+@dataclass
+class RunState:
+    """What each stage hands to the next (and what gets checkpointed)."""
+    items: list[NewsItem] = field(default_factory=list)
+    digest: Digest | None = None
+    meta: dict = field(default_factory=dict)
 
-    # Score & filter
-    topics = config.get("topics", {})
-    scored = score_items(new_items, topics)
-    logger.info("After keyword scoring: %d items (including zero-score)", len(scored))
 
-    # Create Gemini client (used for embeddings + summarization)
-    api_key = os.getenv("GEMINI_API_KEY")
-    gemini_client = genai.Client(api_key=api_key) if api_key else None
+# Stage results
+DONE = "done"        # stage ran; checkpoint its output and continue
+SKIPPED = "skipped"  # nothing to do in this mode; continue without a checkpoint
+STOP = "stop"        # end the run here
 
-    # Semantic re-ranking
-    if gemini_client:
-        scored = semantic_rerank(scored, topics, gemini_client)
-        logger.info("After semantic rerank: %d items above threshold", len(scored))
-    else:
-        scored = [item for item in scored if item.score > 0]
-        logger.info("No GEMINI_API_KEY, using keyword-only scoring: %d items", len(scored))
 
-    scored = sort_and_limit(scored, config["schedule"]["max_items_in_digest"])
-    logger.info("After sort_and_limit: %d items in digest", len(scored))
+# Stages that cannot be resumed from in streaming mode: their predecessor has no checkpoint
+STREAMING_UNRESUMABLE = ("dedup", "cluster", "score")
+
+
+def _streaming(ctx: RunContext) -> bool:
+    return bool(ctx.config.get("pipeline", {}).get("streaming"))
 
-    if not scored:
-        logger.info("No relevant items found. Skipping digest.")
-        return
 
-    # Group into sections
-    sections = group_into_sections(scored, topics)
+def _stage_fetch(ctx: RunContext, state: RunState) -> str:
+    if _streaming(ctx):
+        return SKIPPED  # fetched inside the streaming score stage
+    ctx.logger.info("Fetching from all sources...")
+    state.items = fetch_all(ctx.config)
+    ctx.logger.info("Fetched %d total items", len(state.items))
+    return DONE
+
+
+def _stage_dedup(ctx: RunContext, state: RunState) -> str:
+    if _streaming(ctx) and not state.meta.get("resumed_from"):
+        return SKIPPED
+    fetched = len(state.items)
+    state.items = filter_new(state.items, ctx.seen)
+    ctx.logger.info("After dedup: %d new items (filtered %d seen)", len(state.items), fetched - len(state.items))
+    return DONE
+
+
+def _stage_cluster(ctx: RunContext, state: RunState) -> str:
+    if ctx.near_dups is None or (_streaming(ctx) and not state.meta.get("resumed_from")):
+        return SKIPPED
+    state.items = cluster_near_duplicates(state.items, ctx.near_dups)
+    state.meta["clusters"] = ctx.near_dups.cluster_state(state.items)
+    ctx.logger.info(
+        "After near-duplicate clustering: %d items (%d merged, %d repeats of earlier digests)",
+        len(state.items), ctx.near_dups.merged, ctx.near_dups.dropped_history,
+    )
+    return DONE
+
+
+def _stage_score(ctx: RunContext, state: RunState) -> str:
+    if _streaming(ctx) and not state.meta.get("resumed_from"):
+        # Fetch, dedup and keyword-score each source as it completes
+        ctx.logger.info("Fetching from all sources (streaming)...")
+        zero_cap = max_embed_items(ctx.topics, ctx.embed_cache, ctx.max_embed) if ctx.gemini_client else 0
+        state.items, stats = stream_candidates(
+            ctx.config, ctx.seen, ctx.topics, zero_cap, ctx.embed_cache, ctx.near_dups
+        )
+        ctx.logger.info("Fetched %d total items", stats.fetched)
+        ctx.logger.info("After dedup: %d new items (filtered %d seen)", stats.new, stats.fetched - stats.new)
+        if ctx.near_dups is not None:
+            state.meta["clusters"] = ctx.near_dups.cluster_state(state.items)
+            ctx.logger.info(
+                "After near-duplicate clustering: %d items (%d merged, %d repeats of earlier digests)",
+                stats.new - stats.near_duplicates, ctx.near_dups.merged, ctx.near_dups.dropped_history,
+            )
+        ctx.logger.info(
+            "After keyword scoring: %d candidates (%d keyword-matched, %d zero-score dropped)",
+            len(state.items),
+            stats.keyword_matched,
+            stats.zero_score_dropped,
+        )
+        return DONE
+
+    state.items = score_items(state.items, ctx.topics)
+    ctx.logger.info("After keyword scoring: %d items (including zero-score)", len(state.items))
+    return DONE
+
+
+def _stage_rerank(ctx: RunContext, state: RunState) -> str:
+    batch = NewsBatch(state.items, ctx.topics)
+    if ctx.gemini_client:
+        batch = semantic_rerank_batch(batch, ctx.topics, ctx.gemini_client, ctx.embed_cache, ctx.max_embed)
+        ctx.embed_cache.save()
+        ctx.logger.info("After semantic rerank: %d items above threshold", len(batch))
+    else:
+        batch = batch.take(np.flatnonzero(batch.score > 0))
+        ctx.logger.info("No GEMINI_API_KEY, using keyword-only scoring: %d items", len(batch))
+
+    state.items = sort_and_limit_batch(batch, ctx.config["schedule"]["max_items_in_digest"]).to_items()
+    ctx.logger.info("After sort_and_limit: %d items in digest", len(state.items))
+
+    if not state.items:
+        ctx.logger.info("No relevant items found. Skipping digest.")
+        return STOP
 
     # Dry run: print results and exit
-    if args.dry_run:
+    if ctx.args.dry_run:
+        sections = group_into_sections(state.items, ctx.topics)
         print(f"\n{'='*60}")
-        print(f"DRY RUN - {len(scored)} items would be in the digest")
+        print(f"DRY RUN - {len(state.items)} items would be in the digest")
         print(f"{'='*60}\n")
         for section in sections:
             print(f"--- {section.title} ({len(section.items)} items) ---")
@@ -244,52 +336,76 @@ def main() -> None:
                 print(f"  [{item.score:.0f}] [{item.source_name}] {item.title}")
                 print(f"         {item.url}")
             print()
-        return
+        return STOP
+    return DONE
 
-    # Enrich articles with full content via Firecrawl (optional)
+
+def _stage_enrich(ctx: RunContext, state: RunState) -> str:
+    # Enrich articles with full content: local extraction, Firecrawl fallback if keyed
+    from enricher import (
+        DEFAULT_MAX_CONCURRENCY as ENRICH_CONCURRENCY, DEFAULT_PARSE_WORKERS, ENRICH_CACHE_FILE, enrich_items,
+    )
     firecrawl_key = os.getenv("FIRECRAWL_API_KEY")
-    if firecrawl_key:
-        from enricher import enrich_items
-        enrich_items(scored, firecrawl_key)
-    else:
-        logger.info("No FIRECRAWL_API_KEY set, skipping content enrichment")
+    if not firecrawl_key:
+        ctx.logger.info("No FIRECRAWL_API_KEY set, using local content extraction only")
+    enrich_cfg = ctx.config.get("enrich", {})
+    enrich_cache = SqliteCache(
+        ENRICH_CACHE_FILE,
+        ttl_seconds=enrich_cfg.get("cache_ttl_days", 7) * 86400,
+        max_entries=enrich_cfg.get("cache_max_entries", 2000),
+    )
+    enrich_items(
+        state.items,
+        firecrawl_key,
+        max_concurrency=enrich_cfg.get("max_concurrency", ENRICH_CONCURRENCY),
+        cache=enrich_cache,
+        parse_workers=enrich_cfg.get("parse_workers", DEFAULT_PARSE_WORKERS),
+    )
+    enrich_cache.close()
+    return DONE
+
+
+def _stage_summarize(ctx: RunContext, state: RunState) -> str:
+    config, logger, scored = ctx.config, ctx.logger, state.items
+    sections = group_into_sections(scored, ctx.topics)
 
     # Summarize with OpenAI
     openai_key = os.getenv("OPENAI_API_KEY")
     if not openai_key:
         logger.error("OPENAI_API_KEY not set — cannot summarize")
-        return
+        return STOP
 
-    summarizer = Summarizer(openai_key)
+    summarizer_cfg = config.get("summarizer", {})
+    llm_cache = SqliteCache(
+        LLM_CACHE_FILE,
+        ttl_seconds=summarizer_cfg.get("cache_ttl_days", 14) * 86400,
+        max_entries=summarizer_cfg.get("cache_max_entries", 5000),
+    )
+    summarizer = Summarizer(
+        openai_key,
+        max_concurrency=summarizer_cfg.get("max_concurrency", DEFAULT_MAX_CONCURRENCY),
+        cache=llm_cache,
+    )
+    run_date = datetime.now(timezone.utc)
+    all_digest_items = [item for s in sections for item in s.items]
 
-    logger.info("Summarizing %d items via OpenAI...", sum(len(s.items) for s in sections))
-    for section in sections:
-        for item in section.items:
-            item.summary = summarizer.summarize_item(item)
+    # Intro, project idea and hero image only need titles/sections, so they
+    # run alongside the per-item summaries.
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        intro_future = pool.submit(summarizer.summarize_digest, sections)
+        projects_future = pool.submit(_project_recommendations, summarizer, sections, run_date)
+        logger.info("Generating hero image for top article...")
+        hero_future = pool.submit(summarizer.generate_hero_image, scored[0])
 
-    intro = summarizer.summarize_digest(sections)
+        logger.info("Summarizing %d items via OpenAI...", len(all_digest_items))
+        for item, summary in zip(all_digest_items, summarizer.summarize_items(all_digest_items)):
+            item.summary = summary
 
-    run_date = datetime.now(timezone.utc)
-    existing_project_recs = _get_existing_project_for_date(run_date)
-    if existing_project_recs:
-        logger.info("Reusing existing project recommendation for %s", run_date.strftime("%Y-%m-%d"))
-        project_recs = existing_project_recs
-    else:
-        target_category = _daily_project_category(run_date)
-        recent_projects = _get_recent_project_ideas(limit=21)
-        logger.info(
-            "Generating project recommendation (target category: %s, recent ideas: %d)...",
-            target_category,
-            len(recent_projects),
-        )
-        project_recs = summarizer.recommend_projects(
-            sections,
-            recent_projects=recent_projects,
-            target_category=target_category,
-        )
+        intro = intro_future.result()
+        project_recs = projects_future.result()
+        hero_url = hero_future.result()
+    llm_cache.close()
 
-    logger.info("Generating hero image for top article...")
-    hero_url = summarizer.generate_hero_image(scored[0])
     if hero_url:
         scored[0].extra["hero_image"] = hero_url
         logger.info("Hero image attached to top article")
@@ -297,7 +413,7 @@ def main() -> None:
         logger.info("Hero image generation skipped/failed; frontend fallback will be used")
 
     # Build digest
-    digest = Digest(
+    state.digest = Digest(
         generated_at=datetime.now(timezone.utc),
         intro_summary=intro,
         sections=sections,
@@ -308,16 +424,29 @@ def main() -> None:
             for src in config.get("sources", {}).values()
         ) + 1,  # +1 for GitHub trending
     )
+    return DONE
+
 
-    # Send email
-    logger.info("Sending digest email...")
-    send_digest(digest, config)
+def _stage_email(ctx: RunContext, state: RunState) -> str:
+    ctx.logger.info("Sending digest email...")
+    report = send_digest(state.digest, ctx.config)
+    state.meta["delivered_subscribers"] = report.subscriber_ids
+    return DONE
+
+
+def _stage_export(ctx: RunContext, state: RunState) -> str:
+    logger, digest = ctx.logger, state.digest
 
     # Export to Supabase
     try:
         from supabase_export import save_digest_to_supabase
         digest_id = save_digest_to_supabase(digest)
+        state.meta["digest_id"] = digest_id
         logger.info("Digest persisted to Supabase (id=%s)", digest_id)
+        try:
+            record_sends(digest_id, state.meta.get("delivered_subscribers", []))
+        except Exception as e:
+            logger.warning("Failed to record newsletter sends: %s", e)
     except Exception as e:
         logger.warning("Supabase export failed: %s — falling back to JSON", e)
         try:
@@ -328,9 +457,157 @@ def main() -> None:
             logger.warning("JSON export also failed: %s", e2)
 
     # Update state
-    save_seen(seen, scored)
+    save_seen(
+        ctx.seen,
+        state.items,
+        ctx.config.get("dedup", {}).get("retention_days", RETENTION_DAYS),
+        clusters=state.meta.get("clusters"),
+    )
     save_last_run()
     logger.info("Done! Digest sent with %d items.", digest.total_items)
+    return DONE
+
+
+def _write_run_report(ctx: RunContext, state: RunState, status: str) -> None:
+    """Save the run's telemetry to state/run_report.json and, if configured, Supabase."""
+    telemetry.set_info(
+        digest_id=state.meta.get("digest_id"),
+        digest_items=state.digest.total_items if state.digest else 0,
+    )
+    report = telemetry.report(status)
+    try:
+        telemetry.write_report(report)
+    except OSError as e:
+        ctx.logger.warning("Failed to write run report: %s", e)
+    slowest = max(report["stages"], key=lambda s: s["seconds"], default=None)
+    ctx.logger.info(
+        "Run %s in %.1fs%s; report written to %s",
+        status,
+        report["duration_s"],
+        f" (slowest stage: {slowest['stage']}, {slowest['seconds']:.1f}s)" if slowest else "",
+        telemetry.REPORT_FILE,
+    )
+
+    if ctx.args.dry_run or not ctx.config.get("telemetry", {}).get("report_to_supabase", True):
+        return
+    if get_client() is None:
+        return
+    try:
+        from supabase_export import save_run_report
+        save_run_report(report)
+    except Exception as e:
+        ctx.logger.warning("Failed to save run report to Supabase: %s", e)
+
+
+STAGE_RUNNERS = {
+    "fetch": _stage_fetch,
+    "dedup": _stage_dedup,
+    "cluster": _stage_cluster,
+    "score": _stage_score,
+    "rerank": _stage_rerank,
+    "enrich": _stage_enrich,
+    "summarize": _stage_summarize,
+    "email": _stage_email,
+    "export": _stage_export,
+}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="AI News Digest")
+    parser.add_argument("--dry-run", action="store_true", help="Fetch and score only, no AI or email")
+    parser.add_argument("--force", action="store_true", help="Run even if last run was recent")
+    parser.add_argument("--resume", action="store_true", help="Continue after the last checkpointed stage")
+    parser.add_argument(
+        "--from-stage",
+        choices=checkpoint.STAGES,
+        help="Re-run from this stage using the previous stage's checkpoint",
+    )
+    args = parser.parse_args()
+
+    setup_logging()
+    logger = logging.getLogger("main")
+
+    load_dotenv(BASE_DIR / ".env")
+    config = load_config()
+    ratelimit.configure(config.get("rate_limits", {}))
+
+    resuming = args.resume or args.from_stage is not None
+    if args.from_stage in STREAMING_UNRESUMABLE and config.get("pipeline", {}).get("streaming"):
+        logger.error(
+            "Cannot resume from '%s': with pipeline.streaming on, fetch, dedup and cluster run inside "
+            "the score stage and leave no checkpoints. Use --from-stage fetch to start over, "
+            "or rerank or a later stage.", args.from_stage,
+        )
+        return
+
+    # Check timing
+    if not resuming and not should_run(config, args.force):
+        logger.info("Too soon since last run. Use --force to override.")
+        return
+
+    telemetry.start_run()
+    telemetry.set_info(dry_run=args.dry_run)
+    state = RunState()
+    if resuming:
+        try:
+            start, restore = checkpoint.resume_stage(args.from_stage)
+        except ValueError as e:
+            logger.error("Cannot resume: %s", e)
+            return
+        if start is None:
+            logger.info("Last run already completed every stage; nothing to resume.")
+            return
+        if restore:
+            state.items, state.digest, state.meta = checkpoint.load(restore)
+            state.meta["resumed_from"] = restore
+            logger.info("Resuming at stage '%s' from the '%s' checkpoint", start, restore)
+        telemetry.set_info(resumed_at=start)
+    else:
+        start = checkpoint.STAGES[0]
+        if not args.dry_run:
+            checkpoint.start_run()
+
+    topics = config.get("topics", {})
+
+    # Create Gemini client (used for embeddings + summarization)
+    api_key = os.getenv("GEMINI_API_KEY")
+    gemini_client = genai.Client(api_key=api_key) if api_key else None
+
+    embed_cfg = config.get("embeddings", {})
+    dedup_cfg = config.get("dedup", {})
+    seen = load_seen(bloom_capacity=dedup_cfg.get("bloom_capacity", BLOOM_CAPACITY))
+    near_dup_distance = dedup_cfg.get("near_duplicate_distance", DEFAULT_MAX_DISTANCE)
+    ctx = RunContext(
+        config=config,
+        args=args,
+        logger=logger,
+        topics=topics,
+        seen=seen,
+        gemini_client=gemini_client,
+        embed_cache=EmbeddingCache.load(
+            max_entries=embed_cfg.get("cache_max_entries", 5000),
+            max_age_days=embed_cfg.get("cache_max_age_days", 30),
+        ) if gemini_client else None,
+        max_embed=embed_cfg.get("max_items_per_run", DEFAULT_MAX_EMBED),
+        near_dups=NearDupIndex(near_dup_distance, seen.signatures()) if near_dup_distance >= 0 else None,
+    )
+
+    status = "failed"
+    try:
+        for stage in checkpoint.STAGES[checkpoint.STAGES.index(start):]:
+            with telemetry.stage(stage) as record:
+                result = STAGE_RUNNERS[stage](ctx, state)
+                record.update(result=result, items=len(state.items))
+            if result == STOP:
+                status = "stopped"
+                return
+            if result == DONE and not args.dry_run:
+                checkpoint.save(stage, state.items, state.digest, {
+                    k: v for k, v in state.meta.items() if k != "resumed_from"
+                })
+        status = "completed"
+    finally:
+        _write_run_report(ctx, state, status)
 
 
 if __name__ == "__main__":
@@ -1,9 +1,24 @@
 from __future__ import annotations
 
 import hashlib
+import sys
 from dataclasses import dataclass, field
 from datetime import datetime
 from enum import Enum
+from typing import Iterable, Iterator, Sequence
+
+import numpy as np
+
+from urlcanon import canonicalize
+
+
+def item_id(url: str) -> str:
+    return hashlib.sha256(url.encode()).hexdigest()[:16]
+
+
+def canonical_id(url: str) -> str:
+    """The id of any URL that canonicalizes to the same form as ``url``."""
+    return item_id(canonicalize(url))
 
 
 class SourceType(Enum):
@@ -13,22 +28,194 @@ class SourceType(Enum):
     GITHUB = "github"
 
 
-@dataclass
 class NewsItem:
-    title: str
-    url: str
-    source_name: str
-    source_type: SourceType
-    published: datetime | None = None
-    content_snippet: str = ""
-    score: float = 0.0
-    matched_topics: list[str] = field(default_factory=list)
-    summary: str = ""
-    extra: dict = field(default_factory=dict)  # stars, upvotes, etc.
+    """A fetched story.
+
+    ``url`` is the link as the source gave it; ``id`` hashes its canonical
+    form (see urlcanon.py), so it is the key for dedup. Fetchers pass
+    ``canonical_url`` in, so canonicalization happens once on the fetch
+    threads; otherwise it is derived on first use.
+
+    Slotted to keep per-item memory small on large backfills: ``id`` is
+    hashed once and cached until ``url`` changes, ``source_name`` and topic
+    keys are interned, and ``extra`` / ``matched_topics`` are only allocated
+    when first used. Constructor and attributes match the former dataclass.
+    """
+
+    __slots__ = (
+        "title", "_url", "_canonical_url", "_id", "_source_name", "source_type", "published",
+        "content_snippet", "score", "_matched_topics", "summary", "_extra",
+    )
+
+    def __init__(
+        self,
+        title: str,
+        url: str,
+        source_name: str,
+        source_type: SourceType,
+        published: datetime | None = None,
+        content_snippet: str = "",
+        score: float = 0.0,
+        matched_topics: list[str] | None = None,
+        summary: str = "",
+        extra: dict | None = None,  # stars, upvotes, etc.
+        canonical_url: str | None = None,
+    ):
+        self.title = title
+        self.url = url
+        self._canonical_url = canonical_url
+        self.source_name = source_name
+        self.source_type = source_type
+        self.published = published
+        self.content_snippet = content_snippet
+        self.score = score
+        self.matched_topics = matched_topics
+        self.summary = summary
+        self._extra = extra or None
+
+    @property
+    def url(self) -> str:
+        return self._url
+
+    @url.setter
+    def url(self, value: str) -> None:
+        self._url = value
+        self._canonical_url = None
+        self._id = None
+
+    @property
+    def canonical_url(self) -> str:
+        if self._canonical_url is None:
+            self._canonical_url = canonicalize(self._url)
+        return self._canonical_url
 
     @property
     def id(self) -> str:
-        return hashlib.sha256(self.url.encode()).hexdigest()[:16]
+        if self._id is None:
+            self._id = item_id(self.canonical_url)
+        return self._id
+
+    @property
+    def source_name(self) -> str:
+        return self._source_name
+
+    @source_name.setter
+    def source_name(self, value: str) -> None:
+        self._source_name = sys.intern(value)
+
+    @property
+    def matched_topics(self) -> list[str]:
+        if self._matched_topics is None:
+            self._matched_topics = []
+        return self._matched_topics
+
+    @matched_topics.setter
+    def matched_topics(self, value: list[str] | None) -> None:
+        self._matched_topics = [sys.intern(t) for t in value] if value else None
+
+    @property
+    def extra(self) -> dict:
+        if self._extra is None:
+            self._extra = {}
+        return self._extra
+
+    @extra.setter
+    def extra(self, value: dict) -> None:
+        self._extra = value
+
+    def _fields(self) -> tuple:
+        return (
+            self.title, self._url, self._source_name, self.source_type, self.published,
+            self.content_snippet, self.score, self._matched_topics or [], self.summary,
+            self._extra or {},
+        )
+
+    def __eq__(self, other: object) -> bool:
+        if other.__class__ is not self.__class__:
+            return NotImplemented
+        return self._fields() == other._fields()
+
+    __hash__ = None  # mutable, like the dataclass it replaces
+
+    def __repr__(self) -> str:
+        return (
+            f"NewsItem(title={self.title!r}, url={self._url!r}, source_name={self._source_name!r}, "
+            f"source_type={self.source_type!r}, score={self.score!r})"
+        )
+
+
+_SOURCE_CODES = {st: code for code, st in enumerate(SourceType)}
+
+
+class NewsBatch:
+    """Columnar view of a list of NewsItems for the scoring and ranking stages.
+
+    Numeric columns are NumPy arrays: ``score``, ``published`` (unix seconds,
+    NaN when unknown), ``source_type`` (index into SourceType) and
+    ``primary_topic`` (index into ``topic_keys``, -1 for none). ``titles``,
+    ``snippets`` and ``matched`` are plain lists alongside; ``matched`` shares
+    each item's own topic list (None when it has none) instead of copying it.
+    ``items`` keeps the NewsItem objects; ``to_items()`` writes scores and
+    changed topics back to them for the object-based stages.
+    """
+
+    def __init__(self, items: Iterable[NewsItem], topic_keys: Iterable[str] = ()):
+        self.items = list(items)
+        self.topic_keys = list(topic_keys)
+        self._topic_codes = {key: code for code, key in enumerate(self.topic_keys)}
+        self.titles = [item.title for item in self.items]
+        self.snippets = [item.content_snippet for item in self.items]
+        self.score = np.fromiter((item.score for item in self.items), dtype=np.float64, count=len(self.items))
+        self.published = np.fromiter(
+            (item.published.timestamp() if item.published else np.nan for item in self.items),
+            dtype=np.float64,
+            count=len(self.items),
+        )
+        self.source_type = np.fromiter(
+            (_SOURCE_CODES[item.source_type] for item in self.items), dtype=np.int8, count=len(self.items)
+        )
+        # Rows are replaced by set_matched, never mutated, so sharing is safe
+        self.matched: list[list[str] | None] = [item._matched_topics for item in self.items]
+        self.primary_topic = np.fromiter(
+            (self.topic_code(m[0]) if m else -1 for m in self.matched), dtype=np.int16, count=len(self.items)
+        )
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def __iter__(self) -> Iterator[NewsItem]:
+        return iter(self.items)
+
+    def topic_code(self, topic_key: str) -> int:
+        return self._topic_codes.get(topic_key, -1)
+
+    def set_matched(self, row: int, topics: list[str]) -> None:
+        self.matched[row] = topics or None
+        self.primary_topic[row] = self.topic_code(topics[0]) if topics else -1
+
+    def take(self, rows: Sequence[int] | np.ndarray) -> NewsBatch:
+        """A new batch of the given rows, in that order (columns are copied)."""
+        rows = np.asarray(rows, dtype=np.intp)
+        batch = NewsBatch.__new__(NewsBatch)
+        batch.topic_keys = self.topic_keys
+        batch._topic_codes = self._topic_codes
+        batch.items = [self.items[i] for i in rows]
+        batch.titles = [self.titles[i] for i in rows]
+        batch.snippets = [self.snippets[i] for i in rows]
+        batch.matched = [self.matched[i] for i in rows]
+        batch.score = self.score[rows]
+        batch.published = self.published[rows]
+        batch.source_type = self.source_type[rows]
+        batch.primary_topic = self.primary_topic[rows]
+        return batch
+
+    def to_items(self) -> list[NewsItem]:
+        """Write scores and matched topics back to the items and return them."""
+        for item, score, matched in zip(self.items, self.score.tolist(), self.matched):
+            item.score = score
+            if matched is not item._matched_topics:
+                item.matched_topics = matched
+        return self.items
 
 
 @dataclass
@@ -0,0 +1,73 @@
+"""Streaming fetch -> dedup -> cluster -> keyword-score stage.
+
+Each source's items are deduplicated and keyword-scored as soon as that source
+finishes downloading, instead of after the whole fetch phase. Zero-score items
+are capped at the number semantic rerank can actually embed, so memory stays
+bounded however large the lookback window is.
+"""
+from __future__ import annotations
+
+import logging
+from dataclasses import dataclass
+
+from cluster import NearDupIndex, cluster_near_duplicates
+from dedup import SeenStore, filter_new
+from embedding_cache import EmbeddingCache
+from fetchers import iter_fetch
+from models import NewsItem
+from scorer import EMBED_MODEL, embed_text, score_items
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class StreamStats:
+    fetched: int = 0
+    new: int = 0
+    near_duplicates: int = 0
+    keyword_matched: int = 0
+    zero_score_dropped: int = 0
+
+
+def stream_candidates(
+    config: dict,
+    seen: SeenStore,
+    topics: dict,
+    zero_score_cap: int,
+    embed_cache: EmbeddingCache | None = None,
+    near_dups: NearDupIndex | None = None,
+) -> tuple[list[NewsItem], StreamStats]:
+    """Fetch, dedup, cluster and keyword-score items source by source.
+
+    Keeps every keyword-matched item plus the first ``zero_score_cap``
+    zero-score items, in fetch-completion order, which is exactly the set
+    semantic_rerank would consider from the fully materialized list.
+    Zero-score items whose embedding is already cached cost no quota and are
+    always kept.
+    """
+    stats = StreamStats()
+    candidates: list[NewsItem] = []
+    zero_kept = 0
+
+    for batch in iter_fetch(config):
+        stats.fetched += len(batch)
+        new_items = filter_new(batch, seen)
+        stats.new += len(new_items)
+        if near_dups is not None:
+            representatives = cluster_near_duplicates(new_items, near_dups)
+            stats.near_duplicates += len(new_items) - len(representatives)
+            new_items = representatives
+
+        for item in score_items(new_items, topics):
+            if item.score > 0:
+                stats.keyword_matched += 1
+                candidates.append(item)
+            elif zero_kept < zero_score_cap:
+                zero_kept += 1
+                candidates.append(item)
+            elif embed_cache is not None and embed_cache.contains(EMBED_MODEL, embed_text(item)):
+                candidates.append(item)
+            else:
+                stats.zero_score_dropped += 1
+
+    return candidates, stats
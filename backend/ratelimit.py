@@ -0,0 +1,164 @@
+"""Token-bucket rate limiting shared by the outbound API clients.
+
+Each provider (gemini, openai, firecrawl) gets one RateLimiter built from the
+``rate_limits`` section of config.yaml. Every call draws from a requests
+bucket and, optionally, a tokens bucket, and holds a concurrency slot, so
+throughput settles just under the quota instead of bursting into 429s.
+"""
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from email.utils import parsedate_to_datetime
+from typing import Iterator
+
+logger = logging.getLogger(__name__)
+
+
+class TokenBucket:
+    """Refills ``per_minute`` units per minute up to one minute's worth.
+
+    Callers reserve before they wait: the balance may go negative, which
+    queues later callers behind earlier ones in arrival order.
+    """
+
+    def __init__(self, per_minute: float):
+        self.rate = per_minute / 60.0
+        self.capacity = float(per_minute)
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount: float) -> float:
+        """Debit ``amount`` and return how many seconds to wait before using it."""
+        amount = min(amount, self.capacity)
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            return 0.0 if self._tokens >= 0 else -self._tokens / self.rate
+
+    def drain(self) -> None:
+        """Empty the bucket, e.g. after the server reported we are over quota."""
+        with self._lock:
+            self._tokens = min(self._tokens, 0.0)
+            self._updated = time.monotonic()
+
+
+class RateLimiter:
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: float | None = None,
+        tokens_per_minute: float | None = None,
+        max_concurrent: int | None = None,
+    ):
+        self.name = name
+        self.requests = TokenBucket(requests_per_minute) if requests_per_minute else None
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._slots = threading.BoundedSemaphore(max_concurrent) if max_concurrent else None
+        self._paused_until = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def max_batch(self) -> int | None:
+        """Largest number of requests a single call may count for."""
+        return int(self.requests.capacity) if self.requests else None
+
+    @contextmanager
+    def limit(self, requests: int = 1, tokens: int = 0) -> Iterator[None]:
+        """Hold a concurrency slot and wait until the buckets allow this call."""
+        if self._slots:
+            self._slots.acquire()
+        try:
+            wait = 0.0
+            if self.requests:
+                wait = max(wait, self.requests.reserve(requests))
+            if self.tokens and tokens:
+                wait = max(wait, self.tokens.reserve(tokens))
+            with self._lock:
+                wait = max(wait, self._paused_until - time.monotonic())
+            if wait > 0:
+                logger.debug("Rate limiter %s: waiting %.2fs", self.name, wait)
+                time.sleep(wait)
+            yield
+        finally:
+            if self._slots:
+                self._slots.release()
+
+    def backoff(self, seconds: float) -> None:
+        """Pause every caller for ``seconds`` after a server-side rate limit."""
+        with self._lock:
+            self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        for bucket in (self.requests, self.tokens):
+            if bucket:
+                bucket.drain()
+        logger.warning("Rate limited by %s, pausing calls for %.1fs", self.name, seconds)
+
+
+_limiters: dict[str, RateLimiter] = {}
+_registry_lock = threading.Lock()
+
+
+def configure(rate_limits: dict) -> None:
+    """Build limiters from the ``rate_limits`` config section."""
+    with _registry_lock:
+        _limiters.clear()
+        for name, cfg in (rate_limits or {}).items():
+            _limiters[name] = RateLimiter(name, **(cfg or {}))
+
+
+def get_limiter(name: str) -> RateLimiter:
+    """Return the limiter for a provider; unconfigured providers are unlimited."""
+    with _registry_lock:
+        limiter = _limiters.get(name)
+        if limiter is None:
+            limiter = _limiters[name] = RateLimiter(name)
+        return limiter
+
+
+def is_rate_limit_error(exc: Exception) -> bool:
+    """True for HTTP 429 / quota errors from the OpenAI, Gemini or requests clients."""
+    for attr in ("status_code", "code"):
+        if getattr(exc, attr, None) == 429:
+            return True
+    response = getattr(exc, "response", None)
+    if getattr(response, "status_code", None) == 429:
+        return True
+    err = str(exc)
+    return "429" in err or "RESOURCE_EXHAUSTED" in err or "rate limit" in err.lower()
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Seconds to wait from a Retry-After value, in delay-seconds or HTTP-date form."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    if when.tzinfo is None:
+        when = when.replace(tzinfo=timezone.utc)
+    return max(0.0, (when - datetime.now(timezone.utc)).total_seconds())
+
+
+def retry_after(exc: Exception) -> float | None:
+    """Seconds from a Retry-After header on the error's response, if present."""
+    headers = getattr(getattr(exc, "response", None), "headers", None) or {}
+    try:
+        return parse_retry_after(headers.get("retry-after") or headers.get("Retry-After"))
+    except (AttributeError, TypeError):
+        return None
+
+
+def estimate_tokens(*texts: str) -> int:
+    """Rough token count (~4 characters per token)."""
+    return sum(len(t) for t in texts) // 4 + 1
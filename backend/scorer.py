@@ -6,7 +6,10 @@ import re
 import numpy as np
 from google import genai
 
-from models import NewsItem, DigestSection
+import telemetry
+from embedding_cache import EmbeddingCache
+from models import NewsBatch, NewsItem, DigestSection
+from ratelimit import estimate_tokens, get_limiter, is_rate_limit_error, retry_after
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +18,89 @@ EMBED_MODEL = "gemini-embedding-001"
 EMBED_BATCH_SIZE = 100
 SEMANTIC_THRESHOLD = 0.65  # Min similarity to assign a topic to a zero-keyword item
 SEMANTIC_SCALE = 20.0      # Max bonus: similarity 1.0 -> +20 points
+DEFAULT_MAX_EMBED = 300    # Texts per run; pacing comes from the "gemini" rate limiter
+
+
+class KeywordIndex:
+    """Every topic keyword compiled once into a single-pass scanner.
+
+    One regex with a lookahead alternation finds each position where any
+    keyword starts; keywords starting there are confirmed with startswith and
+    counted non-overlapping left to right, which is exactly what re.findall
+    returns for each keyword on its own.
+    """
+
+    def __init__(self, topics: dict):
+        self.topic_keys = list(topics.keys())
+        self.weights = [topics[key].get("weight", 1) for key in self.topic_keys]
+        # Per topic, its lowercased keywords in config order (repeats kept)
+        self.topic_keywords: list[list[str]] = []
+        self.keyword_topics: dict[str, list[int]] = {}
+        for idx, key in enumerate(self.topic_keys):
+            kws = [kw.lower() for kw in topics[key].get("keywords", []) if kw]
+            self.topic_keywords.append(kws)
+            for kw in kws:
+                topic_idxs = self.keyword_topics.setdefault(kw, [])
+                if idx not in topic_idxs:
+                    topic_idxs.append(idx)
+
+        self._by_first: dict[str, list[str]] = {}
+        for kw in self.keyword_topics:
+            self._by_first.setdefault(kw[0], []).append(kw)
+        alternation = "|".join(re.escape(kw) for kw in sorted(self.keyword_topics, key=len, reverse=True))
+        self._starts = re.compile(f"(?=(?:{alternation}))") if alternation else None
+
+    def count(self, text: str) -> dict[str, int]:
+        """Non-overlapping hit count per keyword in an already-lowercased text."""
+        counts: dict[str, int] = {}
+        if self._starts is None:
+            return counts
+        next_free: dict[str, int] = {}
+        by_first = self._by_first
+        for m in self._starts.finditer(text):
+            pos = m.start()
+            for kw in by_first[text[pos]]:
+                if pos >= next_free.get(kw, 0) and text.startswith(kw, pos):
+                    counts[kw] = counts.get(kw, 0) + 1
+                    next_free[kw] = pos + len(kw)
+        return counts
+
+    def score(self, title_lower: str, snippet_lower: str) -> tuple[float, list[str]]:
+        """Return (total score, matched topic keys) for one item."""
+        title_hits = self.count(title_lower)
+        snippet_hits = self.count(snippet_lower)
+        if not title_hits and not snippet_hits:
+            return 0.0, []
+
+        touched: set[int] = set()
+        for kw in (*title_hits, *snippet_hits):
+            touched.update(self.keyword_topics[kw])
+
+        total_score = 0.0
+        matched: list[str] = []
+        for idx in sorted(touched):
+            weight = self.weights[idx]
+            topic_score = 0.0
+            # Accumulate in config order so float weights sum identically
+            for kw in self.topic_keywords[idx]:
+                hits = title_hits.get(kw, 0) * 3 + snippet_hits.get(kw, 0)
+                if hits:
+                    topic_score += hits * weight
+            if topic_score > 0:
+                total_score += topic_score
+                matched.append(self.topic_keys[idx])
+        return total_score, matched
+
+
+_index_cache: tuple[dict, KeywordIndex] | None = None
+
+
+def keyword_index(topics: dict) -> KeywordIndex:
+    """Return the KeywordIndex for a topics config, reusing the last one built."""
+    global _index_cache
+    if _index_cache is None or _index_cache[0] is not topics:
+        _index_cache = (topics, KeywordIndex(topics))
+    return _index_cache[1]
 
 
 def score_items(items: list[NewsItem], topics: dict) -> list[NewsItem]:
@@ -23,64 +109,64 @@ def score_items(items: list[NewsItem], topics: dict) -> list[NewsItem]:
     Title matches count 3x, content_snippet matches count 1x.
     Each match is multiplied by the topic's weight.
     Returns all items (including zero-score) for semantic re-ranking.
+    Scores the items directly; callers that already hold a NewsBatch use
+    score_batch instead of building another.
     """
+    index = keyword_index(topics)
     for item in items:
-        total_score = 0.0
-        matched: list[str] = []
-        title_lower = item.title.lower()
-        snippet_lower = item.content_snippet.lower()
-
-        for topic_key, topic_cfg in topics.items():
-            weight = topic_cfg.get("weight", 1)
-            topic_score = 0.0
+        item.score, item.matched_topics = index.score(
+            item.title.lower(), item.content_snippet.lower()
+        )
 
-            for kw in topic_cfg.get("keywords", []):
-                kw_lower = kw.lower()
-                # Use word-boundary-aware search for short keywords
-                pattern = re.escape(kw_lower)
-                title_hits = len(re.findall(pattern, title_lower))
-                snippet_hits = len(re.findall(pattern, snippet_lower))
-                topic_score += (title_hits * 3 + snippet_hits) * weight
+    return items
 
-            if topic_score > 0:
-                total_score += topic_score
-                matched.append(topic_key)
 
-        item.score = total_score
-        item.matched_topics = matched
+def score_batch(batch: NewsBatch, topics: dict) -> NewsBatch:
+    """Batch-native score_items: fills the score and topic columns in place."""
+    index = keyword_index(topics)
+    for row, (title, snippet) in enumerate(zip(batch.titles, batch.snippets)):
+        batch.score[row], matched = index.score(title.lower(), snippet.lower())
+        batch.set_matched(row, matched)
+    return batch
 
-    return items
 
+def _normalize_rows(matrix: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """L2-normalize each row; returns (normalized matrix, mask of zero rows)."""
+    norms = np.linalg.norm(matrix, axis=1)
+    zero = norms == 0.0
+    norms[zero] = 1.0
+    return matrix / norms[:, None], zero
 
-def _cosine_similarity(a: np.ndarray, b: np.ndarray) -> float:
-    """Cosine similarity between two 1-D numpy arrays."""
-    denom = np.linalg.norm(a) * np.linalg.norm(b)
-    if denom == 0.0:
-        return 0.0
-    return float(np.dot(a, b) / denom)
 
+def _embed_uncached(client: genai.Client, texts: list[str]) -> list[np.ndarray]:
+    """Embed a list of texts in batches, returning one numpy vector per text.
 
-def _batch_embed(client: genai.Client, texts: list[str]) -> list[np.ndarray]:
-    """Embed a list of texts in batches, returning one numpy vector per text."""
-    import time
+    Each text counts as one request against the "gemini" rate limiter.
+    """
+    limiter = get_limiter("gemini")
+    batch_size = min(EMBED_BATCH_SIZE, limiter.max_batch or EMBED_BATCH_SIZE)
     all_vectors: list[np.ndarray] = []
-    for start in range(0, len(texts), EMBED_BATCH_SIZE):
-        batch = texts[start : start + EMBED_BATCH_SIZE]
+    for start in range(0, len(texts), batch_size):
+        batch = texts[start : start + batch_size]
         for attempt in range(3):
             try:
-                response = client.models.embed_content(
-                    model=EMBED_MODEL,
-                    contents=batch,
-                )
+                telemetry.incr("gemini.calls")
+                with limiter.limit(requests=len(batch), tokens=estimate_tokens(*batch)), \
+                        telemetry.span("gemini.embed"):
+                    response = client.models.embed_content(
+                        model=EMBED_MODEL,
+                        contents=batch,
+                    )
                 for embedding in response.embeddings:
                     all_vectors.append(np.array(embedding.values, dtype=np.float32))
+                telemetry.incr("gemini.texts", len(batch))
                 break
             except Exception as e:
-                if "429" in str(e) or "RESOURCE_EXHAUSTED" in str(e):
-                    wait = 2 ** attempt
-                    logger.warning("Embedding rate limited, retrying in %ds...", wait)
-                    time.sleep(wait)
+                if is_rate_limit_error(e):
+                    telemetry.incr("gemini.rate_limited")
+                    limiter.backoff(retry_after(e) or 2 ** attempt)
                 else:
+                    telemetry.incr("gemini.errors")
                     logger.error("Embedding batch failed: %s", e)
                     all_vectors.extend([np.zeros(3072, dtype=np.float32)] * len(batch))
                     break
@@ -90,114 +176,213 @@ def _batch_embed(client: genai.Client, texts: list[str]) -> list[np.ndarray]:
     return all_vectors
 
 
+def _batch_embed(
+    client: genai.Client,
+    texts: list[str],
+    cache: EmbeddingCache | None = None,
+) -> list[np.ndarray]:
+    """Embed texts, serving what it can from the cache and caching new vectors."""
+    if cache is None:
+        return _embed_uncached(client, texts)
+
+    vectors: list[np.ndarray | None] = [cache.get(EMBED_MODEL, t) for t in texts]
+    missing = [i for i, vec in enumerate(vectors) if vec is None]
+    if missing:
+        fresh = _embed_uncached(client, [texts[i] for i in missing])
+        for i, vec in zip(missing, fresh):
+            vectors[i] = vec
+            if np.any(vec):  # never cache the zero vectors of failed batches
+                cache.put(EMBED_MODEL, texts[i], vec)
+    telemetry.incr("gemini.cache_hit", len(texts) - len(missing))
+    telemetry.incr("gemini.cache_miss", len(missing))
+    logger.info("Embedding cache: %d/%d texts cached", len(texts) - len(missing), len(texts))
+    return vectors
+
+
+def embed_text(item: NewsItem) -> str:
+    """The text embedded for an item."""
+    return f"{item.title}. {item.content_snippet[:300]}"
+
+
+def _topic_texts(topics: dict) -> list[str]:
+    """Description strings embedded for each topic, in config order."""
+    topic_texts: list[str] = []
+    for key, cfg in topics.items():
+        if cfg.get("semantic_description"):
+            topic_texts.append(cfg["semantic_description"])
+        else:
+            kws = ", ".join(cfg.get("keywords", []))
+            topic_texts.append(f"{cfg.get('label', key)}: {kws}")
+    return topic_texts
+
+
+def max_embed_items(
+    topics: dict,
+    cache: EmbeddingCache | None = None,
+    max_embed: int = DEFAULT_MAX_EMBED,
+) -> int:
+    """Number of uncached items semantic_rerank will embed per run.
+
+    Slots are reserved only for topic descriptions that still need an API call.
+    """
+    texts = _topic_texts(topics)
+    if cache is not None:
+        texts = [t for t in texts if not cache.contains(EMBED_MODEL, t)]
+    return max_embed - len(texts)
+
+
 def semantic_rerank(
     items: list[NewsItem],
     topics: dict,
     client: genai.Client,
+    cache: EmbeddingCache | None = None,
+    max_embed: int = DEFAULT_MAX_EMBED,
 ) -> list[NewsItem]:
     """Re-score items using semantic similarity to topic descriptions.
 
     Adds a semantic bonus to existing keyword scores.
     Assigns matched_topics for items that had no keyword match but are
     semantically similar to a topic above SEMANTIC_THRESHOLD.
+    At most ``max_embed`` texts are sent to the API per run; cached
+    embeddings do not count against it.
     """
     if not items:
         return items
+    return semantic_rerank_batch(NewsBatch(items, topics), topics, client, cache, max_embed).to_items()
+
+
+def semantic_rerank_batch(
+    batch: NewsBatch,
+    topics: dict,
+    client: genai.Client,
+    cache: EmbeddingCache | None = None,
+    max_embed: int = DEFAULT_MAX_EMBED,
+) -> NewsBatch:
+    """Batch-native semantic_rerank; returns the rows scoring above 0.5."""
+    if not len(batch):
+        return batch
 
     # Pre-filter: keep all keyword-matched items, plus top zero-score items
-    # to stay under the free tier limit of 100 texts/minute
-    keyword_items = [i for i in items if i.score > 0]
-    zero_items = [i for i in items if i.score == 0]
-    max_embed = 90 - len(topics)  # Reserve slots for topic descriptions
-    if len(keyword_items) >= max_embed:
-        embed_items = keyword_items[:max_embed]
-    else:
-        embed_items = keyword_items + zero_items[:max_embed - len(keyword_items)]
-    embed_ids = {id(i) for i in embed_items}
-    remaining = [i for i in items if id(i) not in embed_ids]
+    # up to the per-run embedding budget
+    keyword_mask = batch.score > 0
+    candidates = np.concatenate([np.flatnonzero(keyword_mask), np.flatnonzero(batch.score == 0)])
+    budget = max_embed_items(topics, cache, max_embed)
+    embed_rows: list[int] = []
+    for row in candidates.tolist():
+        if cache is not None and cache.contains(EMBED_MODEL, embed_text(batch.items[row])):
+            embed_rows.append(row)
+        elif budget > 0:
+            embed_rows.append(row)
+            budget -= 1
+    embed_idx = np.array(embed_rows, dtype=np.intp)
+    remaining_mask = np.ones(len(batch), dtype=bool)
+    remaining_mask[embed_idx] = False
+    n_keyword = int(keyword_mask[embed_idx].sum())
     logger.info(
         "Embedding %d items (%d keyword + %d zero-score candidates)",
-        len(embed_items),
-        len(keyword_items),
-        len(embed_items) - min(len(keyword_items), len(embed_items)),
+        len(embed_idx),
+        n_keyword,
+        len(embed_idx) - n_keyword,
     )
 
-    # Build topic description strings
     topic_keys = list(topics.keys())
-    topic_texts: list[str] = []
-    for key in topic_keys:
-        cfg = topics[key]
-        if cfg.get("semantic_description"):
-            topic_texts.append(cfg["semantic_description"])
-        else:
-            kws = ", ".join(cfg.get("keywords", []))
-            topic_texts.append(f"{cfg.get('label', key)}: {kws}")
+    topic_texts = _topic_texts(topics)
 
     logger.info("Embedding %d topic descriptions...", len(topic_texts))
-    topic_vectors = _batch_embed(client, topic_texts)
+    topic_vectors = _batch_embed(client, topic_texts, cache)
 
-    # Build item texts for embedding
-    item_texts = [
-        f"{item.title}. {item.content_snippet[:300]}"
-        for item in embed_items
-    ]
+    item_texts = [embed_text(batch.items[row]) for row in embed_rows]
 
-    logger.info("Embedding %d items for semantic scoring...", len(embed_items))
-    item_vectors = _batch_embed(client, item_texts)
+    logger.info("Embedding %d items for semantic scoring...", len(embed_rows))
+    item_vectors = _batch_embed(client, item_texts, cache)
 
-    # Score each embedded item against topics
-    for item, item_vec in zip(embed_items, item_vectors):
-        best_sim = 0.0
-        best_topic_key = None
+    # Score all embedded items against all topics in one matmul
+    if embed_rows and topic_keys:
+        item_matrix, failed = _normalize_rows(np.vstack(item_vectors).astype(np.float64))
+        topic_matrix, _ = _normalize_rows(np.vstack(topic_vectors).astype(np.float64))
+        sims = item_matrix @ topic_matrix.T  # zero-norm topics score 0, as before
+        best_idx = sims.argmax(axis=1)  # first topic wins ties
+        best_sims = np.maximum(sims[np.arange(len(embed_rows)), best_idx], 0.0)
 
-        for topic_key, topic_vec in zip(topic_keys, topic_vectors):
-            sim = _cosine_similarity(item_vec, topic_vec)
-            if sim > best_sim:
-                best_sim = sim
-                best_topic_key = topic_key
+        if failed.any():
+            logger.warning(
+                "No embedding for %d items; keeping their keyword scores without a semantic bonus",
+                int(failed.sum()),
+            )
 
         # Add semantic bonus
-        item.score += best_sim * SEMANTIC_SCALE
+        ok = ~failed
+        batch.score[embed_idx[ok]] += best_sims[ok] * SEMANTIC_SCALE
 
         # Assign topic for items that had no keyword match
-        if not item.matched_topics and best_sim >= SEMANTIC_THRESHOLD and best_topic_key:
-            item.matched_topics = [best_topic_key]
+        rescue = ok & (best_sims >= SEMANTIC_THRESHOLD)
+        for pos in np.flatnonzero(rescue).tolist():
+            row = embed_rows[pos]
+            if batch.matched[row]:
+                continue
+            best_topic_key = topic_keys[best_idx[pos]]
+            batch.set_matched(row, [best_topic_key])
             logger.debug(
                 "Semantic rescue: '%s' -> topic '%s' (sim=%.3f)",
-                item.title[:60],
+                batch.titles[row][:60],
                 best_topic_key,
-                best_sim,
+                best_sims[pos],
             )
 
     # Combine embedded items with remaining items, drop irrelevant ones
-    all_items = embed_items + remaining
-    return [item for item in all_items if item.score > 0.5]
+    order = np.concatenate([embed_idx, np.flatnonzero(remaining_mask)])
+    return batch.take(order[batch.score[order] > 0.5])
 
 
 def sort_and_limit(items: list[NewsItem], max_items: int) -> list[NewsItem]:
-    """Sort by score descending and limit to max_items."""
+    """Sort by score descending (in place) and limit to max_items."""
     items.sort(key=lambda x: x.score, reverse=True)
     return items[:max_items]
 
 
+def top_k_rows(score: np.ndarray, k: int) -> np.ndarray:
+    """Rows of the k highest scores, highest first, ties in input order.
+
+    Same result as a stable descending sort truncated to k, but only the
+    selected rows are sorted.
+    """
+    n = len(score)
+    if k <= 0 or n == 0:
+        return np.zeros(0, dtype=np.intp)
+    if k < n:
+        # Everything strictly above the k-th score, then the earliest ties to fill
+        kth = score[np.argpartition(-score, k - 1)[k - 1]]
+        above = np.flatnonzero(score > kth)
+        ties = np.flatnonzero(score == kth)[: k - len(above)]
+        rows = np.concatenate([above, ties])
+    else:
+        rows = np.arange(n)
+    return rows[np.lexsort((rows, -score[rows]))]
+
+
+def sort_and_limit_batch(batch: NewsBatch, max_items: int) -> NewsBatch:
+    """Batch-native sort_and_limit."""
+    return batch.take(top_k_rows(batch.score, max_items))
+
+
 def group_into_sections(items: list[NewsItem], topics: dict) -> list[DigestSection]:
     """Group scored items into sections by their highest-scoring topic."""
-    section_map: dict[str, list[NewsItem]] = {}
+    return group_batch_into_sections(NewsBatch(items, topics), topics)
 
-    for item in items:
-        if not item.matched_topics:
-            continue
-        # Use the first matched topic (highest weight match) as the section
-        primary_topic = item.matched_topics[0]
-        section_map.setdefault(primary_topic, []).append(item)
 
-    # Build sections in the order topics are defined in config
+def group_batch_into_sections(batch: NewsBatch, topics: dict) -> list[DigestSection]:
+    """Batch-native group_into_sections.
+
+    The first matched topic (highest weight match) is the section; sections
+    follow the order topics are defined in config.
+    """
     sections: list[DigestSection] = []
     for topic_key, topic_cfg in topics.items():
-        if topic_key in section_map:
+        rows = np.flatnonzero(batch.primary_topic == batch.topic_code(topic_key))
+        if len(rows):
             sections.append(DigestSection(
                 title=topic_cfg.get("label", topic_key),
-                items=section_map[topic_key],
+                items=[batch.items[i] for i in rows],
             ))
 
     return sections
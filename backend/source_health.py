@@ -0,0 +1,188 @@
+"""Per-source fetch history and the scheduling decisions drawn from it.
+
+Every fetch records its latency, item count and outcome, keyed by source (the
+feed URL, or ``github:...`` for the GitHub fetchers). Before the next run's
+fetch, the history decides for each source whether it is due and how to
+fetch it:
+
+- after ``failure_threshold`` consecutive failures a source is backed off
+  exponentially, starting at two run intervals, up to ``max_backoff_hours``;
+- a source that yields little and has posted nothing recently is polled less
+  often, at most ``max_quiet_interval_hours`` apart;
+- a source polled after a gap gets its lookback widened to cover the gap, so
+  skipped runs do not lose its items (the seen store drops repeats);
+- the request timeout follows the source's usual latency instead of the flat
+  default, so a slow source fails fast.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from models import NewsItem
+
+logger = logging.getLogger(__name__)
+
+HEALTH_FILE = Path(__file__).parent / "state" / "source_health.json"
+EWMA_ALPHA = 0.3
+DUE_GRACE_HOURS = 2  # Scheduled runs drift; a source due shortly after now still counts as due
+
+
+@dataclass
+class SchedulePolicy:
+    run_interval_hours: float = 24
+    adaptive: bool = True
+    failure_threshold: int = 3
+    max_backoff_hours: float = 168
+    low_yield_items: float = 1.0  # Average items per fetch below which a quiet source slows down
+    max_quiet_interval_hours: float = 72
+    max_lookback_hours: float = 168
+    timeout_seconds: float = 15
+    min_timeout_seconds: float = 5
+
+    @classmethod
+    def from_config(cls, config: dict) -> SchedulePolicy:
+        fetch_cfg = config.get("fetch") or {}
+        policy = cls(run_interval_hours=config.get("schedule", {}).get("interval_days", 1) * 24)
+        for name in ("adaptive", "failure_threshold", "max_backoff_hours", "low_yield_items",
+                     "max_quiet_interval_hours", "max_lookback_hours", "timeout_seconds", "min_timeout_seconds"):
+            if name in fetch_cfg:
+                setattr(policy, name, type(getattr(policy, name))(fetch_cfg[name]))
+        return policy
+
+
+def _parse(ts: str | None) -> datetime | None:
+    return datetime.fromisoformat(ts) if ts else None
+
+
+def _ewma(previous: float | None, value: float) -> float:
+    return value if previous is None else previous + EWMA_ALPHA * (value - previous)
+
+
+class SourceHealth:
+    """Thread-safe, JSON-backed fetch history per source.
+
+    Layout: {key: {"name", "first_seen", "fetches", "failures",
+    "failure_streak", "latency_s", "avg_items", "last_success",
+    "last_failure", "last_error", "last_new_item"}} with timestamps as ISO
+    strings; ``latency_s`` and ``avg_items`` are moving averages over
+    successful fetches.
+    """
+
+    def __init__(self, path: Path = HEALTH_FILE):
+        self.path = path
+        self._lock = threading.Lock()
+        self._sources: dict[str, dict] = {}
+        self._dirty = False
+
+    @classmethod
+    def load(cls, path: Path = HEALTH_FILE) -> SourceHealth:
+        health = cls(path)
+        if path.exists():
+            try:
+                health._sources = json.loads(path.read_text(encoding="utf-8"))
+            except Exception as e:
+                logger.warning("Failed to load source health: %s", e)
+        return health
+
+    def get(self, key: str) -> dict:
+        with self._lock:
+            return dict(self._sources.get(key) or {})
+
+    def _entry(self, key: str, name: str) -> dict:
+        entry = self._sources.get(key)
+        if entry is None:
+            entry = self._sources[key] = {
+                "fetches": 0, "failures": 0, "failure_streak": 0,
+                "first_seen": datetime.now(timezone.utc).isoformat(),
+            }
+        entry["name"] = name
+        self._dirty = True
+        return entry
+
+    def record_success(self, key: str, name: str, seconds: float, items: list[NewsItem]) -> None:
+        now = datetime.now(timezone.utc)
+        newest = max((item.published for item in items if item.published), default=now if items else None)
+        with self._lock:
+            entry = self._entry(key, name)
+            entry["fetches"] += 1
+            entry["failure_streak"] = 0
+            entry["latency_s"] = round(_ewma(entry.get("latency_s"), seconds), 3)
+            entry["avg_items"] = round(_ewma(entry.get("avg_items"), len(items)), 3)
+            entry["last_success"] = now.isoformat()
+            previous = _parse(entry.get("last_new_item"))
+            if newest and (previous is None or newest > previous):
+                entry["last_new_item"] = newest.isoformat()
+
+    def record_failure(self, key: str, name: str, error: str) -> None:
+        with self._lock:
+            entry = self._entry(key, name)
+            entry["fetches"] += 1
+            entry["failures"] += 1
+            entry["failure_streak"] += 1
+            entry["last_failure"] = datetime.now(timezone.utc).isoformat()
+            entry["last_error"] = error[:200]
+
+    def skip_reason(self, key: str, policy: SchedulePolicy, now: datetime) -> str | None:
+        """Why a source should sit this run out, or None if it is due."""
+        entry = self.get(key)
+        if not policy.adaptive or not entry:
+            return None
+        due = now + timedelta(hours=DUE_GRACE_HOURS)
+
+        streak = entry.get("failure_streak", 0)
+        last_failure = _parse(entry.get("last_failure"))
+        if streak >= policy.failure_threshold and last_failure:
+            hours = policy.run_interval_hours * 2 ** (streak - policy.failure_threshold + 1)
+            retry_at = last_failure + timedelta(hours=min(hours, policy.max_backoff_hours))
+            if retry_at > due:
+                return f"backing off after {streak} failures until {retry_at:%Y-%m-%d %H:%M} UTC"
+
+        last_success = _parse(entry.get("last_success"))
+        last_new = _parse(entry.get("last_new_item")) or _parse(entry.get("first_seen"))
+        if last_success and last_new and entry.get("avg_items", 0) < policy.low_yield_items:
+            quiet_hours = (now - last_new).total_seconds() / 3600
+            # Poll about twice per quiet stretch, but never less than once per run
+            interval = min(max(quiet_hours / 2, policy.run_interval_hours), policy.max_quiet_interval_hours)
+            poll_at = last_success + timedelta(hours=interval)
+            if interval > policy.run_interval_hours and poll_at > due:
+                return f"quiet for {quiet_hours / 24:.0f} days, next poll {poll_at:%Y-%m-%d %H:%M} UTC"
+        return None
+
+    def lookback_hours(self, key: str, base_hours: float, policy: SchedulePolicy, now: datetime) -> float:
+        """Lookback covering everything since the source's last successful fetch."""
+        last_success = _parse(self.get(key).get("last_success"))
+        if last_success is None:
+            return base_hours
+        gap = (now - last_success).total_seconds() / 3600 + 1
+        return max(base_hours, min(gap, policy.max_lookback_hours))
+
+    def timeout(self, key: str, policy: SchedulePolicy) -> float:
+        """Request timeout: a few times the usual latency, within the policy's bounds."""
+        latency = self.get(key).get("latency_s")
+        if latency is None:
+            return policy.timeout_seconds
+        return min(policy.timeout_seconds, max(policy.min_timeout_seconds, latency * 4))
+
+    def prune(self, keep_keys: set[str]) -> None:
+        """Drop sources no longer present in the config."""
+        with self._lock:
+            stale = [key for key in self._sources if key not in keep_keys]
+            for key in stale:
+                del self._sources[key]
+            if stale:
+                self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = self.path.with_suffix(".tmp")
+            tmp.write_text(json.dumps(self._sources, indent=1, sort_keys=True), encoding="utf-8")
+            tmp.replace(self.path)
+            self._dirty = False
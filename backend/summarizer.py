@@ -1,17 +1,23 @@
 from __future__ import annotations
 
+import hashlib
 import json
 import logging
 import os
 import re
-import time
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime, timezone
+from pathlib import Path
 
 import requests
 from openai import OpenAI
-from supabase import Client, create_client
+from supabase import Client
 
+import telemetry
+from kvcache import SqliteCache
 from models import NewsItem, DigestSection
+from ratelimit import estimate_tokens, get_limiter, is_rate_limit_error, retry_after
+from supabase_client import get_client, is_configured
 
 logger = logging.getLogger(__name__)
 
@@ -23,10 +29,22 @@ SYSTEM_MSG = (
 )
 
 
+DEFAULT_MAX_CONCURRENCY = 4
+LLM_CACHE_FILE = Path(__file__).parent / "state" / "cache" / "llm.sqlite3"
+
+
 class Summarizer:
-    def __init__(self, api_key: str, model: str = "gpt-4o-mini"):
+    def __init__(
+        self,
+        api_key: str,
+        model: str = "gpt-4o-mini",
+        max_concurrency: int = DEFAULT_MAX_CONCURRENCY,
+        cache: SqliteCache | None = None,
+    ):
         self.client = OpenAI(api_key=api_key)
         self.model = model
+        self.max_concurrency = max(1, max_concurrency)
+        self.cache = cache
         self.hero_bucket = os.getenv("SUPABASE_HERO_IMAGE_BUCKET", "hero-images")
         self.supabase = self._init_supabase_client()
         self._hero_bucket_ready = False
@@ -44,6 +62,13 @@ class Summarizer:
         )
         return self._call(prompt)
 
+    def summarize_items(self, items: list[NewsItem]) -> list[str]:
+        """Summarize items concurrently (up to max_concurrency calls), preserving order."""
+        if not items:
+            return []
+        with ThreadPoolExecutor(max_workers=min(self.max_concurrency, len(items))) as pool:
+            return list(pool.map(self.summarize_item, items))
+
     def summarize_digest(self, sections: list[DigestSection]) -> str:
         """Generate a brief executive overview of the entire digest."""
         overview_lines = []
@@ -138,13 +163,15 @@ class Summarizer:
 
         for attempt in range(2):
             try:
-                response = self.client.images.generate(
-                    model="dall-e-3",
-                    prompt=prompt,
-                    size="1792x1024",
-                    quality="standard",
-                    n=1,
-                )
+                telemetry.incr("openai.image_calls")
+                with get_limiter("openai").limit(), telemetry.span("openai.image"):
+                    response = self.client.images.generate(
+                        model="dall-e-3",
+                        prompt=prompt,
+                        size="1792x1024",
+                        quality="standard",
+                        n=1,
+                    )
                 image_url = (response.data[0].url if response.data else "") or ""
                 if image_url:
                     stored_url = self._store_hero_image(item, image_url)
@@ -154,6 +181,7 @@ class Summarizer:
                     logger.warning("Generated hero image but failed to persist to Supabase")
                     return ""
             except Exception as e:
+                telemetry.incr("openai.errors")
                 logger.warning(
                     "Hero image generation failed (attempt %d/2): %s",
                     attempt + 1,
@@ -164,17 +192,11 @@ class Summarizer:
 
     @staticmethod
     def _init_supabase_client() -> Client | None:
-        """Create a Supabase client for hero-image storage, if configured."""
-        url = os.getenv("SUPABASE_URL", "")
-        key = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
-        if not url or not key:
+        """Return the shared Supabase client for hero-image storage, if configured."""
+        if not is_configured():
             logger.warning("Supabase storage credentials missing; hero images will use fallback")
             return None
-        try:
-            return create_client(url, key)
-        except Exception as e:
-            logger.warning("Failed to initialize Supabase client: %s", e)
-            return None
+        return get_client()
 
     def _ensure_hero_bucket(self) -> bool:
         """Ensure the hero image bucket exists and is public."""
@@ -305,31 +327,57 @@ class Summarizer:
                 return True
         return False
 
+    def _cache_key(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        prompt_hash = hashlib.sha256(f"{SYSTEM_MSG}\0{prompt}".encode()).hexdigest()
+        return f"{self.model}:{temperature}:{max_tokens}:{prompt_hash}"
+
     def _call(self, prompt: str, max_tokens: int = 300, temperature: float = 0.3) -> str:
-        """Make an OpenAI API call with retry on rate limits."""
+        """Make an OpenAI API call, served from the response cache when possible."""
+        key = self._cache_key(prompt, max_tokens, temperature) if self.cache else ""
+        if self.cache:
+            cached = self.cache.get(key)
+            telemetry.incr("openai.cache_hit" if cached is not None else "openai.cache_miss")
+            if cached is not None:
+                logger.info("Cache hit for %s call", self.model)
+                return cached
+
+        text = self._call_api(prompt, max_tokens, temperature)
+        if text and self.cache:
+            self.cache.put(key, text)
+        return text
+
+    def _call_api(self, prompt: str, max_tokens: int, temperature: float) -> str:
+        """Make an OpenAI API call, paced by the "openai" rate limiter."""
+        limiter = get_limiter("openai")
         for attempt in range(3):
             try:
-                response = self.client.chat.completions.create(
-                    model=self.model,
-                    messages=[
-                        {"role": "system", "content": SYSTEM_MSG},
-                        {"role": "user", "content": prompt},
-                    ],
-                    max_tokens=max_tokens,
-                    temperature=temperature,
-                )
+                telemetry.incr("openai.calls")
+                with limiter.limit(tokens=estimate_tokens(SYSTEM_MSG, prompt) + max_tokens), \
+                        telemetry.span("openai.chat"):
+                    response = self.client.chat.completions.create(
+                        model=self.model,
+                        messages=[
+                            {"role": "system", "content": SYSTEM_MSG},
+                            {"role": "user", "content": prompt},
+                        ],
+                        max_tokens=max_tokens,
+                        temperature=temperature,
+                    )
+                if response.usage is not None:
+                    telemetry.incr("openai.prompt_tokens", response.usage.prompt_tokens or 0)
+                    telemetry.incr("openai.completion_tokens", response.usage.completion_tokens or 0)
                 text = (response.choices[0].message.content or "").strip()
                 text = _clean_response(text)
                 if text:
                     logger.info("Summarized with %s", self.model)
                     return text
             except Exception as e:
-                err = str(e)
-                if "429" in err or "rate" in err.lower():
-                    wait = 5 * (2 ** attempt)
-                    logger.warning("Rate limited (attempt %d/3), waiting %ds...", attempt + 1, wait)
-                    time.sleep(wait)
+                if is_rate_limit_error(e):
+                    telemetry.incr("openai.rate_limited")
+                    logger.warning("Rate limited (attempt %d/3)", attempt + 1)
+                    limiter.backoff(retry_after(e) or 5 * (2 ** attempt))
                 else:
+                    telemetry.incr("openai.errors")
                     logger.error("OpenAI call failed: %s", e)
                     break
 
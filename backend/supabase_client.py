@@ -0,0 +1,46 @@
+"""One Supabase client per run, shared by every module that talks to the database.
+
+The client keeps a pooled HTTP connection, so reusing it saves a client setup
+and a TLS handshake for each caller (project ideas, subscribers, hero image
+storage and the export).
+"""
+from __future__ import annotations
+
+import logging
+import os
+import threading
+
+from supabase import Client, create_client
+
+logger = logging.getLogger(__name__)
+
+_client: Client | None = None
+_lock = threading.Lock()
+
+
+def is_configured() -> bool:
+    return bool(os.getenv("SUPABASE_URL") and os.getenv("SUPABASE_SERVICE_ROLE_KEY"))
+
+
+def get_client() -> Client | None:
+    """Return the shared client, or None if Supabase is not configured or unreachable."""
+    global _client
+    if _client is not None or not is_configured():
+        return _client
+    with _lock:
+        if _client is None:
+            try:
+                _client = create_client(os.environ["SUPABASE_URL"], os.environ["SUPABASE_SERVICE_ROLE_KEY"])
+            except Exception as e:
+                logger.warning("Failed to initialize Supabase client: %s", e)
+    return _client
+
+
+def require_client() -> Client:
+    """Like get_client, but raise if no client is available."""
+    if not is_configured():
+        raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
+    client = get_client()
+    if client is None:
+        raise RuntimeError("Supabase client could not be initialized")
+    return client
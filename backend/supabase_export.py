@@ -2,23 +2,24 @@
 from __future__ import annotations
 
 import logging
-import os
-import re
+import time
+import uuid
 
 from slugify import slugify
-from supabase import create_client, Client
 
-from models import Digest, DigestSection
+import telemetry
+from models import Digest
+from supabase_client import require_client
 
 logger = logging.getLogger(__name__)
 
+# Digest ids are derived from generated_at, so a retried export targets the same row
+DIGEST_ID_NAMESPACE = uuid.UUID("5b0e7f0c-3c1d-4d55-9a43-0f6f1a2d7c11")
+MAX_ATTEMPTS = 3
 
-def _get_client() -> Client:
-    url = os.getenv("SUPABASE_URL", "")
-    key = os.getenv("SUPABASE_SERVICE_ROLE_KEY", "")
-    if not url or not key:
-        raise ValueError("SUPABASE_URL and SUPABASE_SERVICE_ROLE_KEY must be set")
-    return create_client(url, key)
+
+def digest_uuid(digest: Digest) -> str:
+    return str(uuid.uuid5(DIGEST_ID_NAMESPACE, digest.generated_at.isoformat()))
 
 
 def _make_slug(title: str, item_hash: str, digest_id: str) -> str:
@@ -28,28 +29,11 @@ def _make_slug(title: str, item_hash: str, digest_id: str) -> str:
     return f"{base}-{suffix}" if base else f"{item_hash}-{digest_id[:6]}"
 
 
-def save_digest_to_supabase(digest: Digest) -> str | None:
-    """Write digest and articles to Supabase. Returns the digest UUID."""
-    client = _get_client()
-
-    # Insert digest
-    digest_data = {
-        "generated_at": digest.generated_at.isoformat(),
-        "intro_summary": digest.intro_summary,
-        "project_recommendations": digest.project_recommendations,
-        "total_items": digest.total_items,
-        "sources_checked": digest.sources_checked,
-    }
-    result = client.table("digests").insert(digest_data).execute()
-    digest_id = result.data[0]["id"]
-    logger.info("Inserted digest %s", digest_id)
-
-    # Insert articles
+def _payload(digest: Digest, digest_id: str) -> dict:
     articles = []
     for section in digest.sections:
         for item in section.items:
             articles.append({
-                "digest_id": digest_id,
                 "item_hash": item.id,
                 "title": item.title,
                 "slug": _make_slug(item.title, item.id, digest_id),
@@ -64,19 +48,54 @@ def save_digest_to_supabase(digest: Digest) -> str | None:
                 "extra": item.extra,
                 "section_title": section.title,
             })
+    return {
+        "p_digest": {
+            "id": digest_id,
+            "generated_at": digest.generated_at.isoformat(),
+            "intro_summary": digest.intro_summary,
+            "project_recommendations": digest.project_recommendations,
+            "total_items": digest.total_items,
+            "sources_checked": digest.sources_checked,
+        },
+        "p_articles": articles,
+    }
+
 
-    if articles:
+def save_digest_to_supabase(digest: Digest) -> str | None:
+    """Write digest and articles to Supabase in one transaction. Returns the digest UUID.
+
+    Uses the save_digest RPC (migration 004), which upserts both, so retrying
+    after a timeout cannot duplicate the digest or leave it without articles.
+    """
+    client = require_client()
+    digest_id = digest_uuid(digest)
+    payload = _payload(digest, digest_id)
+
+    for attempt in range(MAX_ATTEMPTS):
         try:
-            client.table("articles").upsert(articles, on_conflict="slug").execute()
-            logger.info("Inserted %d articles for digest %s", len(articles), digest_id)
+            telemetry.incr("supabase.calls")
+            with telemetry.span("export.supabase"):
+                client.rpc("save_digest", payload).execute()
+            break
         except Exception as e:
-            logger.error("Failed to insert articles for digest %s: %s", digest_id, e)
-            # Roll back the digest so we don't leave an empty shell
-            try:
-                client.table("digests").delete().eq("id", digest_id).execute()
-                logger.info("Rolled back digest %s after article insert failure", digest_id)
-            except Exception:
-                pass
-            raise
+            telemetry.incr("supabase.errors")
+            if attempt == MAX_ATTEMPTS - 1:
+                raise
+            logger.warning("save_digest failed (attempt %d/%d): %s", attempt + 1, MAX_ATTEMPTS, e)
+            time.sleep(2 ** attempt)
 
+    logger.info("Saved digest %s with %d articles", digest_id, len(payload["p_articles"]))
     return digest_id
+
+
+def save_run_report(report: dict) -> None:
+    """Insert a run report (see telemetry) into pipeline_runs (migration 005)."""
+    client = require_client()
+    client.table("pipeline_runs").insert({
+        "started_at": report["started_at"],
+        "finished_at": report["finished_at"],
+        "status": report["status"],
+        "duration_s": report["duration_s"],
+        "digest_id": report.get("digest_id"),
+        "report": report,
+    }).execute()
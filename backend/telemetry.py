@@ -0,0 +1,159 @@
+"""Run telemetry: timed spans and counters, written out as a JSON run report.
+
+Modules record into one process-wide collector, from any thread::
+
+    with telemetry.span("fetch.source", key=source_name):
+        ...
+    telemetry.incr("openai.calls")
+    telemetry.incr("openai.prompt_tokens", usage.prompt_tokens)
+
+Spans with the same name are aggregated (count, total and max seconds,
+errors), optionally broken down by ``key``. Counters named ``<x>.cache_hit``
+and ``<x>.cache_miss`` also produce a hit rate for ``<x>`` in the report.
+Pipeline stages are recorded separately, in order, by ``stage()``.
+"""
+from __future__ import annotations
+
+import json
+import threading
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Iterator
+
+REPORT_FILE = Path(__file__).parent / "state" / "run_report.json"
+REPORT_VERSION = 1
+
+
+class _Span:
+    __slots__ = ("count", "total", "max", "errors", "by_key")
+
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.errors = 0
+        self.by_key: dict[str, float] = {}
+
+    def to_dict(self) -> dict:
+        data = {
+            "count": self.count,
+            "total_s": round(self.total, 4),
+            "max_s": round(self.max, 4),
+            "errors": self.errors,
+        }
+        if self.by_key:
+            data["by_key"] = {k: round(v, 4) for k, v in sorted(self.by_key.items(), key=lambda kv: -kv[1])}
+        return data
+
+
+class Recorder:
+    def __init__(self):
+        self.started_at = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self.counters: dict[str, float] = {}
+        self.spans: dict[str, _Span] = {}
+        self.stages: list[dict] = []
+        self.info: dict = {}
+        self._lock = threading.Lock()
+
+    def incr(self, name: str, amount: float = 1) -> None:
+        with self._lock:
+            self.counters[name] = self.counters.get(name, 0) + amount
+
+    def observe(self, name: str, seconds: float, key: str | None = None, error: bool = False) -> None:
+        with self._lock:
+            span = self.spans.get(name)
+            if span is None:
+                span = self.spans[name] = _Span()
+            span.count += 1
+            span.total += seconds
+            span.max = max(span.max, seconds)
+            span.errors += error
+            if key is not None:
+                span.by_key[key] = span.by_key.get(key, 0.0) + seconds
+
+    def report(self, status: str) -> dict:
+        with self._lock:
+            counters = {k: (int(v) if float(v).is_integer() else v) for k, v in sorted(self.counters.items())}
+            spans = {name: span.to_dict() for name, span in sorted(self.spans.items())}
+            stages = list(self.stages)
+        hit_rates = {}
+        for name in counters:
+            prefix, _, kind = name.rpartition(".")
+            if kind in ("cache_hit", "cache_miss") and prefix not in hit_rates:
+                hits = counters.get(prefix + ".cache_hit", 0)
+                total = hits + counters.get(prefix + ".cache_miss", 0)
+                hit_rates[prefix] = round(hits / total, 4) if total else None
+        return {
+            "version": REPORT_VERSION,
+            "started_at": self.started_at.isoformat(),
+            "finished_at": datetime.now(timezone.utc).isoformat(),
+            "duration_s": round(time.perf_counter() - self._start, 3),
+            "status": status,
+            **self.info,
+            "stages": stages,
+            "spans": spans,
+            "counters": counters,
+            "cache_hit_rates": hit_rates,
+        }
+
+
+_recorder = Recorder()
+
+
+def start_run() -> Recorder:
+    """Start collecting for a new run, dropping anything recorded so far."""
+    global _recorder
+    _recorder = Recorder()
+    return _recorder
+
+
+def incr(name: str, amount: float = 1) -> None:
+    _recorder.incr(name, amount)
+
+
+def set_info(**info) -> None:
+    """Attach run-level fields (mode, digest id, ...) to the report."""
+    _recorder.info.update(info)
+
+
+@contextmanager
+def span(name: str, key: str | None = None) -> Iterator[None]:
+    """Time the block; an exception is counted as an error and re-raised."""
+    start = time.perf_counter()
+    error = False
+    try:
+        yield
+    except BaseException:
+        error = True
+        raise
+    finally:
+        _recorder.observe(name, time.perf_counter() - start, key, error)
+
+
+@contextmanager
+def stage(name: str) -> Iterator[dict]:
+    """Time a pipeline stage; fields set on the yielded dict go into its record."""
+    record: dict = {"stage": name}
+    start = time.perf_counter()
+    try:
+        yield record
+    except BaseException as e:
+        record["error"] = f"{type(e).__name__}: {e}"
+        raise
+    finally:
+        record["seconds"] = round(time.perf_counter() - start, 4)
+        _recorder.stages.append(record)
+
+
+def report(status: str) -> dict:
+    return _recorder.report(status)
+
+
+def write_report(data: dict, path: Path = REPORT_FILE) -> None:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    tmp.replace(path)
@@ -0,0 +1,5 @@
+"""The backend is a flat set of modules run from backend/; make them importable."""
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
@@ -0,0 +1,181 @@
+import json
+import time
+from functools import partial
+
+import pytest
+
+import dedup
+from bloom import BloomFilter
+from dedup import SeenStore, filter_new, save_seen
+from models import NewsItem, SourceType, item_id
+
+DAY = 86400
+
+
+def _ids(n: int, prefix: str = "a") -> list[str]:
+    return [item_id(f"https://example.com/{prefix}/{i}") for i in range(n)]
+
+
+def _item(url: str) -> NewsItem:
+    return NewsItem("t", url, "s", SourceType.NEWS)
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = SeenStore(tmp_path / "seen.sqlite3", tmp_path / "seen.bloom", bloom_capacity=1000)
+    yield store
+    store.close()
+
+
+def test_add_and_lookup_persist(tmp_path, store):
+    old, other = _ids(3), _ids(3, "b")
+    store.add(old, 100)
+    store.commit()
+    assert store.contains_many(old + other) == set(old)
+    store.close()
+
+    reopened = SeenStore(tmp_path / "seen.sqlite3", tmp_path / "seen.bloom", bloom_capacity=1000)
+    assert reopened.contains_many(old + other) == set(old)
+    assert other[0] not in reopened and old[0] in reopened
+    reopened.close()
+
+
+def test_prune_drops_ids_and_signatures_before_cutoff(store):
+    old, new = _ids(5), _ids(5, "b")
+    store.add(old, 100)
+    store.add(new, 200)
+    store.add_signatures([1, 2**64 - 1], 100)
+    store.add_signatures([2**63], 200)
+    assert store.prune(150) == 5
+    store.commit()
+    assert store.contains_many(old + new) == set(new)
+    assert len(store) == 5
+    # Signatures round-trip through signed 64-bit storage
+    assert store.signatures() == [2**63]
+
+
+def test_re_adding_refreshes_seen_at(store):
+    ids = _ids(2)
+    store.add(ids, 100)
+    store.add(ids[:1], 300)
+    store.prune(200)
+    assert store.contains_many(ids) == {ids[0]}
+
+
+def test_save_seen_records_items_merged_ids_and_signatures(store):
+    kept = _item("https://example.com/kept")
+    merged_id = item_id("https://example.com/merged")
+    clusters = {kept.id: {"simhash": f"{2**64 - 2:016x}", "merged": [merged_id]}}
+    save_seen(store, [kept], clusters=clusters)
+    assert store.contains_many([kept.id, merged_id]) == {kept.id, merged_id}
+    assert store.signatures() == [2**64 - 2]
+    assert filter_new([kept, _item("https://example.com/new")], store)[0].url == "https://example.com/new"
+
+
+def test_save_seen_prunes_past_retention(store):
+    stale = _ids(3)
+    store.add(stale, int(time.time()) - 10 * DAY)
+    save_seen(store, [_item("https://example.com/fresh")], retention_days=7)
+    assert not store.contains_many(stale)
+    assert len(store) == 1
+
+
+@pytest.fixture
+def state_dir(tmp_path, monkeypatch):
+    """Point load_seen's legacy, digest, feed cache and Bloom paths at tmp_path."""
+    monkeypatch.setattr(dedup, "LEGACY_STATE_FILE", tmp_path / "seen_items.json")
+    monkeypatch.setattr(dedup, "DIGESTS_DIR", tmp_path / "digests")
+    monkeypatch.setattr(dedup, "FEED_CACHE_FILE", tmp_path / "feeds.json")
+    monkeypatch.setattr(dedup, "SeenStore", partial(SeenStore, bloom_path=tmp_path / "seen.bloom"))
+    return tmp_path
+
+
+def test_load_seen_migrates_legacy_json(state_dir):
+    legacy = state_dir / "seen_items.json"
+    ids = _ids(2)
+    legacy.write_text(json.dumps({i: "2026-01-01T00:00:00+00:00" for i in ids}))
+
+    store = dedup.load_seen(state_dir / "seen.sqlite3")
+    assert store.contains_many(ids) == set(ids)
+    assert not legacy.exists()
+    store.close()
+
+
+def test_load_seen_seeds_empty_store_from_digests(state_dir):
+    digests = state_dir / "digests"
+    digests.mkdir()
+    sent = "https://www.youtube.com/watch?v=dQw4w9WgXcQ&utm_source=x"
+    digests.joinpath("20260101_090000.json").write_text(json.dumps({"sections": [{"items": [{"url": sent}]}]}))
+
+    store = dedup.load_seen(state_dir / "seen.sqlite3")
+    # Matched by canonical id, so a mirror of the sent URL is filtered too
+    assert filter_new([_item("https://youtu.be/dQw4w9WgXcQ")], store) == []
+    store.close()
+
+
+def _bloom(path):
+    bloom = BloomFilter.open(path)
+    try:
+        return bloom.generation, bloom.count
+    finally:
+        bloom.close()
+
+
+def test_bloom_filter_tracks_store_generation(tmp_path, store):
+    ids = _ids(50)
+    store.add(ids, 100)
+    store.commit()
+    # Ids are counted once, not again by the rebuild that creates the filter
+    assert _bloom(tmp_path / "seen.bloom") == (store.generation, 50)
+    assert store.contains_many(_ids(200, "b")) == set()
+    assert store.bloom_rejects > 150
+
+
+def test_stale_bloom_filter_is_rebuilt(tmp_path, store):
+    store.add(_ids(10), 100)
+    store.commit()
+    # Another writer commits without the filter: the generations no longer match
+    other = SeenStore(tmp_path / "seen.sqlite3", bloom_path=None)
+    added = _ids(10, "b")
+    other.add(added, 100)
+    other.commit()
+    other.close()
+    store.close()
+
+    reopened = SeenStore(tmp_path / "seen.sqlite3", tmp_path / "seen.bloom", bloom_capacity=1000)
+    assert reopened.contains_many(added) == set(added)
+    assert _bloom(tmp_path / "seen.bloom") == (reopened.generation, 20)
+    reopened.close()
+
+
+def test_corrupt_bloom_filter_is_rebuilt(tmp_path, store):
+    ids = _ids(10)
+    store.add(ids, 100)
+    store.commit()
+    store.close()
+    (tmp_path / "seen.bloom").write_bytes(b"not a filter")
+
+    reopened = SeenStore(tmp_path / "seen.sqlite3", tmp_path / "seen.bloom", bloom_capacity=1000)
+    assert reopened.contains_many(ids) == set(ids)
+    reopened.close()
+
+
+def test_bloom_filter_rebuilt_only_past_capacity(tmp_path):
+    path = tmp_path / "seen.bloom"
+    store = SeenStore(tmp_path / "seen.sqlite3", path, bloom_capacity=100)
+    store.contains_many([])  # opens the filter, reading its real capacity
+    capacity = store.bloom_capacity
+    store.add(_ids(60), 100)
+    store.commit()
+    store.prune(150)
+    store.add(_ids(30, "b"), 200)
+    store.commit()
+    # Pruned ids keep their bits until the filter fills up
+    assert _bloom(path)[1] == 90
+    more = _ids(capacity, "c")
+    store.add(more, 200)
+    store.commit()
+    # Past capacity: rebuilt from the live rows only
+    assert _bloom(path) == (store.generation, 30 + capacity)
+    assert store.contains_many(more[:5]) == set(more[:5])
+    store.close()
@@ -0,0 +1,95 @@
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+
+import pytest
+import requests
+
+import fetchers
+from feed_cache import FeedCache
+from fetchers import SourceFetchError, fetch_rss
+from models import SourceType
+
+FEED_URL = "https://example.com/feed.xml"
+
+
+def _feed(*titles: str) -> bytes:
+    date = format_datetime(datetime.now(timezone.utc) - timedelta(hours=1))
+    items = "".join(
+        f"<item><title>{t}</title><link>https://example.com/{t}?utm_source=rss</link>"
+        f"<pubDate>{date}</pubDate><description>&lt;p&gt;About {t}&lt;/p&gt;</description></item>"
+        for t in titles
+    )
+    return f'<?xml version="1.0"?><rss version="2.0"><channel><title>F</title>{items}</channel></rss>'.encode()
+
+
+def _response(status: int, body: bytes = b"", etag: str | None = None) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = body
+    resp.url = FEED_URL
+    if etag:
+        resp.headers["ETag"] = etag
+    return resp
+
+
+class FakeSession:
+    """Replays canned responses and records the headers of each request."""
+
+    def __init__(self, *responses: requests.Response):
+        self.responses = list(responses)
+        self.requests: list[dict] = []
+
+    def get(self, url, timeout=None, headers=None):
+        self.requests.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+
+@pytest.fixture
+def cache(tmp_path):
+    return FeedCache(tmp_path / "feeds.json")
+
+
+def _fetch(cache, session, monkeypatch):
+    monkeypatch.setattr(fetchers, "SESSION", session)
+    return fetch_rss(FEED_URL, "Feed", SourceType.NEWS, lookback_hours=24, cache=cache)
+
+
+def test_fresh_fetch_parses_and_caches(cache, monkeypatch):
+    session = FakeSession(_response(200, _feed("one", "two"), etag='"v1"'))
+    items = _fetch(cache, session, monkeypatch)
+    assert [i.title for i in items] == ["one", "two"]
+    assert items[0].url == "https://example.com/one?utm_source=rss"
+    assert items[0].canonical_url == "https://example.com/one"
+    assert items[0].content_snippet == "About one"
+    assert session.requests == [{}]
+    assert cache.conditional_headers(FEED_URL) == {"If-None-Match": '"v1"'}
+
+
+def test_304_reuses_cached_entries(cache, monkeypatch):
+    _fetch(cache, FakeSession(_response(200, _feed("one", "two"), etag='"v1"')), monkeypatch)
+    session = FakeSession(_response(304))
+    items = _fetch(cache, session, monkeypatch)
+    assert [i.title for i in items] == ["one", "two"]
+    assert session.requests == [{"If-None-Match": '"v1"'}]
+    assert session.responses == []
+
+
+def test_304_with_nothing_cached_refetches_unconditionally(cache, monkeypatch):
+    # A 304 to a request we sent without validators (e.g. a misbehaving proxy)
+    session = FakeSession(_response(304), _response(200, _feed("fresh"), etag='"v2"'))
+    items = _fetch(cache, session, monkeypatch)
+    assert [i.title for i in items] == ["fresh"]
+    assert session.requests == [{}, {}]
+    assert cache.entries(FEED_URL)[0]["title"] == "fresh"
+
+
+def test_304_to_unconditional_refetch_is_an_error(cache, monkeypatch):
+    session = FakeSession(_response(304), _response(304))
+    with pytest.raises(SourceFetchError):
+        _fetch(cache, session, monkeypatch)
+
+
+def test_http_error_raises_source_fetch_error(cache, monkeypatch):
+    with pytest.raises(SourceFetchError):
+        _fetch(cache, FakeSession(_response(503)), monkeypatch)
+    assert cache.entries(FEED_URL) is None
@@ -0,0 +1,40 @@
+import pytest
+
+from benchmarks.bench_strip_html import FIXTURES_DIR, _entry_htmls, legacy_strip_html
+from htmltext import CHUNK_CHARS, strip_html
+
+CASES = [
+    "",
+    "   plain text, no markup   ",
+    "<p>Hello <b>world</b></p><p>again</p>",
+    "<div>a<span>b</span>c</div>",
+    "<script>var x = '<p>no</p>';</script><style>p {}</style><template><p>no</p></template>kept",
+    "<!-- comment -->before<!-- another -->after",
+    "<![CDATA[raw <b>text</b>]]>tail",
+    "<!DOCTYPE html><html><body>doc</body></html>",
+    "Fish &amp; chips &lt;3 &#169; &#x263A; &ampfoo &nbsp;end",
+    "&amp; only entities",
+    "<p>unclosed <i>tags <b>everywhere",
+    "<a href='x'>link</a>   <br/>  <img src='y'>  text\n\n more",
+    "broken <tag attr='oops>text",
+    "x < y and y > z",
+]
+
+
+@pytest.mark.parametrize("html", CASES)
+@pytest.mark.parametrize("max_chars", [5, 500])
+def test_strip_html_matches_beautifulsoup(html, max_chars):
+    assert strip_html(html, max_chars) == legacy_strip_html(html, max_chars)
+
+
+def test_long_input_stops_early_with_same_prefix():
+    html = "<p>" + "word <b>bold</b> " * (CHUNK_CHARS // 4) + "</p>"
+    assert strip_html(html, 100) == legacy_strip_html(html, 100)
+    assert strip_html(html, 10**6) == legacy_strip_html(html, 10**6)
+
+
+@pytest.mark.skipif(not any(FIXTURES_DIR.glob("*.xml")), reason="no feed fixtures")
+def test_fixture_feeds_match_beautifulsoup():
+    for path in sorted(FIXTURES_DIR.glob("*.xml")):
+        for html in _entry_htmls(path.read_text(encoding="utf-8")):
+            assert strip_html(html) == legacy_strip_html(html), path.name
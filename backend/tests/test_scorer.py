@@ -0,0 +1,63 @@
+import random
+
+import pytest
+
+from benchmarks.bench_scorer import legacy_score_items
+from benchmarks.common import load_topics, make_items
+from models import NewsBatch, NewsItem, SourceType
+from scorer import KeywordIndex, score_batch, score_items
+
+# Overlapping, nested, repeated and regex-special keywords, float weights
+TRICKY_TOPICS = {
+    "llm": {"weight": 1.5, "keywords": ["LLM", "llms", "large language model", "language model", "LLM"]},
+    "cpp": {"weight": 2, "keywords": ["c++", "c", "cc"]},
+    "repeat": {"weight": 0.1, "keywords": ["aa", "aaa", "a.a"]},
+    "empty": {"keywords": []},
+    "unweighted": {"keywords": ["model"]},
+}
+
+
+def _item(title: str, snippet: str) -> NewsItem:
+    return NewsItem(title, "https://example.com/x", "s", SourceType.NEWS, content_snippet=snippet)
+
+
+def _scores(items):
+    return [(item.score, item.matched_topics) for item in items]
+
+
+@pytest.mark.parametrize("title, snippet", [
+    ("", ""),
+    ("LLMs and a Large Language Model", "llm llm LLMs language models"),
+    ("C++ vs C vs cc", "ccc c++c++ abc"),
+    ("aaaaa", "a.a aXa aaa"),
+    ("nothing to see", "here either"),
+])
+def test_keyword_index_matches_legacy_scoring(title, snippet):
+    items = [_item(title, snippet)]
+    expected = legacy_score_items(items, TRICKY_TOPICS)
+    assert _scores(score_items(items, TRICKY_TOPICS)) == expected
+
+
+def test_keyword_index_matches_legacy_on_configured_topics():
+    topics = load_topics()
+    items = make_items(500)
+    rng = random.Random(1)
+    for item in items[::5]:
+        item.title = item.title.upper() + " " + rng.choice(items).title
+    expected = legacy_score_items(items, topics)
+    assert _scores(score_items(items, topics)) == expected
+    assert any(score for score, _ in expected)
+
+
+def test_score_batch_matches_score_items():
+    topics = load_topics()
+    items = make_items(200)
+    expected = _scores(score_items(make_items(200), topics))
+    batch = score_batch(NewsBatch(items, topics), topics)
+    assert _scores(batch.to_items()) == expected
+
+
+def test_count_is_non_overlapping_per_keyword():
+    index = KeywordIndex({"t": {"keywords": ["aa", "aaa"]}})
+    assert index.count("aaaaa") == {"aa": 2, "aaa": 1}
+    assert KeywordIndex({}).count("anything") == {}
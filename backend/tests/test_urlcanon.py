@@ -0,0 +1,61 @@
+import pytest
+
+from models import NewsItem, SourceType
+from urlcanon import canonicalize
+
+
+@pytest.mark.parametrize("url, expected", [
+    # Generic clean-up: scheme/host case, default port, duplicate and trailing slashes,
+    # tracking params, query order, in-page fragment
+    ("HTTPS://Example.COM:443/a//b/?utm_source=x&b=2&a=1#section", "https://example.com/a/b?a=1&b=2"),
+    ("https://example.com/?fbclid=abc", "https://example.com/"),
+    ("https://example.com:8080/", "https://example.com:8080/"),
+    # Route-style fragments select content in single-page apps
+    ("https://example.com/app#/route", "https://example.com/app#/route"),
+    ("https://example.com/app#!route", "https://example.com/app#!route"),
+    # "source" is tracking only on hosts that use it that way
+    ("https://medium.com/p/abc?source=rss", "https://medium.com/p/abc"),
+    ("https://example.com/p?source=rss", "https://example.com/p?source=rss"),
+])
+def test_generic_rules(url, expected):
+    assert canonicalize(url) == expected
+
+
+@pytest.mark.parametrize("url, expected", [
+    ("https://old.reddit.com/r/ML/comments/abc/title/?share_id=1", "https://www.reddit.com/r/ML/comments/abc/title"),
+    ("http://np.reddit.com/r/ML/comments/abc/title", "https://www.reddit.com/r/ML/comments/abc/title"),
+    ("https://youtu.be/dQw4w9WgXcQ?t=10", "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+    ("https://m.youtube.com/watch?v=dQw4w9WgXcQ&list=x", "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+    ("https://www.youtube.com/shorts/dQw4w9WgXcQ", "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+    ("https://www.youtube.com/embed/dQw4w9WgXcQ", "https://www.youtube.com/watch?v=dQw4w9WgXcQ"),
+    # Owner and repo are case-insensitive on GitHub; branches and paths are not
+    ("https://GitHub.com/OpenAI/Whisper/blob/Main/README.md", "https://github.com/openai/whisper/blob/Main/README.md"),
+    ("https://www.github.com/OpenAI/Whisper/", "https://github.com/openai/whisper"),
+    ("https://news.google.com/articles/x?hl=en&gl=US&oc=5&ceid=US:en", "https://news.google.com/articles/x"),
+])
+def test_host_rules(url, expected):
+    assert canonicalize(url) == expected
+
+
+@pytest.mark.parametrize("url", ["mailto:x@y.z", "not a url", "ftp://example.com/file", "https://[::1/"])
+def test_non_http_passes_through(url):
+    assert canonicalize(url) == url
+
+
+def test_canonicalize_is_idempotent():
+    url = "https://youtu.be/dQw4w9WgXcQ?utm_campaign=x"
+    assert canonicalize(canonicalize(url)) == canonicalize(url)
+
+
+def test_item_id_uses_canonical_url_but_keeps_display_url():
+    a = NewsItem("t", "https://old.reddit.com/r/ML/comments/abc/?utm_source=x", "r", SourceType.REDDIT)
+    b = NewsItem("t", "https://www.reddit.com/r/ML/comments/abc", "r", SourceType.REDDIT)
+    assert a.id == b.id
+    assert a.url == "https://old.reddit.com/r/ML/comments/abc/?utm_source=x"
+    # Precomputed canonical URLs (as the fetchers pass them) give the same id
+    c = NewsItem("t", b.url, "r", SourceType.REDDIT, canonical_url=canonicalize(b.url))
+    assert c.id == b.id
+    # Changing the URL drops the cached canonical form
+    c.url = "https://example.com/other"
+    assert c.canonical_url == "https://example.com/other"
+    assert c.id != b.id
@@ -0,0 +1,124 @@
+"""Canonical URLs, so NewsItem.id is stable across tracking params and mirrors.
+
+``canonicalize`` lowercases the scheme and host, drops default ports,
+tracking parameters, trailing slashes and in-page fragments (route-style
+``#/...`` and ``#!...`` fragments are kept), and sorts what is left of the
+query. Hosts with mirrors or share links (Reddit, YouTube, GitHub, Google
+News) then get a per-host rule from a table keyed on the exact host, so each
+URL costs one dict lookup on top of the generic clean-up.
+
+The canonical form is only a dedup key: items keep the URL their source
+gave for display.
+"""
+from __future__ import annotations
+
+import logging
+import re
+from functools import lru_cache
+from typing import Callable, NamedTuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+logger = logging.getLogger(__name__)
+
+# Bump when the rules change, so stores keyed on canonical ids are rekeyed
+CANON_VERSION = 2
+
+_TRACKING_PARAM_RE = re.compile(
+    r"^(utm_\w+|fbclid|gclid|dclid|msclkid|mc_cid|mc_eid|igshid|ref_src|ref_url|"
+    r"share_id|_hsenc|_hsmi|mkt_tok)$",
+    re.IGNORECASE,
+)
+# Generic names that only some hosts use for tracking; elsewhere they may select content
+_HOST_TRACKING_PARAMS = {
+    "medium.com": {"source"},
+}
+_YOUTUBE_ID_RE = re.compile(r"^[\w-]{11}$")
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+class _Url(NamedTuple):
+    scheme: str
+    host: str
+    path: str
+    query: list[tuple[str, str]]
+
+
+def _reddit(url: _Url) -> _Url:
+    return url._replace(scheme="https", host="www.reddit.com", query=[])
+
+
+def _youtube(url: _Url) -> _Url:
+    video_id = None
+    if url.host == "youtu.be":
+        video_id = url.path.strip("/").split("/")[0]
+    elif url.path == "/watch":
+        video_id = dict(url.query).get("v")
+    elif url.path.startswith(("/shorts/", "/embed/", "/live/", "/v/")):
+        video_id = url.path.split("/")[2]
+    if video_id and _YOUTUBE_ID_RE.match(video_id):
+        return _Url("https", "www.youtube.com", "/watch", [("v", video_id)])
+    return url._replace(scheme="https", host="www.youtube.com")
+
+
+def _github(url: _Url) -> _Url:
+    # Owner and repo names are case-insensitive on GitHub; branches and file paths are not
+    segments = url.path.split("/")
+    segments[1:3] = [s.lower() for s in segments[1:3]]
+    return url._replace(scheme="https", host="github.com", path="/".join(segments))
+
+
+def _google_news(url: _Url) -> _Url:
+    return url._replace(query=[(k, v) for k, v in url.query if k not in ("oc", "hl", "gl", "ceid")])
+
+
+_HOST_RULES: dict[str, Callable[[_Url], _Url]] = {
+    **dict.fromkeys(
+        ("reddit.com", "www.reddit.com", "old.reddit.com", "new.reddit.com",
+         "np.reddit.com", "m.reddit.com", "i.reddit.com"),
+        _reddit,
+    ),
+    **dict.fromkeys(
+        ("youtube.com", "www.youtube.com", "m.youtube.com", "music.youtube.com", "youtu.be"),
+        _youtube,
+    ),
+    **dict.fromkeys(("github.com", "www.github.com"), _github),
+    "news.google.com": _google_news,
+}
+
+
+@lru_cache(maxsize=65536)
+def canonicalize(url: str) -> str:
+    """Return the canonical form of an http(s) URL; other strings pass through."""
+    url = url.strip()
+    try:
+        parts = urlsplit(url)
+        port = parts.port
+    except ValueError:
+        return url
+    scheme = parts.scheme.lower()
+    hostname = parts.hostname
+    if scheme not in _DEFAULT_PORTS or not hostname:
+        return url
+
+    host = hostname.rstrip(".")
+    host_params = _HOST_TRACKING_PARAMS.get(host, ())
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not _TRACKING_PARAM_RE.match(k) and k not in host_params
+    ] if parts.query else []
+    # Single-page apps route on the fragment; plain anchors only point within the page
+    fragment = parts.fragment if parts.fragment.startswith(("/", "!")) else ""
+    path = parts.path
+    if "//" in path:
+        path = re.sub(r"/{2,}", "/", path)
+    path = path.rstrip("/")
+
+    canon = _Url(scheme, host, path, query)
+    rule = _HOST_RULES.get(host)
+    if rule is not None:
+        canon = rule(canon)
+
+    netloc = canon.host
+    if port and port != _DEFAULT_PORTS[canon.scheme]:
+        netloc = f"{netloc}:{port}"
+    return urlunsplit((canon.scheme, netloc, canon.path or "/", urlencode(sorted(canon.query)) if canon.query else "", fragment))
@@ -0,0 +1,60 @@
+-- Write a digest and its articles in one transaction.
+-- The digest id is chosen by the caller, so retrying the same call is a no-op
+-- rather than a second digest, and a failure leaves nothing half-written.
+create or replace function save_digest(p_digest jsonb, p_articles jsonb)
+returns uuid
+language plpgsql
+as $$
+declare
+  v_digest_id uuid := (p_digest->>'id')::uuid;
+begin
+  insert into digests (id, generated_at, intro_summary, project_recommendations, total_items, sources_checked)
+  values (
+    v_digest_id,
+    (p_digest->>'generated_at')::timestamptz,
+    coalesce(p_digest->>'intro_summary', ''),
+    coalesce(p_digest->>'project_recommendations', ''),
+    coalesce((p_digest->>'total_items')::integer, 0),
+    coalesce((p_digest->>'sources_checked')::integer, 0)
+  )
+  on conflict (id) do update set
+    generated_at            = excluded.generated_at,
+    intro_summary           = excluded.intro_summary,
+    project_recommendations = excluded.project_recommendations,
+    total_items             = excluded.total_items,
+    sources_checked         = excluded.sources_checked;
+
+  insert into articles (
+    digest_id, item_hash, title, slug, url, source_name, source_type, published_at,
+    score, matched_topics, summary, content_snippet, extra, section_title
+  )
+  select
+    v_digest_id, a.item_hash, a.title, a.slug, a.url, a.source_name, a.source_type, a.published_at,
+    coalesce(a.score, 0), coalesce(a.matched_topics, '{}'), coalesce(a.summary, ''),
+    coalesce(a.content_snippet, ''), coalesce(a.extra, '{}'::jsonb), coalesce(a.section_title, '')
+  from jsonb_to_recordset(coalesce(p_articles, '[]'::jsonb)) as a(
+    item_hash text, title text, slug text, url text, source_name text, source_type text,
+    published_at timestamptz, score real, matched_topics text[], summary text,
+    content_snippet text, extra jsonb, section_title text
+  )
+  on conflict (slug) do update set
+    digest_id       = excluded.digest_id,
+    item_hash       = excluded.item_hash,
+    title           = excluded.title,
+    url             = excluded.url,
+    source_name     = excluded.source_name,
+    source_type     = excluded.source_type,
+    published_at    = excluded.published_at,
+    score           = excluded.score,
+    matched_topics  = excluded.matched_topics,
+    summary         = excluded.summary,
+    content_snippet = excluded.content_snippet,
+    extra           = excluded.extra,
+    section_title   = excluded.section_title;
+
+  return v_digest_id;
+end;
+$$;
+
+revoke execute on function save_digest(jsonb, jsonb) from public, anon, authenticated;
+grant execute on function save_digest(jsonb, jsonb) to service_role;
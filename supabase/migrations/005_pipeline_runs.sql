@@ -0,0 +1,20 @@
+-- One row per pipeline run: the JSON run report written by backend/telemetry.py,
+-- with the fields the dashboard filters and sorts on pulled out as columns.
+create table pipeline_runs (
+  id          uuid default gen_random_uuid() primary key,
+  started_at  timestamptz not null,
+  finished_at timestamptz not null,
+  status      text not null check (status in ('completed', 'stopped', 'failed')),
+  duration_s  real not null default 0,
+  digest_id   uuid references digests(id) on delete set null,
+  report      jsonb not null default '{}',
+  created_at  timestamptz default now()
+);
+
+create index idx_pipeline_runs_started on pipeline_runs(started_at desc);
+
+alter table pipeline_runs enable row level security;
+
+-- Written by the backend with the service role; admins read
+create policy "Admin read pipeline_runs" on pipeline_runs for select
+  using (exists (select 1 from profiles where profiles.id = auth.uid() and profiles.role = 'admin'));